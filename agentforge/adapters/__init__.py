@@ -1,9 +1,15 @@
 from .filestore import FileStoreProtocol
 from .kvstore import AbstractKVStore
 from .vectorstore import VectorStoreProtocol
-from .api_client import APIClient
+from .api_client import APIClient, get_session, REQUEST_TIMEOUT
+from .resilience import CircuitBreaker, CircuitOpenError
+from .endpoint_pool import EndpointPool
 from .api_service import APIService
 from .filestore import FileStoreProtocol
 from .db import DB
+from .cache import CacheProtocol
+from .embeddings import EmbeddingsProtocol
+from .streambus import StreamBusProtocol
+from .mediastore import MediaStoreProtocol
 
-__all__ = ["FileStore", "AbstractKVStore", "VectorStoreProtocol", "FileStoreProtocol", "APIClient", "APIService", "DB"]
\ No newline at end of file
+__all__ = ["FileStore", "AbstractKVStore", "VectorStoreProtocol", "FileStoreProtocol", "APIClient", "get_session", "REQUEST_TIMEOUT", "CircuitBreaker", "CircuitOpenError", "EndpointPool", "APIService", "DB", "CacheProtocol", "EmbeddingsProtocol", "StreamBusProtocol", "MediaStoreProtocol"]
\ No newline at end of file
@@ -1,11 +1,39 @@
 from typing import Optional, Protocol, Callable
 from functools import wraps
 from requests import Session, Response
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 from http import HTTPStatus
-import logging, os, requests, traceback
+import logging, os, requests, threading, traceback
+from agentforge.config import HttpConfig
 from agentforge.utils import logger
 
+http_config = HttpConfig.from_env()
+# (connect, read) timeout for blocking requests
+REQUEST_TIMEOUT = (http_config.connect_timeout, http_config.timeout)
+_session = None
+_session_lock = threading.Lock()
+
+"""
+get_session - Process wide requests Session with a keep-alive pool
+
+Blocking callers (subroutines on the executor) share it, so repeated
+calls to the same model server reuse connections instead of opening a
+new TCP connection per request.
+"""
+def get_session() -> Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = Session()
+                adapter = HTTPAdapter(pool_connections=http_config.max_keepalive_connections,
+                                      pool_maxsize=http_config.max_connections)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
 # Generic APIClientProtocol metaclass 
 class APIClientProtocol(Protocol):
     def get(self, endpoint: str, params: Optional[dict] = None) -> Response:
@@ -43,7 +71,7 @@ def handle_response(func: Callable[..., Response]) -> Callable[..., Response]:
 class APIClient(APIClientProtocol):
     def __init__(self, base_url: Optional[str] = None) -> None:
         self.base_url = base_url
-        self.session = Session()
+        self.session = get_session()
 
         if not self.base_url:
             self.base_url = ""
@@ -53,19 +81,22 @@ class APIClient(APIClientProtocol):
     @handle_response
     def get(self, endpoint: str, params: Optional[dict] = None) -> Response:
         url = self.base_url + endpoint
-        return self.session.get(url, params=params)
+        return self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
 
     @handle_response
     def post(self, endpoint: str, data: Optional[dict] = None) -> Response:
         url = self.base_url + endpoint
-        return self.session.post(url, json=data)
+        return self.session.post(url, json=data, timeout=REQUEST_TIMEOUT)
 
     @handle_response
     def put(self, endpoint: str, data: Optional[dict] = None) -> Response:
         url = self.base_url + endpoint
-        return self.session.put(url, json=data)
+        return self.session.put(url, json=data, timeout=REQUEST_TIMEOUT)
 
     @handle_response
     def delete(self, endpoint: str) -> Response:
         url = self.base_url + endpoint
-        return self.session.delete(url)
+        return self.session.delete(url, timeout=REQUEST_TIMEOUT)
+
+
+# Async API client, requests share the pooled client of the running event loop
@@ -1,27 +1,69 @@
 import requests, json, os
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar
 from agentforge.adapters import APIClient
-from agentforge.utils import logger
+from agentforge.adapters.endpoint_pool import EndpointPool
+from agentforge.adapters.resilience import guard, call_with_retries
+from agentforge.utils import logger, span, check_cancelled
+
+T = TypeVar("T")
 
 ### API Service level handles calling the API using POST, handles fallback logic, and heartbeat logic
 ### for the service it is operating
 class APIService:
+    # Requests can be sent again after a failure or hedged, services with side effects set this to False
+    idempotent = True
+
     def __init__(self):
         # Check if we are in a test environment
         self.test_env = True if os.getenv("AGENTFORGE_ENV").lower() == "test" else False
         self.client = APIClient()
+        self.response_cache = None # set by InterfaceFactory when RESPONSE_CACHE_TYPE is configured
+        self.pool = None # set by set_endpoints when the service has several replicas
+
+    # Comma separated replica URLs, more than one enables load balancing and failover
+    def set_endpoints(self, urls: Optional[str]) -> None:
+        urls = [url.strip() for url in (urls or "").split(",") if url.strip()]
+        if not urls:
+            return
+        self.url = urls[0]
+        if len(urls) > 1:
+            self.pool = EndpointPool(self.service, urls, on_failover=self._fallback)
+            logger.info(f"Balancing {self.service} across {len(urls)} replicas")
 
     def _heartbeat(self):
+        if self.pool is not None:
+            return self.pool.heartbeat()
         try:
             response = requests.get(self.url)
             response.raise_for_status()
         except requests.exceptions.RequestException as err:
-            print(f"Heartbeat failed for {self.service}. Error: {err}")
+            logger.warning(f"Heartbeat failed for {self.service}. Error: {err}")
             return False
         return True
 
-    def _fallback(self, service):
-        print(f"Fallback initiated for {service}")
-        # Implement fallback functionality here
+    # Called by the endpoint pool before a request is retried on the next replica
+    def _fallback(self, url: str, reason: str) -> None:
+        logger.warning(f"Fallback initiated for {self.service}, {url} failed: {reason}")
+
+    # Sends to the least loaded replica with failover, or to self.url without a pool,
+    # each replica behind its circuit breaker and the whole call retried with backoff
+    def _send(self, send: Callable[[str], T]) -> T:
+        if self.pool is None:
+            attempt = lambda: guard(self.url, send)
+        else:
+            attempt = lambda: self.pool.call(lambda url: guard(url, send))
+        return call_with_retries(attempt, self.service, self.idempotent)
+
+    # Like _send but the replica counts as busy until the block exits, for streamed responses.
+    # Only opening the response is retried, it is never hedged
+    @contextmanager
+    def _open(self, send: Callable[[str], T]) -> Iterator[T]:
+        if self.pool is None:
+            yield call_with_retries(lambda: guard(self.url, send), self.service, self.idempotent, hedged=False)
+            return
+        with self.pool.session(lambda url: guard(url, send)) as result:
+            yield result
 
     ## Test harness should 1-1 match output from Service
     def test(self):
@@ -30,22 +72,46 @@ class APIService:
     def call(self, form_data):
         if self.test_env:
             return self.test() # Return test fixture from Service
-        
-        ## TODO: Implement heartbeat logic
-        # if not self._heartbeat():
-        #     self._fallback(self.service)
-        #     return None
 
         if not self.url:
             raise Exception(f"Service URL {self.service.upper()}_URL not set in .env")
-        response = self.client.post(self.url, form_data)
+        check_cancelled()
+        cache_request = self._cache_request(form_data)
+        if cache_request is not None:
+            cached = self.response_cache.get(self.service, cache_request)
+            if cached is not None:
+                return cached
+        with span(f"api:{self.service}"):
+            response = self._send(lambda url: self.client.post(url, form_data))
+        check_cancelled() # result is discarded if the subroutine was cancelled meanwhile
         response.raise_for_status()
-        data = response.json()
+        data = self._parse(response.json())
+        if cache_request is not None:
+            self.response_cache.set(self.service, cache_request, data)
+        return data
+
+    # The part of a prompt request that determines the response, None when it must not be cached
+    def _cache_request(self, form_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self.response_cache is None or "prompt" not in form_data:
+            return None
+        generation_config = form_data.get("generation_config")
+        if not self.response_cache.cacheable(generation_config, override=form_data.get("cache")):
+            return None
+        return {
+            "prompt": form_data["prompt"],
+            "model": (form_data.get("model_config") or {}).get("model_name"),
+            "generation_config": generation_config,
+        }
+
+    # Services that can coalesce concurrent requests override this, the rest just call
+    def batch_call(self, form_data: Dict[str, Any]) -> Dict[str, Any]:
+        return self.call(form_data)
+
+    def _parse(self, data: Dict[str, Any]) -> Dict[str, Any]:
         if 'error_type' in data:
             # if there is an error type we need to log the stacktrace
             # and raise the message for the end user
             logger.error(data)
             error = f"{data['error_message']}"
             raise Exception(error)
-        else:
-            return response.json()
+        return data
@@ -0,0 +1,17 @@
+# Result caches shared by memoized subroutines
+
+from typing import Any, Optional, Protocol
+
+class CacheProtocol(Protocol):
+
+    def get(self, key: str) -> Optional[Any]:
+        pass
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        pass
+
+    def delete(self, key: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
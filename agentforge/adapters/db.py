@@ -17,6 +17,9 @@ class DB(Protocol):
     def set(self, collection: str, key: str, data: dict) -> None:
         pass
 
+    def update(self, collection: str, key: str, set_fields: Dict[str, Any], unset_fields: Optional[List[str]] = None) -> None:
+        pass
+
     def delete(self, collection: str, key: str) -> None:
         pass
 
@@ -0,0 +1,12 @@
+# Text embedding providers shared by the vectorstores and symbolic memory
+# Same method names as langchain's Embeddings so a provider can be handed to langchain stores as is
+
+from typing import List, Protocol
+
+class EmbeddingsProtocol(Protocol):
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        pass
+
+    def embed_query(self, text: str) -> List[float]:
+        pass
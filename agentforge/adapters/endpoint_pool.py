@@ -0,0 +1,266 @@
+import os, threading, time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Set, Tuple, TypeVar
+from urllib.parse import urlsplit
+import httpx
+import requests
+from agentforge.adapters.resilience import CircuitOpenError
+from agentforge.utils import logger, metrics
+
+T = TypeVar("T")
+
+# Routing strategy: least_outstanding or latency
+ENDPOINT_STRATEGY = os.getenv("ENDPOINT_STRATEGY", "least_outstanding")
+# Seconds between heartbeats, 0 disables the heartbeat thread
+ENDPOINT_HEARTBEAT_INTERVAL = float(os.getenv("ENDPOINT_HEARTBEAT_INTERVAL", 5))
+# Consecutive failed requests before a replica is evicted
+ENDPOINT_FAILURE_THRESHOLD = int(os.getenv("ENDPOINT_FAILURE_THRESHOLD", 2))
+# Seconds an evicted replica is skipped before it is tried again without a heartbeat
+ENDPOINT_COOLDOWN = float(os.getenv("ENDPOINT_COOLDOWN", 30))
+# Path polled on each replica, vLLM and our own services expose /health
+ENDPOINT_HEALTH_PATH = os.getenv("ENDPOINT_HEALTH_PATH", "/health")
+
+# Errors after which the same request can safely go to another replica
+RETRYABLE_ERRORS = (requests.ConnectionError, requests.Timeout, httpx.TransportError, CircuitOpenError)
+
+class Endpoint:
+    def __init__(self, url: str, health_path: str = ENDPOINT_HEALTH_PATH) -> None:
+        self.url = url
+        parts = urlsplit(url)
+        self.health_url = f"{parts.scheme}://{parts.netloc}{health_path}"
+        self.outstanding = 0
+        self.latency: Optional[float] = None # EWMA of request latency in seconds
+        self.failures = 0
+        self.healthy = True
+        self.retry_at = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "latency_ms": round(self.latency * 1000, 3) if self.latency is not None else None,
+            "failures": self.failures,
+        }
+
+"""
+EndpointPool - Routes requests across replicas of a service
+
+Each request goes to the healthy replica with the fewest requests in
+flight (least_outstanding) or the lowest expected wait, EWMA latency
+times queue depth (latency). A replica that fails
+ENDPOINT_FAILURE_THRESHOLD requests in a row is evicted until a heartbeat
+sees it healthy again (or ENDPOINT_COOLDOWN passes without heartbeats).
+Requests that fail to connect are retried on the next replica, so a
+replica restart does not surface as an error.
+
+Input:
+    service: str - service name, used in logs and metrics
+    urls: List[str] - replica URLs of the same endpoint
+    strategy: str - least_outstanding or latency
+    heartbeat_interval: float - seconds between health checks, 0 disables them
+"""
+class EndpointPool:
+    def __init__(self, service: str, urls: List[str], strategy: str = ENDPOINT_STRATEGY,
+                 heartbeat_interval: float = ENDPOINT_HEARTBEAT_INTERVAL,
+                 failure_threshold: int = ENDPOINT_FAILURE_THRESHOLD, cooldown: float = ENDPOINT_COOLDOWN,
+                 on_failover: Optional[Callable[[str, str], None]] = None) -> None:
+        if not urls:
+            raise ValueError(f"No endpoints configured for {service}")
+        self.service = service
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.on_failover = on_failover
+        self.alpha = 0.3
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        if heartbeat_interval > 0:
+            self.thread = threading.Thread(target=self._heartbeat_loop, args=(heartbeat_interval,),
+                                           name=f"{service}-heartbeat", daemon=True)
+            self.thread.start()
+
+    def _score(self, endpoint: Endpoint) -> Tuple[float, float]:
+        latency = endpoint.latency if endpoint.latency is not None else 0.0
+        if self.strategy == "latency":
+            return (latency * (endpoint.outstanding + 1), endpoint.outstanding)
+        return (endpoint.outstanding, latency)
+
+    def acquire(self, exclude: Optional[Set[Endpoint]] = None) -> Optional[Endpoint]:
+        exclude = exclude or set()
+        now = time.monotonic()
+        with self.lock:
+            candidates = [e for e in self.endpoints if e not in exclude and (e.healthy or e.retry_at <= now)]
+            if not candidates:
+                # Every replica looks down -- try the ones not attempted yet rather than failing outright
+                candidates = [e for e in self.endpoints if e not in exclude]
+            if not candidates:
+                return None
+            endpoint = min(candidates, key=self._score)
+            endpoint.outstanding += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, elapsed: Optional[float] = None, ok: bool = True) -> None:
+        with self.lock:
+            endpoint.outstanding = max(0, endpoint.outstanding - 1)
+            if ok:
+                endpoint.failures = 0
+                endpoint.healthy = True
+                if elapsed is not None:
+                    endpoint.latency = elapsed if endpoint.latency is None else \
+                        self.alpha * elapsed + (1 - self.alpha) * endpoint.latency
+                return
+            endpoint.failures += 1
+            if endpoint.failures >= self.failure_threshold and endpoint.healthy:
+                endpoint.healthy = False
+                endpoint.retry_at = time.monotonic() + self.cooldown
+                logger.warning(f"Evicted {self.service} replica {endpoint.url} after {endpoint.failures} failures")
+                metrics.increment(f"endpoint.{self.service}.evicted")
+
+    @staticmethod
+    def _failed(result: Any) -> bool:
+        status = getattr(result, "status_code", None)
+        return status is not None and status >= 500
+
+    """
+    open - Send a request with failover, the chosen replica stays acquired
+
+    request receives a replica URL. Connection errors and 5xx responses
+    move the request to the next replica. The caller must release() the
+    returned endpoint once it is done with the result, e.g. after reading
+    a stream to the end.
+    """
+    def open(self, request: Callable[[str], T]) -> Tuple[Endpoint, T]:
+        tried: Set[Endpoint] = set()
+        error: Optional[BaseException] = None
+        while True:
+            endpoint = self.acquire(tried)
+            if endpoint is None:
+                raise error if error is not None else Exception(f"No {self.service} replica available")
+            tried.add(endpoint)
+            try:
+                result = request(endpoint.url)
+            except RETRYABLE_ERRORS as e:
+                error = e
+                self.release(endpoint, ok=False)
+                self._fallback(endpoint, str(e))
+                continue
+            except BaseException:
+                # Any other error or a cancellation still gives the replica back
+                self.release(endpoint, ok=False)
+                raise
+            if self._failed(result) and len(tried) < len(self.endpoints):
+                close = getattr(result, "close", None)
+                if close is not None:
+                    close()
+                self.release(endpoint, ok=False)
+                self._fallback(endpoint, f"status {result.status_code}")
+                continue
+            return endpoint, result
+
+    def call(self, request: Callable[[str], T]) -> T:
+        with self.session(request) as result:
+            return result
+
+    """
+    session - open() as a context manager, releases the replica on exit
+
+    The replica's latency is measured over the whole block, so a streamed
+    generation counts as outstanding until its last token is read.
+    """
+    @contextmanager
+    def session(self, request: Callable[[str], T]) -> Iterator[T]:
+        start = time.perf_counter()
+        endpoint, result = self.open(request)
+        ok = not self._failed(result)
+        try:
+            yield result
+        except RETRYABLE_ERRORS:
+            ok = False
+            raise
+        finally:
+            self.release(endpoint, time.perf_counter() - start, ok)
+
+    # Pins one replica for an exchange that cannot be replayed, e.g. an async stream
+    @contextmanager
+    def route(self) -> Iterator[str]:
+        endpoint = self.acquire()
+        if endpoint is None:
+            raise Exception(f"No {self.service} replica available")
+        start = time.perf_counter()
+        ok = True
+        try:
+            yield endpoint.url
+        except RETRYABLE_ERRORS:
+            ok = False
+            raise
+        finally:
+            self.release(endpoint, time.perf_counter() - start, ok)
+
+    async def acall(self, request: Callable[[str], Any]) -> Any:
+        tried: Set[Endpoint] = set()
+        error: Optional[BaseException] = None
+        while True:
+            endpoint = self.acquire(tried)
+            if endpoint is None:
+                raise error if error is not None else Exception(f"No {self.service} replica available")
+            tried.add(endpoint)
+            start = time.perf_counter()
+            try:
+                result = await request(endpoint.url)
+            except RETRYABLE_ERRORS as e:
+                error = e
+                self.release(endpoint, ok=False)
+                self._fallback(endpoint, str(e))
+                continue
+            except BaseException:
+                # Includes the CancelledError of a hedged copy that lost the race
+                self.release(endpoint, ok=False)
+                raise
+            if self._failed(result) and len(tried) < len(self.endpoints):
+                self.release(endpoint, ok=False)
+                self._fallback(endpoint, f"status {result.status_code}")
+                continue
+            self.release(endpoint, time.perf_counter() - start, not self._failed(result))
+            return result
+
+    def _fallback(self, endpoint: Endpoint, reason: str) -> None:
+        metrics.increment(f"endpoint.{self.service}.failover")
+        if self.on_failover is not None:
+            self.on_failover(endpoint.url, reason)
+        else:
+            logger.warning(f"{self.service} replica {endpoint.url} failed ({reason}), failing over")
+
+    def heartbeat(self) -> bool:
+        for endpoint in self.endpoints:
+            try:
+                healthy = requests.get(endpoint.health_url, timeout=2).status_code < 500
+            except requests.RequestException:
+                healthy = False
+            with self.lock:
+                if healthy and not endpoint.healthy:
+                    logger.info(f"{self.service} replica {endpoint.url} is healthy again")
+                elif not healthy and endpoint.healthy:
+                    logger.warning(f"{self.service} replica {endpoint.url} failed its heartbeat")
+                endpoint.healthy = healthy
+                if healthy:
+                    endpoint.failures = 0
+                else:
+                    endpoint.retry_at = time.monotonic() + self.cooldown
+        return any(endpoint.healthy for endpoint in self.endpoints)
+
+    def _heartbeat_loop(self, interval: float) -> None:
+        while not self.stopped.wait(interval):
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logger.error(f"Heartbeat for {self.service} failed: {str(e)}")
+
+    def close(self) -> None:
+        self.stopped.set()
+
+    def status(self) -> List[dict]:
+        with self.lock:
+            return [endpoint.to_dict() for endpoint in self.endpoints]
@@ -0,0 +1,14 @@
+# Generated audio and video, stored once and handed around by reference
+
+from typing import Any, Dict, Optional, Protocol
+
+class MediaStoreProtocol(Protocol):
+
+    def put_file(self, path: str) -> Dict[str, Any]:
+        pass
+
+    def get_path(self, media_id: str) -> Optional[str]:
+        pass
+
+    def content_type(self, media_id: str) -> str:
+        pass
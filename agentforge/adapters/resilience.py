@@ -0,0 +1,266 @@
+import asyncio, contextvars, os, random, threading, time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from urllib.parse import urlsplit
+import httpx
+import requests
+from agentforge.utils import logger, metrics, check_cancelled
+
+T = TypeVar("T")
+
+# Attempts per call, including the first
+API_RETRY_ATTEMPTS = int(os.getenv("API_RETRY_ATTEMPTS", 3))
+# Backoff before retry n is uniform in [0, min(max, base * 2^n)] seconds
+API_RETRY_BASE_DELAY = float(os.getenv("API_RETRY_BASE_DELAY", 0.1))
+API_RETRY_MAX_DELAY = float(os.getenv("API_RETRY_MAX_DELAY", 2))
+# Send a second copy of an idempotent request once it is slower than this latency quantile, 0 disables hedging
+API_HEDGE_QUANTILE = float(os.getenv("API_HEDGE_QUANTILE", 0))
+# Samples needed before the quantile is trusted
+API_HEDGE_MIN_SAMPLES = int(os.getenv("API_HEDGE_MIN_SAMPLES", 50))
+# Consecutive failures that open an endpoint's circuit
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))
+# Seconds an open circuit fails fast before letting a probe request through
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", 30))
+
+# Gateways and overloaded servers answer with these, the request never ran or can run again
+RETRYABLE_STATUS = {429, 502, 503, 504}
+TRANSPORT_ERRORS = (requests.ConnectionError, requests.Timeout, httpx.TransportError)
+
+class CircuitOpenError(Exception):
+    pass
+
+"""
+CircuitBreaker - Fails fast while an endpoint is known to be down
+
+Opens after failure_threshold consecutive failures. While open every
+request is rejected with CircuitOpenError without touching the network,
+after reset_timeout one probe request is let through (half open) and its
+outcome closes or re-opens the circuit.
+"""
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True
+            return False
+
+    def success(self) -> None:
+        with self.lock:
+            if self.state != "closed":
+                logger.info(f"Circuit for {self.name} closed")
+            self.failures = 0
+            self.state = "closed"
+
+    def failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                logger.warning(f"Circuit for {self.name} opened after {self.failures} failures")
+                metrics.increment(f"circuit.{self.name}.opened")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+# One breaker per host, shared by every service and client in the process
+def get_breaker(url: str) -> CircuitBreaker:
+    name = urlsplit(url).netloc or url
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+def is_retryable(result: Any) -> bool:
+    if isinstance(result, BaseException):
+        return isinstance(result, TRANSPORT_ERRORS + (CircuitOpenError,))
+    return getattr(result, "status_code", None) in RETRYABLE_STATUS
+
+def _close(result: Any) -> None:
+    close = getattr(result, "close", None)
+    if close is not None:
+        close()
+
+# Streamed httpx responses only release their connection through aclose
+async def _aclose(result: Any) -> None:
+    aclose = getattr(result, "aclose", None)
+    if aclose is not None:
+        await aclose()
+    else:
+        _close(result)
+
+"""
+guard - Sends one request to url through the endpoint's circuit breaker
+
+Errors, cancellations and 5xx responses count against the endpoint,
+other responses close its circuit.
+"""
+def guard(url: str, send: Callable[[str], T]) -> T:
+    breaker = get_breaker(url)
+    if not breaker.allow():
+        metrics.increment(f"circuit.{breaker.name}.rejected")
+        raise CircuitOpenError(f"Circuit open for {breaker.name}")
+    try:
+        result = send(url)
+    except BaseException:
+        # Whatever ends the request without a response, a half open probe must not stay pending
+        breaker.failure()
+        raise
+    _record(breaker, result)
+    return result
+
+async def aguard(url: str, send: Callable[[str], Awaitable[T]]) -> T:
+    breaker = get_breaker(url)
+    if not breaker.allow():
+        metrics.increment(f"circuit.{breaker.name}.rejected")
+        raise CircuitOpenError(f"Circuit open for {breaker.name}")
+    try:
+        result = await send(url)
+    except BaseException:
+        # Whatever ends the request without a response, a half open probe must not stay pending
+        breaker.failure()
+        raise
+    _record(breaker, result)
+    return result
+
+def _record(breaker: CircuitBreaker, result: Any) -> None:
+    status = getattr(result, "status_code", None)
+    if status is not None and status >= 500:
+        breaker.failure()
+    else:
+        breaker.success()
+
+# Attempt latencies feed the hedging threshold
+def _timed(result: T, name: str, start: float) -> T:
+    metrics.observe(f"attempt:{name}", (time.perf_counter() - start) * 1000)
+    return result
+
+def backoff(attempt: int) -> float:
+    return random.uniform(0, min(API_RETRY_MAX_DELAY, API_RETRY_BASE_DELAY * (2 ** attempt)))
+
+# Latency after which a hedge is sent, None until enough attempts were observed
+def hedge_delay(name: str) -> Optional[float]:
+    if API_HEDGE_QUANTILE <= 0:
+        return None
+    histogram = metrics.histograms.get(f"attempt:{name}")
+    if histogram is None or histogram.count < API_HEDGE_MIN_SAMPLES:
+        return None
+    return histogram.quantile(API_HEDGE_QUANTILE) / 1000
+
+_hedge_executor = ThreadPoolExecutor(max_workers=int(os.getenv("API_HEDGE_WORKERS", 16)), thread_name_prefix="api-hedge")
+
+"""
+hedge - Sends a second copy of the request if the first is slower than delay
+
+Returns whichever copy answers first, the slower response is closed when
+it arrives. Only for idempotent requests.
+"""
+def hedge(send: Callable[[], T], delay: float, name: str) -> T:
+    # Both copies run with the caller's context so cancellation and tracing follow them
+    first = _hedge_executor.submit(contextvars.copy_context().run, send)
+    done, _ = wait([first], timeout=delay)
+    if done:
+        return first.result()
+    metrics.increment(f"api.{name}.hedged")
+    second = _hedge_executor.submit(contextvars.copy_context().run, send)
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None and not is_retryable(future.result()):
+                for other in pending:
+                    other.add_done_callback(lambda f: f.exception() is None and _close(f.result()))
+                return future.result()
+            error = future
+    return error.result()
+
+"""
+call_with_retries - Runs send with jittered exponential backoff and optional hedging
+
+send takes no arguments and performs one attempt, e.g. a guarded post or
+a pool call that already fails over between replicas. Transport errors,
+open circuits and 429/502/503/504 responses are retried when the request
+is idempotent, anything else is returned or raised as is.
+
+Input:
+    send: Callable - one attempt
+    name: str - service name, selects the latency histogram used for hedging
+    idempotent: bool - whether the request may be sent more than once
+    hedged: bool - allow hedging, off for responses that are streamed to a user
+"""
+def call_with_retries(send: Callable[[], T], name: str, idempotent: bool = True,
+                      hedged: bool = True, attempts: int = API_RETRY_ATTEMPTS) -> T:
+    attempts = attempts if idempotent else 1
+    for attempt in range(attempts):
+        last = attempt == attempts - 1
+        delay = hedge_delay(name) if idempotent and hedged else None
+        start = time.perf_counter()
+        try:
+            result = _timed(hedge(send, delay, name) if delay else send(), name, start)
+        except Exception as e:
+            if last or not is_retryable(e):
+                raise
+            logger.warning(f"{name} request failed ({str(e)}), retrying")
+        else:
+            if last or not is_retryable(result):
+                return result
+            logger.warning(f"{name} returned {result.status_code}, retrying")
+            _close(result)
+        metrics.increment(f"api.{name}.retries")
+        time.sleep(backoff(attempt))
+        check_cancelled()
+
+async def acall_with_retries(send: Callable[[], Awaitable[T]], name: str, idempotent: bool = True,
+                             hedged: bool = True, attempts: int = API_RETRY_ATTEMPTS) -> T:
+    attempts = attempts if idempotent else 1
+    for attempt in range(attempts):
+        last = attempt == attempts - 1
+        delay = hedge_delay(name) if idempotent and hedged else None
+        start = time.perf_counter()
+        try:
+            result = _timed(await ahedge(send, delay, name) if delay else await send(), name, start)
+        except Exception as e:
+            if last or not is_retryable(e):
+                raise
+            logger.warning(f"{name} request failed ({str(e)}), retrying")
+        else:
+            if last or not is_retryable(result):
+                return result
+            logger.warning(f"{name} returned {result.status_code}, retrying")
+            await _aclose(result)
+        metrics.increment(f"api.{name}.retries")
+        await asyncio.sleep(backoff(attempt))
+        check_cancelled()
+
+async def ahedge(send: Callable[[], Awaitable[T]], delay: float, name: str) -> T:
+    first = asyncio.ensure_future(send())
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done:
+        return first.result()
+    metrics.increment(f"api.{name}.hedged")
+    pending = {first, asyncio.ensure_future(send())}
+    error = None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None and not is_retryable(task.result()):
+                for other in pending:
+                    other.cancel()
+                return task.result()
+            error = task
+    return error.result()
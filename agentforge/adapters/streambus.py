@@ -0,0 +1,21 @@
+# Response streams between the node generating text and the API relaying it to the client
+# Entries have ids so a reader can start after the last entry it saw
+
+from typing import AsyncIterator, Iterator, List, Optional, Protocol, Tuple
+
+class StreamBusProtocol(Protocol):
+
+    def publish_many(self, key: str, texts: List[str]) -> List[str]:
+        pass
+
+    def read(self, key: str, last_id: str = "0") -> Iterator[Tuple[Optional[str], Optional[str]]]:
+        pass
+
+    def aread(self, key: str, last_id: str = "0") -> AsyncIterator[Tuple[Optional[str], Optional[str]]]:
+        pass
+
+    def exists(self, key: str) -> bool:
+        pass
+
+    async def aexists(self, key: str) -> bool:
+        pass
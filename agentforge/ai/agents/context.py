@@ -1,15 +1,28 @@
 import json, uuid, os, re
-from typing import Dict, Any
+from typing import Dict, Any, List, Set, Tuple
 from agentforge.interfaces import interface_interactor
 from agentforge.utils import Parser
 from agentforge.utils import AbortController, logger
 from bson.objectid import ObjectId
-from copy import deepcopy
-from jinja2 import Template
+from functools import lru_cache
+from agentforge.ai.agents.prompts import prompt_registry, compile_template
 from datetime import datetime
 import threading
 from datetime import datetime
 
+# Parsed dotted keys are reused across every Context in the process
+@lru_cache(maxsize=4096)
+def split_key(key: str) -> Tuple[str, ...]:
+    return tuple(key.split('.'))
+
+_local_abort_controller = AbortController()
+
+# Abort signals go through the process wide controller so they reach every worker
+def get_abort_controller() -> AbortController:
+    if interface_interactor.has_interface("abort_controller"):
+        return interface_interactor.get_interface("abort_controller")
+    return _local_abort_controller
+
 """
     Context Class - Shared State for Agent Subroutines
 
@@ -18,6 +31,17 @@ from datetime import datetime
     retrieve values using dot notation. It also provides helper
     functions to format prompts and get model input and abort.
 
+    Writes are copy-on-write: the dicts along the written path are copied
+    and the root is swapped in a single assignment, everything else is
+    shared with the previous version. Readers therefore never take the
+    lock and always see a consistent snapshot. Values handed out by get()
+    are shared and not copied, so reads stay cheap: mutate a copy and set()
+    it back. A change made in place is not marked dirty, is never saved and
+    is visible to every reader of the snapshot.
+
+    Every write records its path as dirty so save() persists only the
+    changed paths as a $set/$unset delta after the first full insert.
+
     Input:
         init: Dict - Initial values to set in the context
 """
@@ -27,32 +51,105 @@ class Context:
         self.parser = Parser()
         self.task_routines = {}
         self.context_data = {}
-        self.prompts = self.read_prompts()
-        self.abort_controller = AbortController()
+        self.prompts = prompt_registry # shared, loaded once per process
+        self.abort_controller = get_abort_controller()
         self._id = uuid.uuid4()
         self.created_dt = datetime.utcnow()
-        self.lock = threading.Lock()  # Add a threading lock
+        self.lock = threading.Lock()  # Serializes writers, readers are lock-free
+        self._dirty: Set[Tuple[str, ...]] = set()
+        self._deleted: Set[Tuple[str, ...]] = set()
+        self._persisted = False
+        self.run_state = None # set by the state machine for the duration of a run
         for k,v in init.items():
             self.set(k, v)
 
     def update(self, new_data: Dict) -> None:
         with self.lock:  # Acquire lock before updating
-            self.context_data.update(new_data)
+            root = dict(self.context_data)
+            root.update(new_data)
+            for k in new_data:
+                self._mark_dirty((k,))
+            self.context_data = root
+
+    def _mark_dirty(self, path: Tuple[str, ...]) -> None:
+        # Writing below a deleted path rewrites the whole deleted subtree
+        for deleted in [d for d in self._deleted if path[:len(d)] == d]:
+            self._deleted.discard(deleted)
+            path = deleted
+        self._deleted = {d for d in self._deleted if d[:len(path)] != path}
+        self._dirty.add(path)
+
+    def _mark_deleted(self, path: Tuple[str, ...]) -> None:
+        self._dirty = {d for d in self._dirty if d[:len(path)] != path}
+        # A dirty ancestor is written from its current value, which already lacks this path
+        if any(path[:len(d)] == d for d in self._dirty):
+            return
+        self._deleted.add(path)
+
+    # Drop paths already covered by a dirty ancestor, Mongo rejects
+    # overlapping paths in a single update
+    @staticmethod
+    def _collapse(paths: Set[Tuple[str, ...]]) -> List[Tuple[str, ...]]:
+        collapsed = []
+        for path in sorted(paths, key=len):
+            if not any(path[:len(p)] == p for p in collapsed):
+                collapsed.append(path)
+        return collapsed
+
+    def _lookup(self, root: Dict, path: Tuple[str, ...]) -> Tuple[bool, Any]:
+        value = root
+        for k in path:
+            if not isinstance(value, dict) or k not in value:
+                return False, None
+            value = value[k]
+        return True, value
 
     def save(self):
         collection = "context"
-        ctx = deepcopy(self.context_data)
-        if "task" in ctx:
-            del ctx["task"]
-        # Prepare the data to be inserted; only serialize what's necessary
-        data = {
-            "context_data": ctx,
-            "prompts": self.prompts,
-            "created_dt": self.created_dt,
-        }
+        with self.lock:
+            root = self.context_data
+            dirty = self._collapse(self._dirty)
+            deleted = [p for p in self._collapse(self._deleted) if not any(p[:len(d)] == d for d in dirty)]
+            self._dirty = set()
+            self._deleted = set()
+            persisted = self._persisted
+            self._persisted = True
+
+        try:
+            if not persisted:
+                # First save inserts the full document, the snapshot is immutable so no copy is needed
+                ctx = {k: v for k, v in root.items() if k != "task"}
+                # Prepare the data to be inserted; only serialize what's necessary
+                data = {
+                    "context_data": ctx,
+                    "prompts": dict(self.prompts),
+                    "created_dt": self.created_dt,
+                }
 
-        # Insert to the DB
-        self.db.create(collection, str(self._id), data)
+                # Insert to the DB
+                self.db.create(collection, str(self._id), data)
+                return
+
+            set_fields = {}
+            unset_fields = []
+            for path in dirty:
+                if path[0] == "task":
+                    continue
+                found, value = self._lookup(root, path)
+                if found:
+                    set_fields["context_data." + ".".join(path)] = value
+                else:
+                    unset_fields.append("context_data." + ".".join(path))
+            unset_fields.extend("context_data." + ".".join(p) for p in deleted if p[0] != "task")
+            if set_fields or unset_fields:
+                self.db.update(collection, str(self._id), set_fields, unset_fields)
+        except Exception:
+            # Put the changes back so the next save retries them
+            with self.lock:
+                self._dirty.update(dirty)
+                self._deleted.update(deleted)
+                self._persisted = persisted
+            raise
 
     def load(self, context_id: str):
         collection = "context"
@@ -61,15 +158,20 @@ class Context:
         stored_data = self.db.get(collection, context_id)
         
         if stored_data is not None:
+            stored_data.pop("_id", None)
             # Update the object with the loaded data
             self.__dict__.update(stored_data)
+            self._id = context_id
+            self._dirty = set()
+            self._deleted = set()
+            self._persisted = True
             
             # Initialize parser and abort_controller since they were skipped during serialization
             self.parser = Parser()
-            self.abort_controller = AbortController()
+            self.abort_controller = get_abort_controller()
 
     """
-    abort - Send a signal to the agent to abort a task
+    abort - Send a signal to every worker to abort this user's runs
     """
     def abort(self):
         user_id = self.get("input.user_id")
@@ -79,44 +181,69 @@ class Context:
     is_aborted - Check if the agent has sent a signal to abort a task
     """
     def is_aborted(self):
+        if self.run_state is not None and self.run_state.token.cancelled:
+            return True
         user_id = self.get("input.user_id")
         return self.abort_controller.get_signal(user_id)
 
+    """
+    cancel_siblings - Cancel speculative subroutines whose results are no longer needed
+
+    Called from a subroutine once it knows the parallel branches beside it
+    are wasted work, e.g. Intent routing the turn to a task.
+    """
+    def cancel_siblings(self):
+        if self.run_state is None:
+            return []
+        return self.run_state.cancel_siblings()
+
     # In the get method, we split the key using the dot
     # as a delimiter and then recursively fetch the value
-    # from the nested dictionary structure.
+    # from the nested dictionary structure. Reads walk an
+    # immutable snapshot of the root so no lock is needed.
     def get(self, key: str, default: str = None):
-        with self.lock:  # Acquire lock before accessing
-            keys = key.split('.')
-            value = self.context_data
-            for k in keys:
-                value = value.get(k, None)
-                if value is None or value == {} or value == [] or value == "":
-                    if default is not None:
-                        return default
-                    return None
-            return value
+        value = self.context_data
+        for k in split_key(key):
+            value = value.get(k, None) if isinstance(value, dict) else None
+            if value is None or value == {} or value == [] or value == "":
+                if default is not None:
+                    return default
+                return None
+        return value
 
     # In the set method, we split the key using the dot
-    # as a delimiter and then recursively set the value
-    # in the nested dictionary structure.
+    # as a delimiter and copy each dict along the path
+    # before setting the value, then swap in the new root.
     def set(self, key: str, value):
         if key == "response":
             logger.info(f"Setting response: {value}")
-        keys = key.split('.')
-        target = self.context_data
-        for k in keys[:-1]:
-            target = target.setdefault(k, {})
-        target[keys[-1]] = value
+        keys = split_key(key)
+        with self.lock:
+            root = dict(self.context_data)
+            target = root
+            for k in keys[:-1]:
+                child = target.get(k)
+                child = dict(child) if isinstance(child, dict) else {}
+                target[k] = child
+                target = child
+            target[keys[-1]] = value
+            self._mark_dirty(keys)
+            self.context_data = root
 
     def delete(self, key: str):
-        keys = key.split('.')
-        target = self.context_data
-        for k in keys[:-1]:
-            target = target.get(k, None)
-            if target is None:
+        keys = split_key(key)
+        with self.lock:
+            found, parent = self._lookup(self.context_data, keys[:-1])
+            if not found or not isinstance(parent, dict) or keys[-1] not in parent:
                 return
-        target.pop(keys[-1], None)
+            root = dict(self.context_data)
+            target = root
+            for k in keys[:-1]:
+                target[k] = dict(target[k])
+                target = target[k]
+            target.pop(keys[-1], None)
+            self._mark_deleted(keys)
+            self.context_data = root
 
     def pretty_print(self, key=None):
         if key is None:
@@ -154,13 +281,15 @@ class Context:
             return True
     
     def get_messages(self, prefix="", postfix="", n=None):
+        messages = self.get_message_list(prefix=prefix, postfix=postfix, n=n)
+        return " ".join(messages), len(messages)
+
+    # Rendered messages before the current one, get_messages joins them with spaces
+    def get_message_list(self, prefix="", postfix="", n=None):
         messages = []
         input_messages = self.get('input.messages')
         if input_messages is None:
-            return "", 0
-
-        if input_messages is None:
-            return "", 0
+            return messages
 
         # If n is provided and valid, slice the input_messages to get the last n items
         if n is not None and n > 0:
@@ -173,13 +302,13 @@ class Context:
                 elif message['role'] == 'assistant':
                     messages.append(message['content'])
 
-        return " ".join(messages), len(messages)
+        return messages
 
     def format_template(self, prompt_template, **kwargs):
         logger.info("FORMAT_TEMPLATE")
         logger.info(kwargs)
-        # Find all placeholders in the prompt_template
-        template = Template(prompt_template)
+        # Compiled templates are cached on their source by the prompt registry
+        template = compile_template(prompt_template)
         rendered_str = template.render(kwargs)
         logger.info("INPUT")
         rendered_str= re.sub(r'\n+', '\n', rendered_str)
@@ -259,6 +388,7 @@ class Context:
     def get_model_input(self):
         return {
             "user_id": self.get("input.user_id"),
+            "stream_id": self.get("input.stream_id"),
             "session_id": self.get("input.id"),
             "prompt": self.get('prompt'),
             "generation_config": self.get('model.generation_config'),
@@ -266,15 +396,7 @@ class Context:
         }
 
     def read_prompts(self):
-        directory = os.path.join(os.path.dirname(__file__), './prompts')
-        prompts_dict = {}
-        for filename in os.listdir(directory):
-            file_path = os.path.join(directory, filename)
-            if os.path.isfile(file_path):
-                with open(file_path, 'r') as file:
-                    content = file.read()
-                    prompts_dict[filename] = content
-        return prompts_dict
+        return dict(prompt_registry)
 
     def process_prompt(self, prompt: str, values: Dict) -> str:
         for k,v in values.items():
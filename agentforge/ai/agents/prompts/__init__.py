@@ -0,0 +1,3 @@
+from .registry import PromptRegistry, prompt_registry, compile_template
+
+__all__ = ["PromptRegistry", "prompt_registry", "compile_template"]
@@ -0,0 +1,101 @@
+import os, threading, time
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Dict, Iterator, Optional, Tuple
+from jinja2 import Template
+from agentforge.utils import logger
+
+PROMPT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+# Seconds between checks of the prompt directory for edits, 0 checks on every lookup
+PROMPT_RELOAD_INTERVAL = float(os.getenv("PROMPT_RELOAD_INTERVAL", 5))
+# Maximum number of distinct template sources kept compiled
+TEMPLATE_CACHE_SIZE = int(os.getenv("PROMPT_TEMPLATE_CACHE_SIZE", 256))
+
+"""
+compile_template - Returns a compiled jinja2 Template for a template source
+
+Parsing a template is far more expensive than rendering it, so compiled
+templates are memoized on their source string.
+"""
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(source: str) -> Template:
+    return Template(source)
+
+"""
+PromptRegistry - Process wide, read-only view of the prompt directory
+
+The directory is read once and each prompt is compiled on load. Lookups
+are served from memory; at most every PROMPT_RELOAD_INTERVAL seconds the
+registry stats the directory and reloads files whose mtime changed, so
+editing a prompt does not require a restart.
+
+The registry behaves like the Dict[str, str] previously returned by
+Context.read_prompts, keyed by filename.
+
+Input:
+    directory: str - directory containing *.prompt files
+    reload_interval: float - seconds between freshness checks
+"""
+class PromptRegistry(Mapping):
+    def __init__(self, directory: str = PROMPT_DIRECTORY, reload_interval: float = PROMPT_RELOAD_INTERVAL) -> None:
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self.lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, str, Template]] = {}
+        self._last_check = 0.0
+        self.refresh(force=True)
+
+    def _is_prompt(self, filename: str) -> bool:
+        return not filename.startswith(("_", ".")) and not filename.endswith((".py", ".pyc"))
+
+    def refresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_check < self.reload_interval:
+            return
+        with self.lock:
+            if not force and now - self._last_check < self.reload_interval:
+                return
+            self._last_check = now
+            entries = dict(self._entries)
+            seen = set()
+            for filename in os.listdir(self.directory):
+                file_path = os.path.join(self.directory, filename)
+                if not self._is_prompt(filename) or not os.path.isfile(file_path):
+                    continue
+                seen.add(filename)
+                mtime = os.stat(file_path).st_mtime
+                if filename in entries and entries[filename][0] == mtime:
+                    continue
+                with open(file_path, 'r') as file:
+                    source = file.read()
+                entries[filename] = (mtime, source, compile_template(source))
+                logger.info(f"Loaded prompt {filename}")
+            for filename in set(entries) - seen:
+                del entries[filename]
+            # Swap in one assignment so readers never see a partial update
+            self._entries = entries
+
+    def __getitem__(self, name: str) -> str:
+        self.refresh()
+        return self._entries[name][1]
+
+    def __iter__(self) -> Iterator[str]:
+        self.refresh()
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._entries)
+
+    def get_template(self, name: str) -> Optional[Template]:
+        self.refresh()
+        entry = self._entries.get(name)
+        return entry[2] if entry is not None else None
+
+    def render(self, name: str, **kwargs) -> str:
+        template = self.get_template(name)
+        if template is None:
+            raise KeyError(f"Prompt {name} does not exist")
+        return template.render(kwargs)
+
+prompt_registry = PromptRegistry()
@@ -1,10 +1,11 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Set
 from agentforge.ai.routines.reactive import ReactiveRoutine
 from agentforge.ai.routines.planning import PlanningRoutine
+from agentforge.ai.routines.registry import TaskRegistry
 from agentforge.ai.beliefs.memory import Memory
-from agentforge.ai.agents.statemachine import StateMachine
-from agentforge.ai.agents.context import Context
-import threading, json, os
+from agentforge.ai.agents.statemachine import StateMachine, CompiledRoutine, RunState
+from agentforge.ai.agents.context import Context, get_abort_controller
+import asyncio, threading, json, os
 from agentforge.utils import logger
 
 def load(root_directory):
@@ -37,36 +38,94 @@ class SimpleAgent:
         #     prompts = plan["prompts"]
         #     goals = plan["goals"]
         #     self.task_routines[key] = PlanningRoutine(key, prompts, goals)
+        # Embed the plan prompts of every task routine in one batch, unchanged ones are skipped
+        TaskRegistry().register(self.task_routines.values())
 
-    def run(self, input: Dict[str, Any]) -> Dict[str, Any]:
-        self.context = Context(input)
+        # Compile the routine graph once, every request gets its own RunState
+        self.state_machine = StateMachine(CompiledRoutine(self.routine.subroutines), self.task_routines)
+        self.background_runs = set()
+        self.active_runs: Dict[str, Set[RunState]] = {}
+        self.lock = threading.Lock()
+        # Abort signals from any worker cancel the matching runs on this one
+        self.abort_controller = get_abort_controller()
+        self.abort_controller.subscribe(self.abort_local)
+
+    def create_context(self, input: Dict[str, Any]) -> Context:
+        context = Context(input)
 
         # load prefix/postfix for prompt and setup memory
-        prefix = self.context.get('model.model_config.prefix')
-        postfix = prefix = self.context.get('model.model_config.postfix')
-        self.context.memory = Memory(prefix, postfix)
+        prefix = context.get('model.model_config.prefix')
+        postfix = prefix = context.get('model.model_config.postfix')
+        context.memory = Memory(prefix, postfix)
 
         # add task routines to context
-        self.context.task_routines = self.task_routines #add to context for reference in routines
-
-        # Decide whether to run synchronously or asynchronously based on the streaming configuration
-        if self.context.get('model.model_config.streaming'):
-            # Asynchronous execution
-            try:
-                state_machine = StateMachine(self.routine.subroutines, self.task_routines)
-                threading.Thread(target=state_machine.run, args=(self.context,)).start()
-            except Exception as e:
-                logger.info(f"Error starting thread: {str(e)}")
-        else:
-            # Synchronous execution
-            try:
-                state_machine = StateMachine(self.routine.subroutines, self.task_routines)
-                return state_machine.run(self.context)
-            except Exception as e:
-                logger.info(f"Error in state machine execution: {str(e)}")
+        context.task_routines = self.task_routines #add to context for reference in routines
+        return context
+
+    async def arun(self, input: Dict[str, Any], wait: bool = False) -> Dict[str, Any]:
+        context = self.create_context(input)
+        # A new turn starts clean, an abort sent for the previous turn does not apply
+        self.abort_controller.clear_signal(context.get('input.user_id'))
+        state = self.state_machine.create_run(context)
+
+        # Decide whether to wait on the routine or let it stream in the background
+        if context.get('model.model_config.streaming') and not wait:
+            task = asyncio.create_task(self.execute(state))
+            # Hold a reference so the task is not garbage collected mid-run
+            self.background_runs.add(task)
+            task.add_done_callback(self.background_runs.discard)
+            return True
 
+        try:
+            return await self.execute(state)
+        except Exception as e:
+            logger.info(f"Error in state machine execution: {str(e)}")
         return True
-    
-    def abort(self):
-        self.context.abort()
+
+    async def execute(self, state: RunState) -> Dict[str, Any]:
+        user_id = state.context.get('input.user_id')
+        with self.lock:
+            self.active_runs.setdefault(user_id, set()).add(state)
+        # The abort may have arrived between clearing the signal and registering the run
+        if self.abort_controller.get_signal(user_id):
+            state.abort()
+        try:
+            return await self.state_machine.arun(state.context, state)
+        finally:
+            with self.lock:
+                runs = self.active_runs.get(user_id, set())
+                runs.discard(state)
+                if not runs:
+                    self.active_runs.pop(user_id, None)
+
+    # Blocking entrypoint for callers without an event loop (scripts, workers)
+    def run(self, input: Dict[str, Any]) -> Dict[str, Any]:
+        if self.is_streaming(input):
+            # One driver thread per run, nodes still share the executor pool
+            threading.Thread(target=asyncio.run, args=(self.arun(input, wait=True),), daemon=True).start()
+            return True
+        return asyncio.run(self.arun(input))
+
+    def is_streaming(self, input: Dict[str, Any]) -> bool:
+        return bool(input.get("model", {}).get("model_config", {}).get("streaming"))
+
+    """
+    abort - Abort the in-flight runs of a user on every worker
+
+    Without a user_id only the runs on this worker are aborted.
+    """
+    def abort(self, user_id: Optional[str] = None):
+        if user_id is None:
+            return self.abort_local()
+        self.abort_controller.send_signal(user_id)
+        return True
+
+    def abort_local(self, user_id: Optional[str] = None):
+        with self.lock:
+            if user_id is None:
+                runs = [state for states in self.active_runs.values() for state in states]
+            else:
+                runs = list(self.active_runs.get(user_id, set()))
+        for state in runs:
+            state.abort()
         return True
@@ -1,45 +1,326 @@
-import threading
-from typing import Dict, Any, List, Protocol, Optional, Callable
+import asyncio, concurrent.futures, contextvars, os, threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Dict, Any, List, Protocol, Optional, Callable, Union
 from agentforge.ai.routines.routine import Routine
-from agentforge.utils import logger
-from queue import Queue
+from agentforge.utils import logger, span, CancellationToken
+from agentforge.utils.cancellation import current_token
+from agentforge.exceptions import SubroutineCancelled, SubroutineException
 
+# Upper bound on nodes executing at once for a single run
+MAX_NODE_CONCURRENCY = int(os.getenv("AGENT_MAX_NODE_CONCURRENCY", 4))
+# Default per-node timeout in seconds, a node may override it
+NODE_TIMEOUT = float(os.getenv("AGENT_NODE_TIMEOUT", 120))
+# Threads shared by every run for subroutines that block (HTTP, DB, vectorstore)
+EXECUTOR_WORKERS = int(os.getenv("AGENT_EXECUTOR_WORKERS", 32))
+# Timed out subroutines still holding an executor thread, blocking nodes are refused beyond this
+MAX_ABANDONED_NODES = int(os.getenv("AGENT_MAX_ABANDONED_NODES", max(1, EXECUTOR_WORKERS // 2)))
+
+_executor = None
+_executor_lock = threading.Lock()
+_abandoned = 0
+_abandoned_lock = threading.Lock()
+
+# Node currently executing, visible to the subroutine and anything it calls
+current_node: ContextVar[Optional['Node']] = ContextVar("current_node", default=None)
+
+"""
+get_executor - Process wide thread pool used to run blocking subroutines
+
+Every agent run shares this pool instead of spawning a thread per node,
+so the number of OS threads is bounded by AGENT_EXECUTOR_WORKERS no matter
+how many chats are in flight.
+"""
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="subroutine")
+    return _executor
+
+# Blocking subroutines that timed out but have not returned yet
+def abandoned_nodes() -> int:
+    return _abandoned
+
+def _abandon(name: str, future: concurrent.futures.Future) -> None:
+    global _abandoned
+    with _abandoned_lock:
+        _abandoned += 1
+    def release(_):
+        global _abandoned
+        with _abandoned_lock:
+            _abandoned -= 1
+        logger.info(f"Timed out node {name} released its executor thread")
+    future.add_done_callback(release)
+
+"""
+Node - A subroutine and the nodes it depends on
+
+Input:
+    execute: Callable - the subroutine, a plain function or a coroutine function
+    dependencies: List[Node] - nodes that must finish before this one starts
+    timeout: float - optional per-node timeout overriding the state machine default
+    speculative: bool - the node may be started early and cancelled by a sibling
+        that decides its result is not needed (see Context.cancel_siblings)
+
+A blocking subroutine cannot be stopped from outside its thread. On timeout
+its token is cancelled and the node is reported as timed out, but the
+thread is only freed once the subroutine reaches a check_cancelled() or
+its HTTP call is closed through on_cancel() or times out. Until then it holds a slot in
+the shared executor, new blocking nodes are refused while
+AGENT_MAX_ABANDONED_NODES threads are held that way so they cannot exhaust it.
+"""
 class Node:
-    def __init__(self, execute: Callable[[Dict[str, Any]], Dict[str, Any]], dependencies: List['Node']):
+    def __init__(self, execute: Callable[[Dict[str, Any]], Dict[str, Any]], dependencies: List['Node'],
+                 timeout: Optional[float] = None, speculative: bool = False):
         self.execute = execute
         self.dependencies = dependencies
-        self.finished = threading.Event()
+        self.timeout = timeout
+        self.speculative = speculative
+
+    @property
+    def name(self) -> str:
+        return getattr(self.execute, "__qualname__", getattr(self.execute, "__name__", repr(self.execute)))
+
+    def _enter(self, token: Optional[CancellationToken]) -> None:
+        current_node.set(self)
+        current_token.set(token)
+
+    def _call(self, token: Optional[CancellationToken], context: Dict[str, Any]) -> Dict[str, Any]:
+        self._enter(token)
+        if token is not None:
+            token.raise_if_cancelled()
+        return self.execute(context)
+
+    async def run(self, context: Dict[str, Any], timeout: Optional[float] = None,
+                  token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        logger.info(f"Running Node: {self.name}")
+        if token is not None:
+            token.raise_if_cancelled()
+        timeout = self.timeout if self.timeout is not None else timeout
+        with span(f"node:{self.name}"):
+            # Each node runs in its own copy of the contextvars so the token and node stay local to it
+            node_context = contextvars.copy_context()
+            if asyncio.iscoroutinefunction(self.execute):
+                node_context.run(self._enter, token)
+                # Tasks inherit the context they are created in
+                task = node_context.run(asyncio.ensure_future, self.execute(context))
+                return await asyncio.wait_for(task, timeout)
+
+            # Blocking subroutine -- hand it to the shared executor so the event loop stays free
+            if _abandoned >= MAX_ABANDONED_NODES:
+                raise SubroutineException(f"{_abandoned} timed out subroutines still hold executor threads")
+            future = get_executor().submit(node_context.run, self._call, token, context)
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if token is not None:
+                    token.cancel("Node timed out" if isinstance(e, asyncio.TimeoutError) else "Node cancelled")
+                # Not started yet is cancelled outright, a running thread keeps its slot until it returns
+                if not future.cancel():
+                    _abandon(self.name, future)
+                raise
+
+"""
+CompiledRoutine - Immutable, validated dependency graph of a routine
+
+Built once when the agent starts. Nodes are stored in topological order
+with their dependencies resolved to indices, so a run only needs to
+allocate its own RunState and never touches shared mutable state.
 
-    def run(self, context: Dict[str, Any], tasks: Dict[str, Routine]) -> Dict[str, Any]:
-        for dependency in self.dependencies:
-            dependency.finished.wait()  # Wait until the dependency has finished
+Input:
+    nodes: List[Node] - nodes of the routine, dependencies must be in the list
+"""
+class CompiledRoutine:
+    __slots__ = ("nodes", "dependencies", "ancestors", "index")
 
-        logger.info(f"Running Node: {self.execute.__name__}")
-        context = self.execute(context)
+    def __init__(self, nodes: List[Node]):
+        ordered = self._topological_order(nodes)
+        index = {node: i for i, node in enumerate(ordered)}
+        dependencies = tuple(
+            tuple(index[dependency] for dependency in node.dependencies) for node in ordered
+        )
+        ancestors = []
+        for i in range(len(ordered)):
+            found = set(dependencies[i])
+            for d in dependencies[i]:
+                found |= ancestors[d]
+            ancestors.append(frozenset(found))
+        object.__setattr__(self, "nodes", tuple(ordered))
+        object.__setattr__(self, "dependencies", dependencies)
+        object.__setattr__(self, "ancestors", tuple(ancestors))
+        object.__setattr__(self, "index", index)
 
-        self.finished.set()  # Signal that this node has finished
-        return context
+    """
+    siblings - Speculative nodes on a different branch than node i
 
-    def reset(self):
-        self.finished.clear()  # Reset the finished event
+    A sibling is neither an ancestor nor a descendant of the node, so its
+    result cannot be something the node is waiting on or producing.
+    """
+    def siblings(self, i: int) -> List[int]:
+        return [
+            j for j, node in enumerate(self.nodes)
+            if j != i and node.speculative and j not in self.ancestors[i] and i not in self.ancestors[j]
+        ]
 
+    def __setattr__(self, key, value):
+        raise AttributeError("CompiledRoutine is immutable")
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    @staticmethod
+    def _topological_order(nodes: List[Node]) -> List[Node]:
+        known = set(nodes)
+        for node in nodes:
+            for dependency in node.dependencies:
+                if dependency not in known:
+                    raise ValueError(f"Node {node.name} depends on {dependency.name} which is not part of the routine")
+
+        # Kahn's algorithm, ties keep the declared order
+        remaining = {node: len(set(node.dependencies)) for node in nodes}
+        dependents = {node: [] for node in nodes}
+        for node in nodes:
+            for dependency in set(node.dependencies):
+                dependents[dependency].append(node)
+        ready = [node for node in nodes if remaining[node] == 0]
+        ordered = []
+        while ready:
+            node = ready.pop(0)
+            ordered.append(node)
+            for dependent in dependents[node]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+        if len(ordered) != len(nodes):
+            raise ValueError("Routine has a dependency cycle")
+        return ordered
+
+"""
+RunState - Per-request execution state for a CompiledRoutine
+
+Holds everything that changes during a run (the context, the scheduled
+tasks, the cancellation tokens and the outcome of each node) so
+concurrent runs of the same routine never share events or results.
+"""
+class RunState:
+    def __init__(self, routine: CompiledRoutine, context: Dict[str, Any]):
+        self.routine = routine
+        self.context = context
+        self.tasks: List[Optional[asyncio.Task]] = [None] * len(routine)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.results: Dict[str, str] = {}
+        self.token = CancellationToken()
+        self.tokens = [CancellationToken(parent=self.token) for _ in routine.nodes]
+        try:
+            context.run_state = self # lets subroutines reach the run through the context
+        except AttributeError:
+            pass
+
+    def abort(self) -> None:
+        self.token.cancel("Run aborted")
+
+    """
+    cancel_siblings - Cancel the speculative branches running beside a node
+
+    Defaults to the node currently executing. Cancellation reaches blocking
+    subroutines through their token and coroutine subroutines through
+    task cancellation. Dependents of a cancelled node still run.
+    """
+    def cancel_siblings(self, node: Optional[Node] = None) -> List[str]:
+        node = node if node is not None else current_node.get()
+        if node is None or node not in self.routine.index:
+            return []
+        cancelled = []
+        for j in self.routine.siblings(self.routine.index[node]):
+            sibling = self.routine.nodes[j]
+            task = self.tasks[j]
+            if task is not None and task.done():
+                continue
+            self.tokens[j].cancel(f"Cancelled by {node.name}")
+            if task is not None and self.loop is not None:
+                # Blocking subroutines call this from an executor thread
+                self.loop.call_soon_threadsafe(task.cancel)
+            self.results[sibling.name] = "cancelled"
+            cancelled.append(sibling.name)
+        if cancelled:
+            logger.info(f"Node {node.name} cancelled speculative siblings: {cancelled}")
+        return cancelled
+
+"""
+StateMachine - Executes a compiled routine as a dependency graph on asyncio
+
+Each node is scheduled as a coroutine that first awaits its dependencies,
+then runs once a slot in the bounded pool is free. Nodes that fail, time
+out or are cancelled are logged and their dependents still run, matching
+the previous thread-per-node behaviour where a failed thread never
+blocked the others. Cancelling the run cancels every node still running. Independent nodes start together, so speculative
+branches only cost the wall-clock of the longest branch that is kept.
+
+Input:
+    routine: CompiledRoutine or List[Node] - the graph to execute
+    tasks: Dict[str, Routine] - task routines available to the nodes
+    max_concurrency: int - maximum number of nodes executing at once
+    timeout: float - default per-node timeout in seconds
+"""
 class StateMachine:
-    def __init__(self, nodes: List[Node], tasks: Dict[str, Routine]):
-        self.nodes = nodes
+    def __init__(self, routine: Union[CompiledRoutine, List[Node]], tasks: Dict[str, Routine],
+                 max_concurrency: int = MAX_NODE_CONCURRENCY, timeout: Optional[float] = NODE_TIMEOUT):
+        self.routine = routine if isinstance(routine, CompiledRoutine) else CompiledRoutine(routine)
         self.tasks = tasks
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
 
-    def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        for node in self.nodes:
+    def create_run(self, context: Dict[str, Any]) -> RunState:
+        return RunState(self.routine, context)
+
+    async def arun(self, context: Dict[str, Any], state: Optional[RunState] = None) -> Dict[str, Any]:
+        state = state if state is not None else self.create_run(context)
+        state.loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run_node(i: int, node: Node) -> None:
+            dependencies = [state.tasks[d] for d in self.routine.dependencies[i]]
+            if dependencies:
+                await asyncio.wait(dependencies)  # Wait until the dependencies have finished
             try:
-                threading.Thread(target=node.run, args=(context, self.tasks)).start()
+                async with semaphore:
+                    await node.run(state.context, self.timeout, state.tokens[i])
+                state.results[node.name] = "done"
+            except asyncio.CancelledError:
+                state.results[node.name] = "cancelled"
+                logger.info(f"Node {node.name} cancelled")
+                raise
+            except SubroutineCancelled:
+                state.results[node.name] = "cancelled"
+                logger.info(f"Node {node.name} cancelled")
+            except asyncio.TimeoutError:
+                state.results[node.name] = "timeout"
+                state.tokens[i].cancel("Node timed out")
+                logger.error(f"Node {node.name} timed out after {node.timeout or self.timeout}s")
             except Exception as e:
-                logger.info(f"Error starting thread: {str(e)}")
+                state.results[node.name] = "failed"
+                logger.error(f"Error in node {node.name}: {str(e)}")
+
+        # Node spans become children of the run span through the task's copied context
+        with span("routine.run", user_id=state.context.get('input.user_id')):
+            # Topological order guarantees dependencies are scheduled first
+            for i, node in enumerate(self.routine.nodes):
+                state.tasks[i] = asyncio.create_task(run_node(i, node))
 
-        for node in self.nodes:
-            node.finished.wait()  # Wait until the node has finished
-        self.reset()  # Reset the nodes when all have finished
-        return context
+            try:
+                if state.tasks:
+                    await asyncio.wait(state.tasks)
+            finally:
+                # The run itself was cancelled, e.g. the client went away -- stop its nodes with it
+                pending = [task for task in state.tasks if task is not None and not task.done()]
+                if pending:
+                    state.abort()
+                    for task in pending:
+                        task.cancel()
+                    await asyncio.gather(*pending, return_exceptions=True)
+        return state.context
 
-    def reset(self):
-        for node in self.nodes:
-            node.reset()  # Reset each node
+    def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        return asyncio.run(self.arun(context))
@@ -3,8 +3,10 @@ from typing import Any, Tuple
 from agentforge.interfaces import interface_interactor
 from agentforge.ai.attention.tasks import TaskManager
 from agentforge.utils.stream import stream_string
+from agentforge.interfaces.redisstream import stream_key
 from agentforge.ai.agents.context import Context
 from agentforge.utils import logger
+from agentforge.ai.routines.memoize import memoize
 
 ### ATTENTION: Identify user intent -- This is always first step in a routine
 ### Here we determine what our current attention should focus on, the task at hand.
@@ -15,6 +17,7 @@ class Intent:
         self.task_management = TaskManager()
         self.vectorstore = interface_interactor.get_interface("vectorstore")
 
+    @memoize()
     def search(self, user_query: str) -> Tuple[str, float]:
         # Search the vectorstore for the top result based on the user query
         results = self.vectorstore.search_with_score(
@@ -67,14 +70,14 @@ class Intent:
             # If the predicate memory attention does not exist, feed plan queries into the current attention
 
             response = "Okay let's formulate a plan."
-            stream_string(f"streaming-{context.get('input.user_id')}", response, end_token=" ")
+            stream_string(stream_key(context.get('input.user_id'), context.get('input.stream_id')), response, end_token=" ")
             return new_task
         else:
             tasks = self.task_management.get_tasks(user_id, session_id, task_name)
             response = "Do you want to talk about\n"
             for task in tasks:
                 response += f"{task['name']}\n"
-            stream_string(f"streaming-{context.get('input.user_id')}", response, end_token=" ")
+            stream_string(stream_key(context.get('input.user_id'), context.get('input.stream_id')), response, end_token=" ")
             # TODO: Make channel user specific, make text plan specific  
             return tasks[0]
         
@@ -92,6 +95,8 @@ class Intent:
         active_task = self.task_management.active_task(user_id, agent_id)
 
         if active_task is not None:
+            # the turn belongs to the task, speculative chat branches are wasted work
+            context.cancel_siblings()
             context.set("task", active_task)
             context = active_task.run(context)
             return context
@@ -102,6 +107,7 @@ class Intent:
             # just bante'r, no tasks here!
             return context
         else:
+            context.cancel_siblings()
             context.set("task", task)
             context = task.run(context)
             return context
@@ -1,7 +1,6 @@
-import torch
 import numpy as np
-from transformers import BertTokenizer, BertModel
 from agentforge.ai.beliefs.linker import EntityLinker
+from agentforge.interfaces.embeddings import get_embeddings
 from fuzzywuzzy import fuzz
 
 ### The OPQL memory is a key-value memory. Keys are computed from embeddings of the topic
@@ -16,21 +15,32 @@ class OPQLMemory:
         self.ovalues = []
         self.triplets = []
         self.fuzzy_weight = .5
-        self.model = None
-        self.tokenizer = None
+        self.embeddings = None
+        self.embedding_model = None # model the keys were computed with
 
     def startup(self):
-        if self.model == None:
-            self.tokenizer = BertTokenizer.from_pretrained('bert-base-uncased')
-            self.model = BertModel.from_pretrained('bert-base-uncased')
+        if self.embeddings is None:
+            self.embeddings = get_embeddings()
+        # Keys computed with another model are rebuilt from the stored triplets in one batch
+        model_name = getattr(self.embeddings, "model_name", None)
+        if self.embedding_model != model_name:
+            self.keys = self._keys([t[0] for t in self.triplets], [t[1] for t in self.triplets])
+            self.embedding_model = model_name
+
+    # Key is the relation embedding followed by the entity embedding, both unit length
+    def _keys(self, entities, relations):
+        if not entities:
+            return []
+        vectors = np.array(self.embeddings.embed_documents(list(relations) + list(entities)), dtype=np.float32)
+        n = len(entities)
+        return list(np.concatenate([vectors[:n], vectors[n:]], axis=-1))
    
     def serialize(self) -> dict:
         # Convert the object to a dictionary
         data = self.__dict__.copy()
         
         # Remove the attributes we don't want to serialize
-        del data['tokenizer']
-        del data['model']
+        del data['embeddings']
         
         return data
 
@@ -39,26 +49,11 @@ class OPQLMemory:
         # Create a new object and populate it from the dictionary
         obj = cls()
         obj.__dict__.update(data)
-
-        # Initialize tokenizer and model
-        obj.tokenizer = BertTokenizer.from_pretrained('bert-base-uncased')
-        obj.model = BertModel.from_pretrained('bert-base-uncased')
-
         return obj
 
     def set(self, obj, relation, subj):
         self.startup()
-        entity_inputs = self.tokenizer(obj, return_tensors="pt")
-        entity_outputs = self.model(**entity_inputs)
-        entity_embedding = entity_outputs.last_hidden_state.mean(dim=1)
-
-        relation_inputs = self.tokenizer(relation, return_tensors="pt")
-        relation_outputs = self.model(**relation_inputs)
-        relation_embedding = relation_outputs.last_hidden_state.mean(dim=1)
-
-        key = torch.cat([relation_embedding, entity_embedding], dim=-1)
-
-        self.keys.append(key.detach().numpy().flatten())
+        self.keys.extend(self._keys([obj], [relation]))
         self.svalues.append(subj)
         self.pvalues.append(relation)
         self.ovalues.append(obj)
@@ -69,34 +64,25 @@ class OPQLMemory:
         if entity_name in self.svalues:
             idx = self.svalues.index(entity_name)
             return [(self.keys[idx], self.ovalues[idx], 1.0)]
+        if len(self.keys) == 0:
+            return []
 
         relation = f"[ENT] [R1] {relation} [ENT] [R2]" # for OPQL format
-        relation_inputs = self.tokenizer(relation, return_tensors="pt")
-        relation_embedding = self.model(**relation_inputs).last_hidden_state.mean(dim=1)
-
-        entity_inputs = self.tokenizer(entity_name, return_tensors="pt")
-        entity_embedding = self.model(**entity_inputs).last_hidden_state.mean(dim=1)
-
-        query_for_most_similar = torch.cat([relation_embedding, entity_embedding], dim=-1)
+        query = self._keys([entity_name], [relation])[0]
 
+        # Both halves are unit vectors, half the dot product is the mean cosine similarity in [-1, 1]
         k = min(k, len(self.keys))
-        query = torch.tensor(query_for_most_similar.detach().numpy().flatten())
-        keys = torch.tensor(np.stack(self.keys))
-        dot_products = torch.matmul(keys, query.t())
-
-        # Apply softmax to normalize scores
-        similarity_scores = torch.nn.functional.softmax(dot_products, dim=-1)
-
-        # Get top k similarity scores and indices
-        top_scores, top_indices = torch.topk(similarity_scores, k, dim=-1)
+        similarity_scores = np.stack(self.keys) @ query / 2
+        top_indices = np.argsort(-similarity_scores)[:k]
 
         results = []
 
-        for index, score in zip(top_indices, top_scores):
+        for index in top_indices:
+            score = float(similarity_scores[index])
             stored_entity = self.ovalues[index]
             fuzzy_score = fuzz.ratio(entity_name, stored_entity) / 100.0 # Fuzzy score on a scale of 0 to 1
             # Combine the fuzzy score and similarity score
-            combined_score = fuzzy_score * score.item()
+            combined_score = fuzzy_score * score
 
             # Apply threshold if provided
             if threshold is None or combined_score >= threshold:
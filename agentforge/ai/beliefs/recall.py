@@ -2,12 +2,19 @@ from typing import Any, Dict
 from agentforge.ai.agents.context import Context
 from agentforge.utils import logger
 from agentforge.ai.reasoning.zeroshot import ZeroShotClassifier
+from agentforge.ai.routines.memoize import memoize_subroutine
 
 ### BELIEFS: Recalls a memory given the context
 class Recall:
     def __init__(self):
         self.z = ZeroShotClassifier()
     
+    @memoize_subroutine(
+        keys=['input.user_id', 'model.persona.name', 'instruction'],
+        outputs=['knowledge', 'additional_knowledge'],
+        # The user's knowledge changes during a conversation, only a repeated turn should hit
+        ttl=60
+    )
     def execute(self, context: Context) -> Dict[str, Any]:
         msgs, msg_cnt = context.get_messages(prefix="", postfix="", n=2)
         # memories = context.memory.recall(
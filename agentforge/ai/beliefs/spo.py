@@ -1,9 +1,8 @@
 from datetime import datetime
 from typing import List, Tuple, Optional
 from pydantic import BaseModel, Field
-from transformers import BertTokenizer, BertModel
-import torch
 import numpy as np
+from agentforge.interfaces.embeddings import get_embeddings
 
 class SPOTriplet(BaseModel):
     subject: str
@@ -17,18 +16,14 @@ class SPOTriplet(BaseModel):
 
 class KnowledgeGraph:
     def __init__(self, semantic_weight=0.5, recency_weight=0.25, relevance_weight=0.25, time_decay=0.99):
-        self.tokenizer = BertTokenizer.from_pretrained('bert-base-uncased')
-        self.model = BertModel.from_pretrained('bert-base-uncased')
+        self.embeddings = get_embeddings()
         self.time_decay = time_decay
         self.semantic_weight = semantic_weight
         self.recency_weight = recency_weight
         self.relevance_weight = relevance_weight
 
     def _get_embedding(self, text: str):
-        inputs = self.tokenizer(text, return_tensors="pt")
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-        return outputs.last_hidden_state.mean(dim=1).squeeze().numpy()
+        return np.array(self.embeddings.embed_query(text))
 
     def _calculate_similarity(self, vec1: np.array, vec2: np.array, recency: float):
         semantic_similarity = np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
@@ -44,12 +39,10 @@ class KnowledgeGraph:
         return recency
 
     def add_triplet(self, triplet: SPOTriplet):
-        embedding_length = self._get_embedding(triplet.subject).shape[0]
-        concatenated_embedding = np.concatenate([
-            self._get_embedding(triplet.subject),
-            self._get_embedding(triplet.predicate),
-            self._get_embedding(triplet.object)
-        ])
+        # Subject, predicate and object embedded in one call
+        embeddings = np.array(self.embeddings.embed_documents([triplet.subject, triplet.predicate, triplet.object]))
+        embedding_length = embeddings.shape[1]
+        concatenated_embedding = embeddings.reshape(-1)
         text_representation = f"{triplet.subject} {triplet.predicate} {triplet.object}"
         self.graph['subject'].append({'text': triplet.subject, 'embedding': concatenated_embedding[:embedding_length], 'timestamp': triplet.timestamp})
         self.graph['predicate'].append({'text': triplet.predicate, 'embedding': concatenated_embedding[embedding_length:2*embedding_length], 'timestamp': triplet.timestamp})
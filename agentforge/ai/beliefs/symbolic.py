@@ -13,6 +13,9 @@ from nltk.corpus import wordnet as wn
 from agentforge.utils import logger
 import pickle
 
+# Labels learn() understands for boolean queries, anything else is unknown
+BOOLEAN_CHOICES = ["Yes", "No", "None"]
+
 """
     Split conditional PDDL statement -- maybe move this to PDDL module
     Input: query_str - string with OR conditions "seed-availabel ?plant OR clone-avail ?plant"
@@ -127,7 +130,9 @@ class SymbolicMemory:
         prompt = context.process_prompt(prompt, cot_args)
 
         # args = {"query": query['text'], }
-        results = self.classifier.classify(cot_args, prompt, context)
+        # Booleans have a closed label set, the classifier can constrain the LLM to it
+        choices = BOOLEAN_CHOICES if query['datatype'] == "boolean" and " OR " not in condition else None
+        results = self.classifier.classify(cot_args, prompt, context, choices=choices)
         if len(results) == 0:
             logger.info("Error with classification. See logs.")
             return False, []
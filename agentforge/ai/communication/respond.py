@@ -97,6 +97,8 @@ class Respond:
             "generation_config": generation_config.to_dict(),
             "model_config": model_config,
             "user_id": context.get("input.user_id"),
+            "stream_id": context.get("input.stream_id"),
+            "coalesce": context.get("input.coalesce"),
             "user_name": context.get("input.user_name"),
             "agent_name": context.get("model.persona.display_name"),
         }
@@ -1,63 +1,133 @@
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 from agentforge.interfaces import interface_interactor
-import base64
 import asyncio
-import re, os, json, time, threading
-from agentforge.utils import logger
+import re, os, json, queue, time, threading
+from agentforge.utils import logger, metrics
+from agentforge.interfaces.redisstream import STREAM_TTL, stream_key, media_channel, split_end
+from agentforge.interfaces.streambus import get_stream_bus
+
+# Sentences waiting for TTS and clips waiting for lip sync, synthesis runs at most this far ahead of delivery
+SPEAK_PIPELINE_DEPTH = int(os.getenv("SPEAK_PIPELINE_DEPTH", 2))
+# End of a sentence, at the end of the text so far or before the next word
+SENTENCE_BOUNDARY = re.compile(r'[.!?]+["\')\]]*(\s+|$)')
+
+"""
+SentenceSplitter - Cuts streamed text into sentences as it arrives
+
+Every complete sentence in the text fed so far is returned at once, the
+unfinished rest is kept for the next chunk.
+"""
+class SentenceSplitter:
+    def __init__(self) -> None:
+        self.buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_BOUNDARY.finditer(self.buffer):
+            sentence = self.buffer[start:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        rest, self.buffer = self.buffer.strip(), ""
+        return rest or None
 
 ### COMMUNICATION: Handles conversion of text to speech
 class Speak:
     def __init__(self):
         self.tts = interface_interactor.get_interface("tts")
         self.w2l = interface_interactor.get_interface("w2l")
+        self.mediastore = interface_interactor.get_interface("mediastore")
         self.redis_store = interface_interactor.create_redis_connection()
-        self.pubsub = self.redis_store.pubsub()
 
+    """
+    event_generator - Speaks a streamed response sentence by sentence
+
+    Three stages joined by bounded queues: this thread reads the response
+    stream and splits sentences, a synthesis thread runs TTS, a delivery
+    thread runs lip sync (video) and publishes. TTS for sentence N+1 runs
+    while sentence N is lip synced, and the first sentence is heard while
+    the LLM is still generating the rest. A stage that fails on one
+    sentence skips it, and the end of input is always passed on so the
+    other stages finish with it.
+    """
     def event_generator(self, context: Dict[str, Any], av_type: str):
-        self.pubsub.subscribe(f"streaming-{context.get('input.user_id')}") # TODO: Make user specific for multi-user
-        while True:
-            message = self.pubsub.get_message(ignore_subscribe_messages=True)
-            if message:
-                data = message["data"].decode("utf-8")
-                should_break = self.parse_av_stream(data, context, av_type)
-                if should_break:
-                    self.redis_store.publish(av_type, '<|endofvideo|>')
-                    self.pubsub.unsubscribe(f"streaming-{context.get('input.user_id')}")
+        started = time.perf_counter()
+        sentences = queue.Queue(SPEAK_PIPELINE_DEPTH)
+        clips = queue.Queue(SPEAK_PIPELINE_DEPTH)
+        threading.Thread(target=self.synthesize, args=(context, sentences, clips), daemon=True).start()
+        threading.Thread(target=self.deliver, args=(context, av_type, clips, started), daemon=True).start()
+
+        splitter = SentenceSplitter()
+        # Reads the response stream from its first entry, nothing is missed if the LLM starts first
+        key = stream_key(context.get('input.user_id'), context.get('input.stream_id'))
+        bus = get_stream_bus(key)
+        received = False
+        try:
+            for entry_id, data in bus.read(key):
+                if entry_id is None:
+                    # The stream expired, or the producer never wrote to it within STREAM_TTL
+                    if not bus.exists(key) and (received or time.perf_counter() - started > STREAM_TTL):
+                        break
+                    continue
+                received = True
+                text, done = split_end(data)
+                for sentence in splitter.feed(text):
+                    sentences.put(sentence)
+                if done:
+                    break
+        finally:
+            rest = splitter.flush()
+            if rest:
+                sentences.put(rest)
+            sentences.put(None)
+
+    def synthesize(self, context: Dict[str, Any], sentences: queue.Queue, clips: queue.Queue):
+        try:
+            while True:
+                sentence = sentences.get()
+                if sentence is None:
+                    return
+                try:
+                    wav_response = self.tts.call({'response': sentence, 'persona': context.get('model.persona')})
+                    if os.path.isfile(wav_response['filename']):
+                        clips.put(wav_response['filename'])
+                except Exception as e:
+                    logger.error(f"TTS service failed: {str(e)}")
+        finally:
+            clips.put(None)
+
+    def deliver(self, context: Dict[str, Any], av_type: str, clips: queue.Queue, started: float):
+        sequence_number = 0
+        try:
+            while True:
+                filename = clips.get()
+                if filename is None:
                     break
-            else:
-                time.sleep(0.1) # TODO: make this backoff
-
-    ### This function should take a text chunk from a stream
-    ### and maintain previous text chunks by aggregating them together.
-    ### When the text aggregation represents a complete sentence, execute the self.service.call
-    ### parse the filename into b64 like this b64encode(fh.read()).decode()
-    def parse_av_stream(self, text: str, context: Dict[str, Any], av_type: str='audio'):
-        if text != '<|endoftext|>':
-            self.buffer += text
-        if re.search(r'[.!?]\s*$', self.buffer) or text == '<|endoftext|>' and self.buffer != '':
-            wav_response = self.tts.call({'response': self.buffer, 'persona': context.get('model.persona')})
-            if os.path.isfile(wav_response['filename']):
-                if av_type == 'video':
-                    try:
-                        lip_sync_file = self.w2l.call({'persona': context.get('model.persona'), 'audio_response': wav_response['filename']})
-                        with open(lip_sync_file['filename'], 'rb') as fh:
-                            encoded_string = base64.b64encode(fh.read()).decode()
-                            data = {'data': encoded_string, "id": str(context._id)}
-                            self.redis_store.publish('video', json.dumps(data))
-                    except:
-                        logger.error("Lip sync service failed")
-                else:
-                    with open(wav_response['filename'], 'rb') as fh:
-                        encoded_string = base64.b64encode(fh.read()).decode()
-                        self.redis_store.publish('audio', encoded_string)
-                self.sequence_number += 1
-            self.buffer = ""
-
-        return True if text == '<|endoftext|>' else False
+                try:
+                    if av_type == 'video':
+                        filename = self.w2l.call({'persona': context.get('model.persona'), 'audio_response': filename})['filename']
+                    self.publish_media(filename, context, av_type, sequence_number)
+                except Exception as e:
+                    logger.error(f"Delivering {av_type} failed: {str(e)}")
+                    continue
+                if sequence_number == 0:
+                    metrics.observe(f"speak.first_{av_type}", (time.perf_counter() - started) * 1000)
+                sequence_number += 1
+        finally:
+            self.redis_store.publish(media_channel(context.get('input.user_id'), context.get('input.stream_id'), av_type), '<|endofvideo|>')
+
+    ### Stores the clip once and publishes a reference on the response's media channel, clients fetch the bytes from /v1/media
+    def publish_media(self, filename: str, context: Dict[str, Any], av_type: str='audio', sequence_number: int=0):
+        data = {**self.mediastore.put_file(filename), "id": str(context._id), "sequence": sequence_number}
+        self.redis_store.publish(media_channel(context.get('input.user_id'), context.get('input.stream_id'), av_type), json.dumps(data))
 
     def execute(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        self.buffer = ""
-        self.sequence_number = 0
         ### Synchronous example disabled for now TODO: Update for non-streaming
 
         # if context.get('model.model_config.speech') and context.has_key('response'):
@@ -4,6 +4,7 @@ from agentforge.ai.planning.planner import PlanningController
 from agentforge.ai.beliefs.symbolic import SymbolicMemory
 from agentforge.ai.attention.tasks import TaskManager
 from agentforge.utils.stream import stream_string
+from agentforge.interfaces.redisstream import stream_key
 from agentforge.interfaces import interface_interactor
 from agentforge.utils import logger
 from agentforge.ai.planning.pddl import PDDLGraph, PDDL
@@ -127,7 +128,7 @@ class Plan:
                 if task.stage >= len(self.goals):
                     task.deactivate()
                     ## If the next stage does not exist, congragulate the user! Job well done
-                    stream_string(f"streaming-{context.get('input.user_id')}", f"You've done it! You've completed the {task.name} plan.", end_token=" ")
+                    stream_string(stream_key(context.get('input.user_id'), context.get('input.stream_id')), f"You've done it! You've completed the {task.name} plan.", end_token=" ")
                     # TODO: save and return here
                     self.task_management.save(task)
                     return
@@ -182,7 +183,7 @@ class Plan:
             logger.info("Creating PDDL Plan")
 
             # TODO: Make channel user specific
-            # stream_string(f"streaming-{context.get('input.user_id')}", finalize_reponse, end_token=" ")
+            # stream_string(stream_key(context.get('input.user_id'), context.get('input.stream_id')), finalize_reponse, end_token=" ")
 
             best_plan, best_cost = self.planner.execute(context.get_model_input(), task, problem_data)
 
@@ -1,4 +1,5 @@
-import re
+import re, os, json
+from typing import List, Optional
 from agentforge.interfaces import interface_interactor
 from agentforge.utils.parser import Parser
 from agentforge.utils import logger
@@ -6,6 +7,18 @@ from copy import deepcopy
 
 # TODO MOVE TO ENV
 MAX_CLASSIFIER_RETRIES = 3
+# Constrain the label to the caller's choices with vLLM guided decoding, set to false for backends without it
+CLASSIFIER_GUIDED_DECODING = os.getenv("CLASSIFIER_GUIDED_DECODING", "true").lower() in ["true", "y", "1"]
+# Opt in to guided {"label": ...} JSON for calls without choices, this skips the prompt's step by step reasoning
+CLASSIFIER_GUIDED_LABELS = os.getenv("CLASSIFIER_GUIDED_LABELS", "false").lower() in ["true", "y", "1"]
+GUIDED_CHOICE_MAX_TOKENS = 16
+GUIDED_LABEL_MAX_TOKENS = 64
+# Free-form labels are generated as {"label": "..."} when there is no choice list
+LABEL_SCHEMA = {
+    "type": "object",
+    "properties": {"label": {"type": "string", "maxLength": 128}},
+    "required": ["label"],
+}
 
 """
     This classification scheme requires knowing the types and options of
@@ -57,9 +70,15 @@ class Classifier:
           "action": query['action'],
         }
     """
-    def classify(self, args, prompt, context, retries=0):
+    def classify(self, args, prompt, context, retries=0, choices: Optional[List[str]] = None):
         for k, v in args.items():
             prompt = prompt.replace(f"{{{k}}}", v)
+        # One short constrained completion, the regex and retry path below is the fallback
+        # Without choices the few-shot prompt reasons before its "Final Answer:", so it is left free unless opted in
+        if CLASSIFIER_GUIDED_DECODING and retries == 0 and (choices or CLASSIFIER_GUIDED_LABELS):
+            value = self.guided_classify(prompt, context, choices)
+            if value:
+                return [value]
         gen_config = deepcopy(context.get('model.generation_config'))
         gen_config['stopping_criteria'] = []
         input_ = {
@@ -72,7 +91,8 @@ class Classifier:
         logger.info("[PROMPT]")
         logger.info(input_['prompt'])
         logger.info("[PROMPT]")
-        llm_val = self.llm.call(input_)
+        # Short classification prompts are coalesced with concurrent ones into a single request
+        llm_val = self.llm.batch_call(input_)
         if llm_val is None or "choices" not in llm_val:
             return []
         response = llm_val["choices"][0]["text"]
@@ -95,5 +115,44 @@ class Classifier:
 
         # Retry with new prompt
         if retries < MAX_CLASSIFIER_RETRIES:
-            return self.classify(args, prompt, context, retries=retries+1)
+            return self.classify(args, prompt, context, retries=retries+1, choices=choices)
         return []
+
+    """
+        Classify with guided decoding, the LLM can only produce one of choices,
+        or {"label": ...} when no choices are given (CLASSIFIER_GUIDED_LABELS),
+        so the label needs no parsing.
+        Returns None when the backend rejects guided decoding or the output is invalid.
+    """
+    def guided_classify(self, prompt: str, context, choices: Optional[List[str]] = None) -> Optional[str]:
+        gen_config = deepcopy(context.get('model.generation_config'))
+        gen_config['stopping_criteria'] = []
+        gen_config['temperature'] = 0.0
+        if choices:
+            gen_config['guided_choice'] = choices
+            gen_config['max_tokens'] = GUIDED_CHOICE_MAX_TOKENS
+        else:
+            gen_config['guided_json'] = LABEL_SCHEMA
+            gen_config['max_tokens'] = GUIDED_LABEL_MAX_TOKENS
+        input_ = {
+            "prompt": prompt,
+            "generation_config": gen_config,
+            "model_config": context.get('model.model_config'),
+            "streaming_override": False,
+        }
+        try:
+            llm_val = self.llm.batch_call(input_)
+        except Exception as e:
+            logger.warning(f"Guided classification failed, falling back to extraction: {str(e)}")
+            return None
+        if llm_val is None or "choices" not in llm_val:
+            return None
+        generated = llm_val["choices"][0]["text"].strip()
+        logger.info(f"GUIDED ==> {generated}")
+        if choices:
+            return generated if generated in choices else None
+        try:
+            label = json.loads(generated).get("label")
+        except (ValueError, AttributeError):
+            return None
+        return label.strip() if isinstance(label, str) and label.strip() else None
@@ -4,44 +4,45 @@ from agentforge.utils import Parser
 from agentforge.utils.stream import stream_string
 from agentforge.ai.attention.tasks import TaskManager
 from agentforge.utils import logger
+from agentforge.ai.routines.memoize import memoize_subroutine
 from copy import deepcopy
 
 ### COMMUNICATION: Handles response generation
 class Summarizer:
     def __init__(self):
         self.service = interface_interactor.get_interface("llm")
-        self.tokenizer = interface_interactor.get_interface("tokenizer")
+        self.counter = interface_interactor.get_interface("token_counter")
         self.parser = Parser()
 
     def format_convo(self, conversation: str) -> str:
         return f"### Instruction: Summarize the following conversation. Include all key points and pertinent content. Ignore lists, but include concise comma separated sentences with the same information instead. {conversation} ### Response:"
 
+    @memoize_subroutine(
+        keys=['input.messages', 'input.user_name', 'model.persona.display_name',
+              'model.generation_config', 'model.model_config'],
+        outputs=['summary']
+    )
     def execute(self, context: Dict[str, Any]) -> Dict[str, Any]:
         ### Another subroutine gotchu dawg, bail
         gen_config = deepcopy(context.get('model.generation_config'))
         model_config = deepcopy(context.get('model.model_config'))
         username = context.get('input.user_name', "Human")
         agentname = context.get('model.persona.display_name', "Agent")
-        conversation, msg_cnt = context.get_messages(prefix=f"\n{username}: ", postfix=f"\n{agentname}:")
+        messages = context.get_message_list(prefix=f"\n{username}: ", postfix=f"\n{agentname}:")
+        msg_cnt = len(messages)
         if msg_cnt <= 5:
             return context
-        logger.info(f"Conversation {msg_cnt}: {conversation}")
-        formatted = self.format_convo(conversation)
-        response = self.tokenizer.call({'prompt': formatted})
-        token_cnt = int(response['text'])
         max_tokens = int(context.get('model.model_config.max_tokens'))
-        message_cnt = len(context.get('input.messages'))
-        logger.info(f"Token count: {token_cnt}")
-        if token_cnt > max_tokens:
-            while token_cnt > max_tokens:
-                conversation, msg_cnt = context.get_messages(prefix=f"\n{username}: ", postfix=f"\n{agentname}:", n=message_cnt-1)
-                formatted = self.format_convo(conversation)
-                response = self.tokenizer.call({'prompt': formatted})
-                token_cnt = int(response['text'])
-                if token_cnt < max_tokens:
-                    break
-                message_cnt -= 1
+        ### Keep the most recent messages that fit, each message is only ever tokenized once
+        keep = self.counter.fit(messages, max_tokens, overhead=self.counter.count(self.format_convo("")))
+        formatted = self.format_convo(" ".join(messages[-keep:]) if keep else "")
+        ### Counting per message misses merges across message boundaries, check the joined prompt once
+        while keep > 0 and self.counter.count(formatted) > max_tokens:
+            keep -= 1
+            formatted = self.format_convo(" ".join(messages[-keep:]) if keep else "")
+        if keep == 0:
             return context
+        logger.info(f"Summarizing {keep} of {msg_cnt} messages within {max_tokens} tokens")
 
         model_config["streaming"] = False
 
@@ -3,6 +3,7 @@ from typing import List
 from agentforge.interfaces import interface_interactor
 from agentforge.utils.parser import Parser
 from agentforge.utils import logger
+from agentforge.ai.reasoning.classifier import CLASSIFIER_GUIDED_DECODING
 from copy import deepcopy
 
 # TODO MOVE TO ENV
@@ -59,13 +60,17 @@ class ZeroShotClassifier:
         }
         input_["generation_config"]["max_new_tokens"] = max_new_tokens
         input_["generation_config"]["min_new_tokens"] = 0
+        # The output already has to match one of the classes, let vLLM enforce it
+        if klasses and CLASSIFIER_GUIDED_DECODING:
+            input_["generation_config"]["guided_choice"] = klasses
 
         # Disable streaming of classification output -- deepcopy so we don't effect the model_config
         logger.info("[INPUT]")
         logger.info(input_)
         logger.info("[INPUT]")
 
-        llm_val = self.llm.call(input_)
+        # Short classification prompts are coalesced with concurrent ones into a single request
+        llm_val = self.llm.batch_call(input_)
         if llm_val is None or "choices" not in llm_val:
             return []
 
@@ -0,0 +1,90 @@
+from functools import wraps
+from typing import Any, Callable, List, Optional
+from agentforge.utils import logger, metrics, cache_key
+
+"""
+get_cache - Returns the named cache interface or None when caching is not configured
+"""
+def get_cache(name: str = "subroutine") -> Optional[Any]:
+    try:
+        from agentforge.interfaces import interface_interactor
+    except ImportError:
+        return None
+    if not interface_interactor.has_interface(f"{name}_cache"):
+        return None
+    return interface_interactor.get_interface(f"{name}_cache")
+
+"""
+memoize_subroutine - Skip a subroutine whose inputs were already seen
+
+Wraps a subroutine's execute(self, context). The key is built from the
+declared Context paths only, so a resent or regenerated turn hits the
+cache. On a hit the cached values are written to the declared output
+paths and the subroutine is not called. Nothing is cached when the
+subroutine raises or sets none of its outputs.
+
+Does nothing unless a subroutine cache is configured (SUBROUTINE_CACHE_TYPE).
+
+Input:
+    keys: List[str] - Context paths the result depends on
+    outputs: List[str] - Context paths the subroutine writes
+    ttl: float - seconds the result stays valid, defaults to the cache's TTL
+    name: str - key namespace, defaults to the subroutine's qualified name
+"""
+def memoize_subroutine(keys: List[str], outputs: List[str], ttl: Optional[float] = None,
+                       name: Optional[str] = None, cache: str = "subroutine") -> Callable:
+    def decorator(execute: Callable) -> Callable:
+        namespace = name or execute.__qualname__
+
+        @wraps(execute)
+        def wrapper(self, context, *args, **kwargs):
+            store = get_cache(cache)
+            if store is None:
+                return execute(self, context, *args, **kwargs)
+
+            key = cache_key(namespace, *[context.get(path) for path in keys])
+            cached = store.get(key)
+            metrics.increment(f"cache.{cache}.hit" if cached is not None else f"cache.{cache}.miss")
+            if cached is not None:
+                logger.info(f"Cache hit for {namespace}")
+                for path, value in cached.items():
+                    context.set(path, value)
+                return context
+
+            context = execute(self, context, *args, **kwargs)
+            values = {path: context.get(path) for path in outputs}
+            values = {path: value for path, value in values.items() if value is not None}
+            if values:
+                store.set(key, values, ttl)
+            return context
+        return wrapper
+    return decorator
+
+"""
+memoize - Cache a method's return value keyed on its arguments
+
+For helpers that take plain values rather than a Context. None results
+are not cached.
+"""
+def memoize(ttl: Optional[float] = None, name: Optional[str] = None, cache: str = "subroutine") -> Callable:
+    def decorator(func: Callable) -> Callable:
+        namespace = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            store = get_cache(cache)
+            if store is None:
+                return func(self, *args, **kwargs)
+
+            key = cache_key(namespace, args, kwargs)
+            cached = store.get(key)
+            metrics.increment(f"cache.{cache}.hit" if cached is not None else f"cache.{cache}.miss")
+            if cached is not None:
+                return cached
+
+            result = func(self, *args, **kwargs)
+            if result is not None:
+                store.set(key, result, ttl)
+            return result
+        return wrapper
+    return decorator
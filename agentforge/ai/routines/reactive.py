@@ -15,10 +15,10 @@ class ReactiveRoutine(Routine):
     def __init__(self):
         super().__init__("reactive", [])
         # parse = Node(Parse().execute, [])
-        # recall = Node(Recall().execute, [parse])
+        # recall = Node(Recall().execute, [parse], speculative=True)
         # intent = Node(Intent().execute, [parse])
-        # summarizer = Node(Summarizer().execute, [parse])
-        # image_processor = Node(ImageProcessor().execute, [parse])
+        # summarizer = Node(Summarizer().execute, [parse], speculative=True)
+        # image_processor = Node(ImageProcessor().execute, [parse], speculative=True)
         # speak = Node(Speak().execute, [recall, parse, intent, image_processor])
         respond = Node(Respond().execute, [])
         # remember = Node(Remember().execute, [speak, respond])
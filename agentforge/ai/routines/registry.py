@@ -0,0 +1,70 @@
+import hashlib, json
+from typing import Any, Dict, Iterable, List
+from agentforge.interfaces import interface_interactor
+from agentforge.utils import logger
+
+TASK_REGISTRY_COLLECTION = "task_registry"
+
+"""
+TaskRegistry - Registers task routines in the vectorstore in one batch at startup
+
+Task routines are found through a similarity search over their plan
+prompts. Instead of a search and an insert per routine, the registry
+reads every routine's record with one query, embeds only phrases that
+were never registered with a single add_texts call, and stores a hash of
+each routine's prompts so unchanged routines are skipped on later boots.
+
+Input:
+    collection: str - vectorstore collection holding the task phrases
+"""
+class TaskRegistry:
+    def __init__(self, collection: str = "tasks") -> None:
+        self.collection = collection
+        self.db = interface_interactor.get_interface("db")
+        self.vectorstore = interface_interactor.get_interface("vectorstore")
+
+    @staticmethod
+    def content_hash(phrases: List[str]) -> str:
+        payload = json.dumps(sorted(phrases), separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def register(self, routines: Iterable[Any]) -> List[str]:
+        routines = {routine.name: list(routine.phrases) for routine in routines if routine.name and routine.phrases}
+        if not routines:
+            return []
+
+        try:
+            records = self.db.get_many(TASK_REGISTRY_COLLECTION, {"id": {"$in": list(routines)}})
+            records = {record["id"]: record for record in records}
+        except Exception as e:
+            logger.error(f"Error reading task registry: {str(e)}")
+            return []
+
+        texts, metadata, updated = [], [], []
+        for name, phrases in routines.items():
+            content_hash = self.content_hash(phrases)
+            record = records.get(name, {})
+            if record.get("hash") == content_hash:
+                continue
+            known = set(record.get("phrases", []))
+            missing = [phrase for phrase in dict.fromkeys(phrases) if phrase not in known]
+            texts.extend(missing)
+            metadata.extend({"task": True, "name": name} for _ in missing)
+            updated.append({"id": name, "hash": content_hash, "phrases": sorted(known | set(phrases))})
+
+        if not updated:
+            logger.info(f"Task registry up to date ({len(routines)} routines)")
+            return []
+
+        try:
+            if texts:
+                self.vectorstore.add_texts(texts, metadata, collection=self.collection)
+            # Only record the hashes once the phrases are embedded, a failed boot retries them
+            self.db.batch_upload(TASK_REGISTRY_COLLECTION, updated)
+        except Exception as e:
+            logger.error(f"Error registering tasks in vectorstore: {str(e)}")
+            return []
+
+        names = [record["id"] for record in updated]
+        logger.info(f"Registered {len(texts)} phrases for tasks {names}")
+        return names
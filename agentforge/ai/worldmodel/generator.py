@@ -113,6 +113,7 @@ class SpeciesGenerator:
             "user_id": "system",
             "user_name": "system",
             "agent_name": "agentforge",
+            "request_class": "background", # yields to interactive chat on the shared vLLM server
         }
         response = self.service.call(input)
         val = response['choices'][0]['text']
@@ -247,6 +248,7 @@ class CivilizationGenerator:
             "user_id": "system",
             "user_name": "system",
             "agent_name": "agentforge",
+            "request_class": "background", # yields to interactive chat on the shared vLLM server
         }
         # Try outlines
         input['schema'] = json.load(open(os.environ.get("WORLDGEN_DATA_DIR", "./") + "schema/name_description.json"))
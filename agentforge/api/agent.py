@@ -1,14 +1,17 @@
-from fastapi import APIRouter, Request, Depends, UploadFile
+from fastapi import APIRouter, Request, Depends, UploadFile, Header
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from agentforge.interfaces import interface_interactor
 from base64 import b64encode
 from agentforge.ai import agent_interactor
 from agentforge.interfaces.model_profile import ModelProfile
-import asyncio, uuid
-from aioredis import Redis
+from agentforge.adapters import StreamBusProtocol
+import asyncio, time, uuid
+from typing import Optional
 import traceback, json
 from agentforge.utils import logger
+from agentforge.interfaces.redisstream import STREAM_TTL, stream_key, media_channel, split_end, sse_event
+from agentforge.interfaces.streambus import open_stream, get_stream_bus
 from agentforge.utils.parser import Parser
 from supertokens_python.recipe.session.asyncio import get_session
 from supertokens_python.recipe.session.framework.fastapi import verify_session
@@ -68,9 +71,15 @@ def hello() -> AgentResponse:
     return AgentResponse(data={"response": "Hello world"})
 
 @router.get("/abort", operation_id="abort")
-def abort() -> AgentResponse:
+async def abort(request: Request) -> AgentResponse:
+    session = await get_session(request)
+
+    if session is None:
+        return {"message": "unauthorized"}
+
+    # Only abort the runs belonging to this user
     agent = agent_interactor.get_agent()
-    agent.abort()
+    agent.abort(session.get_user_id())
     return AgentResponse(data={"response": "aborted"})
 
 """OpenAI-compatible agent API endpoint with direct configuration handling"""
@@ -92,8 +101,8 @@ async def agent(request: Request) -> AgentResponse:
     logger.info("DATA")
     logger.info(data)
 
-    # Add user information
-    # data['user_id'] = user_id
+    # Add user information, streams and media channels are keyed by the session's user
+    data['user_id'] = user_id
     # if 'user_name' not in data:
     #     user_name = user.email.split("@")[0]
     #     data['user_name'] = user_name
@@ -147,86 +156,117 @@ async def agent(request: Request) -> AgentResponse:
         model_profile["generation_config"]["stop"] = data["stop"]
 
     if model_profile['model_config']['streaming']:
+        # Each response gets its own stream, the id lets the client resume it after a reconnect
+        stream_id = uuid.uuid4().hex
+        data['stream_id'] = stream_id
+        # The run executes in this process, so its stream can be handed over in memory
+        key = stream_key(user_id, stream_id)
+        bus = open_stream(key)
         agent = agent_interactor.get_agent()
-        output = agent.run({"input": data, "model": model_profile})
-
-        async def event_generator():
-            redis = Redis.from_url('redis://redis:6379/0')
-            async with redis.client() as client:
-                pubsub = client.pubsub()
-                await pubsub.subscribe(f"streaming-{user_id}")
-                while True:
-                    message = await pubsub.get_message()
-                    if message and message['type'] == 'message':
-                        try:
-                            val = message['data'].decode('utf-8')
-                        except Exception as e:
-                            print(e)
-                            traceback.print_exc()
-                            val = "ERR"
-                        # Strip off the </s> if it's there
-                        if len(val) >= 4 and val[-4:] == '</s>':
-                            val = val[:-4]
-                            yield str(val)
-                            break
-                        elif len(val) >= 13 and val[-13:] == '<|endoftext|>':
-                            val = val[:-13]
-                            yield str(val)
-                            break
-                        yield str(val)
-                    else:
-                        await asyncio.sleep(1)
-
-        return StreamingResponse(event_generator(), media_type="text/event-stream")
+        output = await agent.arun({"input": data, "model": model_profile})
+
+        # EventSource clients get SSE events with ids, others the raw text as before
+        framed = "text/event-stream" in request.headers.get("accept", "")
+        response = StreamingResponse(event_generator(bus, key, "0", framed), media_type="text/event-stream")
+        response.headers["X-Stream-Id"] = stream_id
+        return response
 
     else:
         agent = agent_interactor.get_agent()
-        output = agent.run({"input": data, "model": model_profile})
+        output = await agent.arun({"input": data, "model": model_profile})
         logger.info("[DEBUG][api][agent][agent] agent: " + output.pretty_print())
 
         # Handle video response
         if output.has_key('video'):
-            filename = output.get("video.lipsync_response")
-            with open(filename, 'rb') as fh:
-                return AgentResponse(
-                    data = {
-                        'choices': [{"text": output.get("response")}],
-                        'video': b64encode(fh.read()).decode()
-                    }
-                )
+            return AgentResponse(
+                data = {
+                    'choices': [{"text": output.get("response")}],
+                    'video': media_response(output.get("video.lipsync_response"), data)
+                }
+            )
 
         # Handle audio response
         if output.has_key('audio'):
-            filename = output.get("audio.audio_response")
-            with open(filename, 'rb') as fh:
-                return AgentResponse(
-                    data = {
-                        'choices': [{"text": output.get("response")}],
-                        'audio': b64encode(fh.read()).decode()
-                    }
-                )
+            return AgentResponse(
+                data = {
+                    'choices': [{"text": output.get("response")}],
+                    'audio': media_response(output.get("audio.audio_response"), data)
+                }
+            )
 
         return AgentResponse(data=output.get_model_outputs())
 
+# Reference to the stored file, fetched from /v1/media -- base64 inline only for clients sending "inline_media": true
+def media_response(filename: str, data: dict):
+    if data.get("inline_media"):
+        with open(filename, 'rb') as fh:
+            return b64encode(fh.read()).decode()
+    return interface_interactor.get_interface("mediastore").put_file(filename)
+
+"""
+event_generator - Relays a response stream to the client as entries arrive
+
+Reads block on the stream bus, so tokens go out as soon as they are generated.
+Stops at the end token, or when there is no stream left to wait for.
+"""
+async def event_generator(bus: StreamBusProtocol, key: str, last_id: str, framed: bool):
+    started = time.monotonic()
+    async for entry_id, val in bus.aread(key, last_id):
+        if entry_id is None:
+            # The stream expired, or the producer never wrote to it within STREAM_TTL
+            if not await bus.aexists(key) and (last_id != "0" or time.monotonic() - started > STREAM_TTL):
+                break
+            if framed:
+                yield ": keepalive\n\n"
+            continue
+        last_id = entry_id
+        val, done = split_end(val)
+        yield sse_event(entry_id, val) if framed else val
+        if done:
+            break
+
+### Resume a streamed completion, e.g. an EventSource reconnecting with Last-Event-ID
+@router.get('/completions/streams/{stream_id}', operation_id="resumeChatCompletion")
+async def resume(request: Request, stream_id: str, last_event_id: Optional[str] = Header(None)):
+    session = await get_session(request)
+
+    if session is None:
+        return {"message": "unauthorized"}
+
+    # In process if the run that produces it is on this worker, otherwise from Redis
+    key = stream_key(session.get_user_id(), stream_id)
+    return StreamingResponse(event_generator(get_stream_bus(key), key, last_event_id or "0", True), media_type="text/event-stream")
+
 ### Streaming for old Forge
 @router.get("/completions/stream/{channel}")
-def stream(channel: str):
+async def stream(request: Request, channel: str, stream_id: Optional[str] = None):
+    session = await get_session(request)
+
+    if session is None:
+        return {"message": "unauthorized"}
+
+    # Only this user's clips, for one response when stream_id is given
+    video_channel = media_channel(session.get_user_id(), stream_id or '*', 'video')
     id = 5
     async def event_generator():
-        redis = Redis.from_url('redis://redis:6379/0')
+        redis = interface_interactor.create_async_redis_connection()
         async with redis.client() as client:
             pubsub = client.pubsub()
-            await pubsub.subscribe('video')
+            if stream_id:
+                await pubsub.subscribe(video_channel)
+            else:
+                await pubsub.psubscribe(video_channel)
             while True:
                 message = await pubsub.get_message()
-                if message and message['type'] == 'message' and message['data'] == b'<|endofvideo|>':
+                if message and message['type'] in ('message', 'pmessage') and message['data'] == b'<|endofvideo|>':
                     yield '<|endofvideo|>'
                     break
-                if message and message['type'] == 'message':
+                if message and message['type'] in ('message', 'pmessage'):
                     try:
-                        data = json.loads(message['data']) 
-                        val = data['data']
-                        _id = data['id']
+                        # A reference to the clip, the bytes are fetched from its url
+                        data = json.loads(message['data'])
+                        _id = data.pop('id')
+                        val = json.dumps(data)
                     except Exception as e:
                         print(e)
                         traceback.print_exc()
@@ -10,12 +10,15 @@ from agentforge.api.agent import router as agent_router
 from agentforge.api.user import router as user_router
 from agentforge.api.ws import router as ws_router
 from agentforge.api.sim import router as sim_router
+from agentforge.api.metrics import router as metrics_router
+from agentforge.api.media import router as media_router
 # from agentforge.api.events import router as events_router
 from agentforge.api.subscription import router as subscription_router
 from agentforge.api.supertokens import override_functions
 from agentforge.api.app import init_api
 from agentforge.utils import logger
 from agentforge.interfaces import interface_interactor
+from agentforge.interfaces.redispool import close_redis, close_async_redis
 
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -146,6 +149,8 @@ app.include_router(agent_router, prefix="/v1", tags=["agent_forge"])
 app.include_router(subscription_router, prefix="/v1", tags=["subscription"])
 app.include_router(ws_router, prefix="/v1", tags=["ws"])
 app.include_router(sim_router, prefix="/v1", tags=["sim"])
+app.include_router(metrics_router, prefix="/v1/admin", tags=["admin"])
+app.include_router(media_router, prefix="/v1", tags=["media"])
 # app.include_router(events_router, prefix="/v1/events", tags=["events"])
 
 @app.on_event("startup")
@@ -160,8 +165,10 @@ def startup_event():
     # celery_app.worker_main(['-A', 'main', 'worker', '--loglevel=info', '--concurrency=1'])
 
 @app.on_event("shutdown")
-def shutdown_event():
+async def shutdown_event():
     app.state.redis.close()
+    close_redis()
+    await close_async_redis()
 
 @app.exception_handler(Exception)
 async def custom_exception_handler(request: Request, exc: Exception):
@@ -0,0 +1,68 @@
+import os, re
+from typing import Iterator, Optional, Tuple
+from fastapi import APIRouter, Request, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
+from supertokens_python.recipe.session.asyncio import get_session
+from agentforge.interfaces import interface_interactor
+
+router = APIRouter()
+# Bytes read and sent per chunk
+MEDIA_CHUNK_SIZE = int(os.getenv("MEDIA_CHUNK_SIZE", 64 * 1024))
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Resolves a single "bytes=start-end" range to inclusive offsets, None serves the whole file
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    if not header:
+        return None
+    match = RANGE.match(header.strip())
+    if match is None or match.groups() == ("", ""):
+        # Multiple or malformed ranges, answering with the whole file is allowed
+        return None
+    start, end = match.groups()
+    if start == "":
+        # Suffix range, the last n bytes
+        start, end = max(0, size - int(end)), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise HTTPException(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+def iter_file(path: str, start: int, length: int) -> Iterator[bytes]:
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(MEDIA_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+### Serves stored audio and video as a chunked binary stream, Range requests let players seek and resume
+@router.get("/media/{media_id}", operation_id="getMedia")
+async def media(request: Request, media_id: str, range_header: Optional[str] = Header(None, alias="range")):
+    session = await get_session(request)
+
+    if session is None:
+        return {"message": "unauthorized"}
+
+    mediastore = interface_interactor.get_interface("mediastore")
+    path = mediastore.get_path(media_id)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="media not found")
+
+    size = os.path.getsize(path)
+    media_type = mediastore.content_type(media_id)
+    # Content addressed, the bytes behind an id never change
+    headers = {"Accept-Ranges": "bytes", "Cache-Control": "private, max-age=31536000, immutable", "ETag": f'"{media_id}"'}
+    byte_range = parse_range(range_header, size)
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(iter_file(path, 0, size), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(iter_file(path, start, end - start + 1), status_code=status.HTTP_206_PARTIAL_CONTENT,
+                             media_type=media_type, headers=headers)
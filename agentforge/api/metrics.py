@@ -0,0 +1,36 @@
+import os, hmac
+from fastapi import APIRouter, Request, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from agentforge.utils.tracing import metrics, get_traces
+from agentforge.interfaces.redispool import redis_status
+
+router = APIRouter()
+# Shared secret, sent as "Authorization: Bearer <token>". Unset disables the admin endpoints
+ADMIN_METRICS_TOKEN = os.getenv("ADMIN_METRICS_TOKEN")
+
+def authorize(request: Request) -> None:
+    if not ADMIN_METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="admin endpoints are disabled, set ADMIN_METRICS_TOKEN")
+    provided = request.headers.get("authorization", "").replace("Bearer ", "", 1)
+    if not hmac.compare_digest(provided, ADMIN_METRICS_TOKEN):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="unauthorized")
+
+### Latency histograms per node, API call and vectorstore call -- ?format=prometheus for scrapers
+@router.get("/metrics", operation_id="getMetrics")
+def get_metrics(request: Request, format: str = "json"):
+    authorize(request)
+    if format == "prometheus":
+        return PlainTextResponse(metrics.prometheus(), media_type="text/plain; version=0.0.4")
+    return metrics.snapshot()
+
+### Recently finished spans grouped per request
+@router.get("/traces", operation_id="getTraces")
+def traces(request: Request, limit: int = 20):
+    authorize(request)
+    return {"traces": get_traces(limit)}
+
+### Redis pools of this process, connections opened and a PING per server
+@router.get("/redis", operation_id="getRedisPools")
+def redis_pools(request: Request):
+    authorize(request)
+    return {"pools": redis_status()}
@@ -1,4 +1,9 @@
+import asyncio, json
+from typing import Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from supertokens_python.recipe.session.asyncio import get_session
+from agentforge.interfaces import interface_interactor
+from agentforge.interfaces.redisstream import media_channel
 from agentforge.interfaces.vad.resource import VadWhisper
 from agentforge.utils import logger
 
@@ -26,3 +31,48 @@ async def websocket_endpoint(websocket: WebSocket):
             # If there's an exception, it's likely the socket is already closed,
             # so we can ignore this exception.
             pass
+
+def read_media(path: str) -> bytes:
+    with open(path, 'rb') as fh:
+        return fh.read()
+
+### Spoken responses as they are generated: a text frame with the clip's reference, then its bytes as one binary frame
+### Only the session's own clips are sent: for the response named by stream_id (the completion's X-Stream-Id), else for all of them
+@router.websocket("/ws/media/{av_type}")
+async def media_endpoint(websocket: WebSocket, av_type: str, stream_id: Optional[str] = None):
+    if av_type not in ("audio", "video"):
+        await websocket.close(code=1008)
+        return
+    # Websocket handshakes are GETs, there is no state change to protect with anti-CSRF
+    session = await get_session(websocket, session_required=False, anti_csrf_check=False)
+    if session is None:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    channel = media_channel(session.get_user_id(), stream_id or "*", av_type)
+    mediastore = interface_interactor.get_interface("mediastore")
+    pubsub = interface_interactor.create_async_redis_connection().pubsub(ignore_subscribe_messages=True)
+    if stream_id:
+        await pubsub.subscribe(channel)
+    else:
+        await pubsub.psubscribe(channel)
+    try:
+        # Blocks until Speak publishes the next clip
+        async for message in pubsub.listen():
+            if message['data'] == b'<|endofvideo|>':
+                await websocket.send_text('<|endofvideo|>')
+                continue
+            reference = json.loads(message['data'])
+            path = mediastore.get_path(reference.get('media_id', ''))
+            if path is None:
+                logger.error(f"Media {reference.get('media_id')} not found")
+                continue
+            await websocket.send_text(json.dumps(reference))
+            await websocket.send_bytes(await asyncio.to_thread(read_media, path))
+    except WebSocketDisconnect:
+        logger.info("Media client disconnected")
+    except Exception as e:
+        logger.error(f"An error occurred: {e}")
+    finally:
+        # Drops the subscription or pattern
+        await pubsub.reset()
@@ -1,4 +1,5 @@
 from .db_config import DbConfig
 from .redis_config import RedisConfig
+from .http_config import HttpConfig
 
-__all__ = ["DbConfig", "RedisConfig"]
+__all__ = ["DbConfig", "RedisConfig", "HttpConfig"]
@@ -0,0 +1,26 @@
+from typing import Optional
+import os
+
+class HttpConfig():
+    def __init__(self,
+                 max_connections: Optional[int] = 100,
+                 max_keepalive_connections: Optional[int] = 20,
+                 keepalive_expiry: Optional[float] = 30.0,
+                 connect_timeout: Optional[float] = 5.0,
+                 timeout: Optional[float] = 120.0,
+                 ) -> None:
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+
+    @staticmethod
+    def from_env() -> 'HttpConfig':
+        return HttpConfig(
+            max_connections=int(os.getenv('HTTP_MAX_CONNECTIONS', 100)),
+            max_keepalive_connections=int(os.getenv('HTTP_MAX_KEEPALIVE_CONNECTIONS', 20)),
+            keepalive_expiry=float(os.getenv('HTTP_KEEPALIVE_EXPIRY', 30)),
+            connect_timeout=float(os.getenv('HTTP_CONNECT_TIMEOUT', 5)),
+            timeout=float(os.getenv('HTTP_TIMEOUT', 120)),
+        )
@@ -7,13 +7,21 @@ class RedisConfig():
                  port: Optional[int] = 6379,
                  username: Optional[str] = None,
                  password: Optional[str] = None,
-                 db: Optional[int] = 0
+                 db: Optional[int] = 0,
+                 max_connections: Optional[int] = 64,
+                 async_max_connections: Optional[int] = 256,
+                 pool_timeout: Optional[float] = 5.0,
+                 health_check_interval: Optional[int] = 30,
                  ) -> None:
         self.host = host
         self.port = port
         self.username = username
         self.password = password
         self.db = db
+        self.max_connections = max_connections
+        self.async_max_connections = async_max_connections
+        self.pool_timeout = pool_timeout
+        self.health_check_interval = health_check_interval
 
     @staticmethod
     def from_env() -> 'RedisConfig':
@@ -23,4 +31,8 @@ class RedisConfig():
             username=os.getenv('REDIS_USER'),
             password=os.getenv('REDIS_PASS'),
             db=int(os.getenv('REDIS_DB', 0)),
+            max_connections=int(os.getenv('REDIS_MAX_CONNECTIONS', 64)),
+            async_max_connections=int(os.getenv('REDIS_ASYNC_MAX_CONNECTIONS', 256)),
+            pool_timeout=float(os.getenv('REDIS_POOL_TIMEOUT', 5)),
+            health_check_interval=int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', 30)),
         )
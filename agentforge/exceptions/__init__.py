@@ -1,3 +1,3 @@
-from .exception import AgentException, RoutineException, SubroutineException
+from .exception import AgentException, RoutineException, SubroutineException, SubroutineCancelled
 
-__all__ = ["AgentException", "RoutineException", "SubroutineException"]
+__all__ = ["AgentException", "RoutineException", "SubroutineException", "SubroutineCancelled"]
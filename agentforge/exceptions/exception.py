@@ -39,3 +39,12 @@ class APIException(Exception):
     def __init__(self, message="We are done here."):
         self.message = message
         super().__init__(self.message)
+
+class SubroutineCancelled(SubroutineException):
+    """Exception raised when a subroutine is cancelled before it finished.
+
+    Attributes:
+        message -- explanation of the error
+    """
+    def __init__(self, message="The subroutine was cancelled"):
+        super().__init__(message)
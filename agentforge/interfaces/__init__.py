@@ -8,12 +8,18 @@ if RESOURCE == "AGENT":
     interface_interactor.create_db()
     interface_interactor.create_kvstore()
     interface_interactor.create_filestore()
-    interface_interactor.create_vectorstore()
+    interface_interactor.create_mediastore()
+    interface_interactor.create_embeddings()
+    interface_interactor.create_vectorstore() # shares the embeddings provider
     interface_interactor.create_working_memory()
     interface_interactor.create_keygenerator() # requires kvstore
+    interface_interactor.create_cache("subroutine")
+    interface_interactor.create_cache("response")
+    interface_interactor.create_abort_controller()
     # interface_interactor.create_service("llm")
     interface_interactor.create_service("vllm")
     interface_interactor.create_service("tts")
     interface_interactor.create_service("w2l")
     interface_interactor.create_service("tokenizer")
+    interface_interactor.create_token_counter() # requires tokenizer
     interface_interactor.create_image_generator("pixart")
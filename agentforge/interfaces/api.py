@@ -1,21 +1,37 @@
-import redis
 import os
+import threading
 import json
 from agentforge.adapters import APIService
-from agentforge.interfaces.vllm_client import get_streaming_response, create_completion, get_completion_text
+from agentforge.interfaces.vllm_client import get_streaming_response, iter_completion_deltas, create_completion, get_completion_text
 from typing import Optional
-from agentforge.utils import logger
+from agentforge.utils import logger, traced, check_cancelled, get_current_token, on_cancel
 from agentforge.config import RedisConfig
 from fastapi import HTTPException
 from typing import Dict, Any
-from collections import deque
+from agentforge.interfaces.batcher import CompletionBatcher, LLM_BATCH_WINDOW_MS
+from agentforge.interfaces.scheduler import RequestScheduler
+from agentforge.interfaces.redisstream import stream_key
+from agentforge.interfaces.streambus import StreamPublisher, get_stream_bus
+
+# Length of the longest end of text that could be the start of stop
+def stop_prefix_length(text: str, stop: str) -> int:
+    for n in range(min(len(text), len(stop) - 1), 0, -1):
+        if stop.startswith(text[-n:]):
+            return n
+    return 0
 
 class vLLMService(APIService):
   def __init__(self):
       super().__init__()
       self.url = os.getenv('LLM_URL', 'http://localhost:8000/v1/completions')
       self.service = "llm"
+      # LLM_URLS lists vLLM replicas serving the same model, requests are balanced across them
+      self.set_endpoints(os.getenv('LLM_URLS'))
       self.redis_config = RedisConfig.from_env()
+      self.batcher = None
+      self.batcher_lock = threading.Lock()
+      # form_data["request_class"] picks interactive (default), default or background
+      self.scheduler = RequestScheduler()
 
   def prepare_stop_sequences(self, form_data: Dict[str, Any]) -> list:
       """Prepare stop sequences from form data"""
@@ -26,45 +42,46 @@ class vLLMService(APIService):
       return base_stops
 
   def handle_streaming(self, response: Any, user_id: str, user_name: str, 
-                      agent_name: str, prompt: str, redis_server: Optional[redis.Redis] = None) -> str:
-      """Handle streaming response from VLLM"""
-      buffer = deque(maxlen=5)
-      output = ""
-      cur_seen = str(prompt)
+                      agent_name: str, prompt: str, publisher: Optional[StreamPublisher] = None) -> str:
+      """Handle streaming response from VLLM, each chunk carries only the new text"""
+      parts = []
+      # The model starting the user's turn ends the response
+      stop = f"\n{user_name}" if user_name else None
+      # Text not yet published, it may end with the start of the stop string split across deltas
+      pending = ""
+      stopped = False
+      token = get_current_token()
       
-      for chunk in response.iter_lines(decode_unicode=True):
-          if not chunk or chunk == 'data: [DONE]':
+      for delta in iter_completion_deltas(response.iter_lines()):
+          # Stop reading as soon as the subroutine is cancelled, the caller closes the stream
+          if token is not None and token.cancelled:
+              break
+          if not delta:
               continue
-              
-          if chunk.startswith('data: '):
-              chunk = chunk[6:]  # Remove 'data: ' prefix
-          
-          try:
-              data = json.loads(chunk)
-              new_text = data['choices'][0]['text']
-              
-              # Process new tokens
-              new_tokens = new_text.replace(cur_seen, "").replace(prompt, "")
-              buffer.extend(new_tokens)
-              
-              # Check for stop conditions
-              buffer_text = ' '.join(buffer)
-              if (buffer_text.endswith('/n ' + user_name) or 
-                  new_tokens + agent_name == output or 
-                  new_tokens + user_name == output):
+
+          parts.append(delta)
+          if stop is None:
+              ready = delta
+          else:
+              pending += delta
+              end = pending.find(stop)
+              if end >= 0:
+                  stopped = True
+                  pending = pending[:end]
                   break
-              
-              output += new_tokens
-              cur_seen = new_text
-              
-              # Stream to Redis if enabled
-              if redis_server and new_tokens:
-                  redis_server.publish(f"streaming-{user_id}", new_tokens)
-                  
-          except json.JSONDecodeError:
-              logger.error(f"Failed to decode chunk: {chunk}")
-              continue
-              
+              held = stop_prefix_length(pending, stop)
+              ready, pending = pending[:len(pending) - held], pending[len(pending) - held:]
+
+          # Stream to Redis if enabled, deltas are coalesced into fewer entries
+          if publisher and ready:
+              publisher.write(ready)
+
+      # Held back text that turned out not to be the stop string
+      if publisher and pending:
+          publisher.write(pending)
+      output = "".join(parts)
+      if stopped:
+          output = output[:output.find(stop)]
       return output.strip()
 
   def prepare_completion_params(self, form_data: Dict[str, Any], stream: bool) -> Dict[str, Any]:
@@ -127,19 +144,18 @@ class vLLMService(APIService):
 
       return params
 
+  @traced("api:vllm")
   def call(self, form_data: Dict[str, Any]) -> Dict[str, Any]:
       """Process request and return response in OpenAI format"""      
       stream = form_data.get('model_config', {}).get('streaming', False)
       user_id = form_data.get('user_id')
       
-      # Initialize Redis for streaming if needed
-      redis_server = None
+      # Stream in process when the API relaying it runs here, through Redis otherwise.
+      # form_data["coalesce"] sets the client's flush policy
+      publisher = None
       if user_id and stream:
-          redis_server = redis.StrictRedis(
-              host=self.redis_config.host,
-              port=self.redis_config.port,
-              db=self.redis_config.db
-          )
+          key = stream_key(user_id, form_data.get('stream_id'))
+          publisher = StreamPublisher.from_options(get_stream_bus(key), key, form_data.get('coalesce'))
 
       try:
           # Prepare complete set of parameters
@@ -147,35 +163,93 @@ class vLLMService(APIService):
 
           logger.info(f"completion_params: {completion_params}\n")
           
-          # Make request to VLLM
-          response = create_completion(**completion_params)
-          
-          if stream:
-              output = self.handle_streaming(
-                  response,
-                  user_id,
-                  form_data.get('user_name', ''),
-                  form_data.get('agent_name', ''),
-                  form_data['prompt'],
-                  redis_server
-              )
-          else:
-              output = get_completion_text(response)
-            #   output = output.replace(form_data['prompt'], "")
+          # Don't start a generation nobody is waiting for
+          check_cancelled()
 
-          # Clean up Redis connection
-          if redis_server:
-              redis_server.publish(f"streaming-{user_id}", '<|endoftext|>')
-              redis_server.close()
+          cache_request = self.completion_cache_request(form_data, completion_params)
+          if cache_request is not None:
+              cached = self.response_cache.get(self.service, cache_request)
+              if cached is not None:
+                  return cached
+
+          # Make request to VLLM once the request's class has a free slot
+          with self.scheduler.slot(form_data.get('request_class')) as priority:
+              completion_params["priority"] = priority
+              # The replica counts as busy until the generation is read
+              with self._open(lambda url: create_completion(**{**completion_params, "api_url": url})) as response:
+                  # Closing the response drops the connection so vLLM stops generating
+                  unregister = on_cancel(response.close)
+                  try:
+                      if stream:
+                          output = self.handle_streaming(
+                              response,
+                              user_id,
+                              form_data.get('user_name', ''),
+                              form_data.get('agent_name', ''),
+                              form_data['prompt'],
+                              publisher
+                          )
+                      else:
+                          output = get_completion_text(response)
+                        #   output = output.replace(form_data['prompt'], "")
+                  finally:
+                      unregister()
+          check_cancelled()
+          if cache_request is not None:
+              self.response_cache.set(self.service, cache_request, output)
 
           logger.info(f"Response from vLLM: {output}")
           
           return output
           
       except Exception as e:
+          # A stream closed by cancellation surfaces as SubroutineCancelled, not a transport error
+          check_cancelled()
           logger.error(f"Error in vLLM service: {str(e)}")
           raise
 
+      finally:
+          # Always end the client's stream, including aborted and failed generations
+          if publisher:
+              publisher.close('<|endoftext|>')
+
+  def completion_cache_request(self, form_data: Dict[str, Any], params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+      """Canonical completion request for the response cache, None when the output must not be cached"""
+      if self.response_cache is None or params.get("stream"):
+          return None
+      # vLLM samples at 0.7 when the config does not set a temperature
+      if not self.response_cache.cacheable(form_data.get('generation_config'), 0.7, form_data.get('cache')):
+          return None
+      return {k: v for k, v in params.items() if k not in ("api_url", "user")}
+
+  def send_completion(self, params: Dict[str, Any]) -> Dict[str, Any]:
+      return get_completion_text(self._send(lambda url: create_completion(**{**params, "api_url": url})))
+
+  @traced("api:vllm.batch")
+  def batch_call(self, form_data: Dict[str, Any]) -> Dict[str, Any]:
+      """Non-streaming completion that may share a multi-prompt request with concurrent callers"""
+      if LLM_BATCH_WINDOW_MS <= 0:
+          return self.call({**form_data, "model_config": {**form_data.get("model_config", {}), "streaming": False}})
+      if self.batcher is None:
+          with self.batcher_lock:
+              if self.batcher is None:
+                  self.batcher = CompletionBatcher(self.send_completion)
+      check_cancelled()
+      completion_params = self.prepare_completion_params(form_data, False)
+      cache_request = self.completion_cache_request(form_data, completion_params)
+      if cache_request is not None:
+          cached = self.response_cache.get(self.service, cache_request)
+          if cached is not None:
+              return cached
+      # Callers sharing a batch each hold a slot, batches only form within one class
+      with self.scheduler.slot(form_data.get('request_class')) as priority:
+          completion_params["priority"] = priority
+          result = self.batcher.submit(completion_params).result()
+      check_cancelled()
+      if cache_request is not None:
+          self.response_cache.set(self.service, cache_request, result)
+      return result
+
 class PixArtService(APIService):
   def __init__(self):
     super().__init__()
@@ -187,6 +261,7 @@ class LLMService(APIService):
     super().__init__()
     self.url = os.getenv('LLM_URL')
     self.service = "llm"
+    self.set_endpoints(os.getenv('LLM_URLS'))
 
   def test(self):
     return {
@@ -200,18 +275,21 @@ class TTSService(APIService):
     super().__init__()
     self.url = os.getenv('TTS_URL')
     self.service = "tts"
+    self.set_endpoints(os.getenv('TTS_URLS'))
 
 class W2LService(APIService):
   def __init__(self):
     super().__init__()
     self.url = os.getenv('W2L_URL')
     self.service = "w2l"
+    self.set_endpoints(os.getenv('W2L_URLS'))
 
 class TokenizerService(APIService):
   def __init__(self):
     super().__init__()
     self.url = os.getenv('TOKENIZER_URL')
     self.service = "tokenizer"
+    self.set_endpoints(os.getenv('TOKENIZER_URLS'))
 
 class VQAService(APIService):
     def __init__(self):
@@ -0,0 +1,109 @@
+import os, threading, time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+from agentforge.utils import logger, metrics, cache_key
+
+# How long the first request of a batch waits for others to join
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", 5))
+# A batch is sent as soon as it holds this many prompts
+LLM_BATCH_MAX_SIZE = int(os.getenv("LLM_BATCH_MAX_SIZE", 16))
+# Batches in flight at once
+LLM_BATCH_WORKERS = int(os.getenv("LLM_BATCH_WORKERS", 4))
+
+"""
+CompletionBatcher - Coalesces short completion requests into multi-prompt requests
+
+Requests are grouped by every completion parameter except the prompt, a
+group is sent when its oldest request has waited window_ms or it holds
+max_size prompts. The OpenAI completions API accepts a list of prompts
+and returns choices indexed by prompt, so each caller gets back a
+response shaped exactly like a single-prompt one.
+
+Input:
+    send: Callable - sends completion params, returns the parsed JSON response
+    window_ms: float - maximum time a request waits for a batch
+    max_size: int - maximum prompts per request
+"""
+class CompletionBatcher:
+    def __init__(self, send: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 window_ms: float = LLM_BATCH_WINDOW_MS, max_size: int = LLM_BATCH_MAX_SIZE) -> None:
+        self.send = send
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self.condition = threading.Condition()
+        self.pending: Dict[str, List[Tuple[float, Dict[str, Any], Future]]] = {}
+        self.executor = ThreadPoolExecutor(max_workers=LLM_BATCH_WORKERS, thread_name_prefix="llm-batch")
+        self.thread = threading.Thread(target=self._run, name="llm-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, params: Dict[str, Any]) -> Future:
+        future = Future()
+        shared = {k: v for k, v in params.items() if k != "prompt"}
+        key = cache_key("completion", shared)
+        with self.condition:
+            self.pending.setdefault(key, []).append((time.monotonic(), params, future))
+            self.condition.notify()
+        return future
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                ready, wait = self._take_ready()
+                if not ready:
+                    self.condition.wait(wait)
+                    continue
+            for batch in ready:
+                self.executor.submit(self._send_batch, batch)
+
+    def _take_ready(self) -> Tuple[List[List[Tuple[float, Dict[str, Any], Future]]], float]:
+        now = time.monotonic()
+        ready, wait = [], None
+        for key in list(self.pending):
+            group = self.pending[key]
+            deadline = group[0][0] + self.window
+            if len(group) >= self.max_size or deadline <= now:
+                ready.append(group[:self.max_size])
+                rest = group[self.max_size:]
+                if rest:
+                    self.pending[key] = rest
+                else:
+                    del self.pending[key]
+            else:
+                wait = min(wait, deadline - now) if wait is not None else deadline - now
+        return ready, wait
+
+    def _send_batch(self, batch: List[Tuple[float, Dict[str, Any], Future]]) -> None:
+        futures = [future for _, _, future in batch]
+        metrics.increment("llm.batch.requests")
+        metrics.increment("llm.batch.prompts", len(batch))
+        try:
+            if len(batch) == 1:
+                futures[0].set_result(self.send(batch[0][1]))
+                return
+            params = dict(batch[0][1])
+            params["prompt"] = [p["prompt"] for _, p, _ in batch]
+            response = self.send(params)
+            for i, result in enumerate(self.split(response, len(batch), params.get("n") or 1)):
+                futures[i].set_result(result)
+        except Exception as e:
+            logger.error(f"Batched completion of {len(batch)} prompts failed: {str(e)}")
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+
+    """
+    split - Fan a multi-prompt response out into one response per prompt
+
+    Choice index is prompt_index * n + sample_index, each caller's choices
+    are re-indexed from 0 as if it had sent its prompt alone.
+    """
+    @staticmethod
+    def split(response: Dict[str, Any], size: int, n: int = 1) -> List[Dict[str, Any]]:
+        choices = sorted(response.get("choices", []), key=lambda choice: choice.get("index", 0))
+        results = []
+        for i in range(size):
+            own = []
+            for j, choice in enumerate(choices[i * n:(i + 1) * n]):
+                own.append({**choice, "index": j})
+            results.append({**response, "choices": own})
+        return results
@@ -8,13 +8,13 @@
 import shutil
 from typing import Any, List, Optional, Dict
 from langchain.vectorstores import DeepLake
-from langchain.embeddings import HuggingFaceEmbeddings
+from agentforge.interfaces.embeddings import get_embeddings
 from agentforge.adapters import VectorStoreProtocol
 
 class DeepLakeVectorStore(VectorStoreProtocol):
     def __init__(self, model_name: str, deeplake_path: str, reset: bool) -> None:
         # Initialize your vector store here
-        self.embdeddings = HuggingFaceEmbeddings(model_name=model_name)
+        self.embdeddings = get_embeddings(model_name)
         self.deeplake_path = deeplake_path
         if reset:
             self.delete()
@@ -0,0 +1,161 @@
+import os, threading, time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from agentforge.adapters import EmbeddingsProtocol
+from agentforge.adapters.resilience import guard, call_with_retries
+from agentforge.interfaces.vllm_client import create_embeddings
+from agentforge.utils import logger, metrics
+
+# local loads the model in this process, remote sends texts to an OpenAI compatible /v1/embeddings server
+EMBEDDINGS_TYPE = os.getenv("EMBEDDINGS_TYPE", "local")
+EMBEDDINGS_MODEL = os.getenv("EMBEDDINGS_MODEL", os.getenv("VECTOR_EMBEDDINGS_MODEL_NAME", "sentence-transformers/all-mpnet-base-v2"))
+EMBEDDINGS_URL = os.getenv("EMBEDDINGS_URL", "http://localhost:8000/v1/embeddings")
+# Texts per forward pass or request
+EMBEDDINGS_BATCH_SIZE = int(os.getenv("EMBEDDINGS_BATCH_SIZE", 64))
+# How long the first text of a remote batch waits for concurrent ones
+EMBEDDINGS_BATCH_WINDOW_MS = float(os.getenv("EMBEDDINGS_BATCH_WINDOW_MS", 5))
+EMBEDDINGS_WORKERS = int(os.getenv("EMBEDDINGS_WORKERS", 4))
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+"""
+LocalEmbeddings - Sentence-transformers model loaded in this process
+
+Texts are encoded in batches and vectors are L2 normalized, so inner
+product and cosine similarity rank the same.
+
+Input:
+    model_name: str - sentence-transformers or HuggingFace model, plain
+                      encoders such as bert-base-uncased are mean pooled
+"""
+class LocalEmbeddings(EmbeddingsProtocol):
+    def __init__(self, model_name: str = EMBEDDINGS_MODEL, batch_size: int = EMBEDDINGS_BATCH_SIZE) -> None:
+        from sentence_transformers import SentenceTransformer
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name)
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        texts = list(texts)
+        if not texts:
+            return []
+        with self.lock:
+            vectors = self.model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True,
+                                        convert_to_numpy=True, show_progress_bar=False)
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+"""
+RemoteEmbeddings - Embeds through a shared embeddings server
+
+Concurrent embed calls from any thread are coalesced: texts wait up to
+window_ms for others and go out together as one /v1/embeddings request
+of at most batch_size inputs. API and worker processes then share one
+GPU resident model instead of each keeping a copy on the CPU.
+
+Input:
+    url: str - embeddings endpoint, e.g. a vLLM server started with an embedding model
+    model_name: str - model name sent with each request
+    window_ms: float - maximum time a text waits for a batch
+    batch_size: int - maximum texts per request
+"""
+class RemoteEmbeddings(EmbeddingsProtocol):
+    def __init__(self, url: str = EMBEDDINGS_URL, model_name: str = EMBEDDINGS_MODEL,
+                 window_ms: float = EMBEDDINGS_BATCH_WINDOW_MS, batch_size: int = EMBEDDINGS_BATCH_SIZE) -> None:
+        self.url = url
+        self.model_name = model_name
+        self.window = window_ms / 1000
+        self.batch_size = batch_size
+        self.condition = threading.Condition()
+        self.pending: List[Tuple[float, str, Future]] = []
+        self.executor = ThreadPoolExecutor(max_workers=EMBEDDINGS_WORKERS, thread_name_prefix="embeddings")
+        self.thread = threading.Thread(target=self._run, name="embeddings-batcher", daemon=True)
+        self.thread.start()
+
+    def _request(self, texts: List[str]) -> List[List[float]]:
+        send = lambda url: create_embeddings(url, model=self.model_name, input=texts)
+        response = call_with_retries(lambda: guard(self.url, send), "embeddings")
+        if response.status_code != 200:
+            raise Exception(f"Error: {response.status_code}\n{response.text}")
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        metrics.increment("embeddings.requests")
+        metrics.increment("embeddings.texts", len(texts))
+        return normalize(np.array([item["embedding"] for item in data], dtype=np.float32)).tolist()
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                deadline = self.pending[0][0] + self.window
+                now = time.monotonic()
+                if len(self.pending) < self.batch_size and deadline > now:
+                    self.condition.wait(deadline - now)
+                    continue
+                batch, self.pending = self.pending[:self.batch_size], self.pending[self.batch_size:]
+            self.executor.submit(self._send_batch, batch)
+
+    def _send_batch(self, batch: List[Tuple[float, str, Future]]) -> None:
+        try:
+            vectors = self._request([text for _, text, _ in batch])
+            for (_, _, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+        except Exception as e:
+            logger.error(f"Embedding {len(batch)} texts failed: {str(e)}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        with self.condition:
+            self.pending.append((time.monotonic(), text, future))
+            self.condition.notify()
+        return future
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        texts = list(texts)
+        # Bulk inserts are already batches, only small calls wait for company
+        if len(texts) >= self.batch_size:
+            vectors = []
+            for i in range(0, len(texts), self.batch_size):
+                vectors.extend(self._request(texts[i:i + self.batch_size]))
+            return vectors
+        futures = [self.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.submit(text).result()
+
+_providers: Dict[str, EmbeddingsProtocol] = {}
+_providers_lock = threading.Lock()
+
+"""
+get_embeddings - Process wide embeddings provider for a model
+
+Every vectorstore and memory in the process shares one provider, so a
+model is loaded (or a batcher started) once. EMBEDDINGS_TYPE selects
+local or remote.
+"""
+def get_embeddings(model_name: Optional[str] = None) -> EmbeddingsProtocol:
+    model_name = model_name or EMBEDDINGS_MODEL
+    provider = _providers.get(model_name)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(model_name)
+            if provider is None:
+                if EMBEDDINGS_TYPE == "local":
+                    provider = LocalEmbeddings(model_name)
+                elif EMBEDDINGS_TYPE == "remote":
+                    provider = RemoteEmbeddings(EMBEDDINGS_URL, model_name)
+                else:
+                    raise Exception(f"Embeddings {EMBEDDINGS_TYPE} does not exist")
+                logger.info(f"Using {EMBEDDINGS_TYPE} embeddings {model_name}")
+                _providers[model_name] = provider
+    return provider
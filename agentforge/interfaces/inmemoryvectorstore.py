@@ -1,28 +1,25 @@
 from typing import List, Tuple
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
-from transformers import AutoTokenizer, AutoModel
 from agentforge.adapters import VectorStoreProtocol
+from agentforge.interfaces.embeddings import get_embeddings
 
 class InMemoryVectorStore(VectorStoreProtocol):
     def __init__(self) -> None:
         self.texts: List[str] = []
         self.vectors: List[np.ndarray] = []
-        self.tokenizer = AutoTokenizer.from_pretrained('bert-base-uncased')
-        self.model = AutoModel.from_pretrained('bert-base-uncased')
+        self.embeddings = get_embeddings()
 
     def add_texts(self, texts: List[str]) -> None:
-        for text in texts:
-            inputs = self.tokenizer(text, return_tensors='pt', truncation=True, padding=True)
-            outputs = self.model(**inputs)
+        texts = list(texts)
+        # One batched call instead of a forward pass per text
+        for text, vector in zip(texts, self.embeddings.embed_documents(texts)):
             self.texts.append(text)
-            self.vectors.append(outputs.last_hidden_state.mean(dim=1).detach().numpy())
+            self.vectors.append(np.array(vector).reshape(1, -1))
         self.vectors = np.array(self.vectors).squeeze()  # Convert list of vectors to numpy array for efficient computation
 
     def search(self, text: str, n: int, filter: dict) -> List[Tuple[str, float]]:
-        inputs = self.tokenizer(text, return_tensors='pt', truncation=True, padding=True)
-        outputs = self.model(**inputs)
-        vector = outputs.last_hidden_state.mean(dim=1).detach().numpy().reshape(1, -1)
+        vector = np.array(self.embeddings.embed_query(text)).reshape(1, -1)
         
         # Debug: 
         print("[DEBUG][inmemoryvectorstore][search] vector.shape: ", vector.shape)
@@ -1,7 +1,11 @@
 import os, importlib, redis
 from agentforge.config import DbConfig, RedisConfig
+from agentforge.utils.tracing import instrument
 from typing import Any
 
+# Seconds entries live when {NAME}_CACHE_TTL is unset -- memoized subroutines read user data that changes, so they expire
+CACHE_DEFAULT_TTL = {"subroutine": 300.0}
+
 class InterfaceFactory:
     def __init__(self) -> None:
         self.__interfaces: dict[str, Any] = {}
@@ -47,6 +51,49 @@ class InterfaceFactory:
         else:
             raise Exception(f"FileStore {filestore_type} does not exist")
 
+    # Content addressed store for generated audio and video, served by /v1/media
+    def create_mediastore(self) -> None:
+        mediastore_type = os.getenv("MEDIASTORE_TYPE", "local")
+        if mediastore_type == "local":
+            ContentAddressedStore = getattr(importlib.import_module('agentforge.interfaces.mediastore'), 'ContentAddressedStore')
+            base_directory = os.getenv("MEDIASTORE_PATH") or os.path.join(os.getenv("LOCAL_FILESTORE_PATH", "/tmp"), "media")
+            self.__interfaces["mediastore"] = ContentAddressedStore(base_directory)
+        else:
+            raise Exception(f"MediaStore {mediastore_type} does not exist")
+
+    # Caches are opt-in, e.g. SUBROUTINE_CACHE_TYPE=lru|redis registers "subroutine_cache"
+    def create_cache(self, name: str = "subroutine") -> None:
+        prefix = name.upper()
+        cache_type = os.getenv(f"{prefix}_CACHE_TYPE")
+        ttl = os.getenv(f"{prefix}_CACHE_TTL")
+        ttl = float(ttl) if ttl else CACHE_DEFAULT_TTL.get(name)
+        # Instantiate the correct Cache based on cache_type
+        if not cache_type or cache_type == "none":
+            return
+        elif cache_type == "lru":
+            LRUCache = getattr(importlib.import_module('agentforge.interfaces.lrucache'), 'LRUCache')
+            self.__interfaces[f"{name}_cache"] = LRUCache(int(os.getenv(f"{prefix}_CACHE_SIZE", 1024)), ttl)
+        elif cache_type == "redis":
+            RedisCache = getattr(importlib.import_module('agentforge.interfaces.rediscache'), 'RedisCache')
+            self.__interfaces[f"{name}_cache"] = RedisCache(self.redis_config, prefix=f"{name}_cache", ttl=ttl)
+        else:
+            raise Exception(f"Cache {cache_type} does not exist")
+
+    def create_abort_controller(self) -> None:
+        abort_type = os.getenv("ABORT_CONTROLLER_TYPE", "redis")
+        # Instantiate the correct AbortController based on abort_type
+        if abort_type == "redis":
+            RedisAbortController = getattr(importlib.import_module('agentforge.interfaces.redisabortcontroller'), 'RedisAbortController')
+            self.__interfaces["abort_controller"] = RedisAbortController(self.redis_config)
+        elif abort_type == "local":
+            AbortController = getattr(importlib.import_module('agentforge.utils'), 'AbortController')
+            self.__interfaces["abort_controller"] = AbortController()
+        else:
+            raise Exception(f"AbortController {abort_type} does not exist")
+
+    def has_interface(self, interface_name: str) -> bool:
+        return interface_name in self.__interfaces
+
     def create_image_generator(self, generator_type: str) -> None:
         if generator_type == "pixart":
             pixArtService = getattr(importlib.import_module('agentforge.interfaces.api'), 'PixArtService')
@@ -76,6 +123,32 @@ class InterfaceFactory:
         #     self.__interfaces["vqa"] = VQAService()
         else:
             raise Exception(f"Service {service_type} does not exist")
+        self._attach_response_cache(service_type)
+
+    # Services answering prompts share the response cache when RESPONSE_CACHE_TYPE is configured
+    def _attach_response_cache(self, service_type: str) -> None:
+        if "response_cache" not in self.__interfaces or service_type not in ["llm", "vllm", "tokenizer"]:
+            return
+        ResponseCache = getattr(importlib.import_module('agentforge.interfaces.responsecache'), 'ResponseCache')
+        service = self.__interfaces["tokenizer" if service_type == "tokenizer" else "llm"]
+        service.response_cache = ResponseCache(self.__interfaces["response_cache"])
+
+    # Token counts for prompt budgeting, TOKEN_COUNTER_TYPE=remote|local -- local loads the tokenizer in-process on first use, falling back to the tokenizer service
+    def create_token_counter(self) -> None:
+        counter_type = os.getenv("TOKEN_COUNTER_TYPE", "remote")
+        TokenCounter = getattr(importlib.import_module('agentforge.interfaces.tokencounter'), 'TokenCounter')
+        service = self.__interfaces.get("tokenizer")
+        if counter_type == "local":
+            self.__interfaces["token_counter"] = TokenCounter.from_pretrained(service=service)
+        elif counter_type == "remote":
+            self.__interfaces["token_counter"] = TokenCounter(service=service)
+        else:
+            raise Exception(f"TokenCounter {counter_type} does not exist")
+
+    # Process wide embeddings provider, EMBEDDINGS_TYPE=local|remote -- the vectorstores share the same instance
+    def create_embeddings(self) -> None:
+        get_embeddings = getattr(importlib.import_module('agentforge.interfaces.embeddings'), 'get_embeddings')
+        self.__interfaces["embeddings"] = get_embeddings(os.getenv("VECTOR_EMBEDDINGS_MODEL_NAME"))
 
     def create_vectorstore(self) -> None:
         vectorstore_type = os.getenv("VECTORSTORE_TYPE")
@@ -107,9 +180,11 @@ class InterfaceFactory:
             self.__interfaces["vectorstore_memory"] = VectorStoreMemory(self.__interfaces["vectorstore"])
         else:
             raise Exception(f"VectorStore {vectorstore_type} does not exist")
+        # Every lookup goes through these, so they are timed once here for all callers
+        instrument(self.__interfaces["vectorstore"], "vectorstore", ["search", "search_with_score", "add_texts"])
     
-    # Default redis_store for streaming
-    def create_redis_connection(self) -> None:
+    # Default redis_store for streaming -- a client on the process wide pool, cheap to call per use
+    def create_redis_connection(self) -> redis.Redis:
         # Check if the environment variables are provided
         if self.redis_config.host is None:
             raise ValueError("Environment variable REDIS_HOST is not set")
@@ -124,10 +199,13 @@ class InterfaceFactory:
         except ValueError:
             raise ValueError("Environment variable REDIS_DB should be an integer")
 
-        # Create the Redis connection
-        redis_store = redis.StrictRedis(host=self.redis_config.host, port=self.redis_config.port, db=self.redis_config.db)
-        
-        return redis_store
+        get_redis = getattr(importlib.import_module('agentforge.interfaces.redispool'), 'get_redis')
+        return get_redis(self.redis_config)
+
+    # asyncio client on the running loop's pool, for coroutines in the API server
+    def create_async_redis_connection(self) -> Any:
+        get_async_redis = getattr(importlib.import_module('agentforge.interfaces.redispool'), 'get_async_redis')
+        return get_async_redis(self.redis_config)
 
     def create_keygenerator(self) -> None:
         keygenerator_type = os.getenv("KEYGENERATOR_TYPE")
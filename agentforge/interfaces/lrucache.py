@@ -0,0 +1,51 @@
+import copy, threading, time
+from collections import OrderedDict
+from typing import Any, Optional
+from agentforge.adapters import CacheProtocol
+
+"""
+LRUCache - In-process cache with LRU eviction and per-entry TTL
+
+Values are deep copied in and out so callers can mutate what they get
+back without corrupting the cached entry.
+
+Input:
+    max_size: int - maximum number of entries before the least recently used is evicted
+    ttl: float - default seconds an entry lives, None keeps entries until evicted
+"""
+class LRUCache(CacheProtocol):
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries: OrderedDict = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires is not None and expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = ttl if ttl is not None else self.ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        value = copy.deepcopy(value)
+        with self.lock:
+            self.entries[key] = (expires, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
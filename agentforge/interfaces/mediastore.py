@@ -0,0 +1,72 @@
+import hashlib, mimetypes, os, re, shutil, tempfile
+from typing import Any, Dict, Optional
+from agentforge.adapters import MediaStoreProtocol
+from agentforge.utils import metrics
+
+# Public path the API serves stored media under
+MEDIA_URL_PREFIX = os.getenv("MEDIA_URL_PREFIX", "/v1/media")
+MEDIA_ID = re.compile(r'^[0-9a-f]{64}(\.[0-9a-z]{1,8})?$')
+
+"""
+ContentAddressedStore - Media stored under the SHA-256 of its bytes
+
+A TTS or lip sync output is stored once, then referenced by id in
+published messages and API responses instead of being base64 encoded
+into them. The same clip produced twice, e.g. a cached TTS response, is
+stored once. Files are hard linked into the store when it shares a
+filesystem with the producer, copied otherwise.
+
+Input:
+    base_directory: str - directory holding the blobs
+"""
+class ContentAddressedStore(MediaStoreProtocol):
+    def __init__(self, base_directory: str) -> None:
+        self.base_directory = base_directory
+        os.makedirs(base_directory, exist_ok=True)
+
+    def _path(self, media_id: str) -> str:
+        return os.path.join(self.base_directory, media_id[:2], media_id)
+
+    # Stores the file at path and returns its reference: id, url, content type and size
+    def put_file(self, path: str) -> Dict[str, Any]:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(chunk)
+        extension = os.path.splitext(path)[1].lower()
+        media_id = digest.hexdigest() + extension
+        target = self._path(media_id)
+        if os.path.exists(target):
+            metrics.increment("media.deduplicated")
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # Written under a temporary name so readers never see a partial file
+            fd, partial = tempfile.mkstemp(dir=os.path.dirname(target))
+            os.close(fd)
+            try:
+                try:
+                    os.remove(partial)
+                    os.link(path, partial)
+                except OSError:
+                    shutil.copyfile(path, partial)
+                os.replace(partial, target)
+            finally:
+                if os.path.exists(partial):
+                    os.remove(partial)
+            metrics.increment("media.stored")
+        return {
+            "media_id": media_id,
+            "url": f"{MEDIA_URL_PREFIX}/{media_id}",
+            "type": self.content_type(media_id),
+            "size": os.path.getsize(target),
+        }
+
+    # The id keeps the producer's file extension, e.g. .wav or .mp4
+    def content_type(self, media_id: str) -> str:
+        return mimetypes.guess_type(media_id)[0] or "application/octet-stream"
+
+    def get_path(self, media_id: str) -> Optional[str]:
+        if not MEDIA_ID.match(media_id):
+            return None
+        path = self._path(media_id)
+        return path if os.path.isfile(path) else None
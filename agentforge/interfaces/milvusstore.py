@@ -1,7 +1,7 @@
 from __future__ import annotations
 from typing import Any, List
 from agentforge.adapters import VectorStoreProtocol
-from langchain.embeddings import HuggingFaceEmbeddings
+from agentforge.interfaces.embeddings import get_embeddings
 from agentforge.utils import logger
 from typing import Any, Iterable, List, Optional, Tuple, Union
 from uuid import uuid4
@@ -23,8 +23,8 @@ DEFAULT_MILVUS_CONNECTION = {
 
 class MilvusVectorStore(VectorStoreProtocol):
    def __init__(self, model_name: str, collection: str, reset: bool = False):
-      encode_kwargs = {'normalize_embeddings': True}
-      self.embdeddings = HuggingFaceEmbeddings(model_name=model_name, encode_kwargs=encode_kwargs)
+      # Normalized vectors from the process wide provider, shared with every other store
+      self.embdeddings = get_embeddings(model_name)
       self.reset = reset
       self.collection = "fallback"
       # self.init_store_connection(collection, force=True)
@@ -99,6 +99,24 @@ class MongoDBKVStore(DB):
             raise
         return ret
 
+    # Partial update of dotted field paths, only the given fields are sent to the server
+    def update(self, collection: str, key: str, set_fields: Dict[str, Any], unset_fields: Optional[List[str]] = None) -> None:
+        self._check_connection()
+        collection = self.db[collection]
+        operations = {}
+        if set_fields:
+            operations["$set"] = set_fields
+        if unset_fields:
+            operations["$unset"] = {field: "" for field in unset_fields}
+        if not operations:
+            return None
+        try:
+            ret = collection.update_one({"id": key}, operations, upsert=True)
+        except Exception as e:
+            logging.error(f'Update operation failed for key {key}: {str(e)}')
+            raise
+        return ret
+
     def copy(self, src_collection: str, dest_collection: str, key: str, new_key: Optional[str] = None) -> None:
         self._check_connection()
         src_collection = self.db[src_collection]
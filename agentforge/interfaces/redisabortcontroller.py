@@ -0,0 +1,56 @@
+import json, threading, time, uuid, redis
+from agentforge.config import RedisConfig
+from agentforge.interfaces.redispool import get_redis
+from agentforge.utils import AbortController, logger
+
+ABORT_CHANNEL = "agent-abort"
+
+"""
+RedisAbortController - AbortController shared by every worker through Redis pub/sub
+
+send_signal publishes the user_id, a listener thread in each worker
+delivers it to the local listeners, so /v1/abort cancels the user's runs
+wherever they execute. The sending worker delivers its own signal
+immediately instead of waiting for the round trip.
+
+Input:
+    config: RedisConfig - connection settings
+    channel: str - pub/sub channel carrying abort signals
+"""
+class RedisAbortController(AbortController):
+    def __init__(self, config: RedisConfig, channel: str = ABORT_CHANNEL):
+        super().__init__()
+        self.db = get_redis(config)
+        self.channel = channel
+        self.worker_id = uuid.uuid4().hex
+        self.thread = threading.Thread(target=self._listen, name="abort-listener", daemon=True)
+        self.thread.start()
+
+    def send_signal(self, user_id, signal=True):
+        self._receive(user_id)
+        try:
+            self.db.publish(self.channel, json.dumps({"user_id": user_id, "worker_id": self.worker_id}))
+        except redis.RedisError as e:
+            logger.error(f"Failed to publish abort for {user_id}: {str(e)}")
+
+    def _listen(self):
+        backoff = 1
+        while True:
+            try:
+                pubsub = self.db.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                backoff = 1
+                for message in pubsub.listen():
+                    # A malformed message is dropped, resubscribing would lose the signals sent meanwhile
+                    try:
+                        data = json.loads(message["data"])
+                        user_id = data["user_id"]
+                    except (ValueError, KeyError, TypeError) as e:
+                        logger.error(f"Ignoring malformed abort message: {str(e)}")
+                        continue
+                    if data.get("worker_id") != self.worker_id:
+                        self._receive(user_id)
+            except Exception as e:
+                logger.error(f"Abort listener disconnected, retrying in {backoff}s: {str(e)}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
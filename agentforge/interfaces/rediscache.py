@@ -0,0 +1,57 @@
+import pickle, redis
+from agentforge.interfaces.redispool import get_redis
+from typing import Any, Optional
+from agentforge.adapters import CacheProtocol
+from agentforge.config import RedisConfig
+from agentforge.utils import logger
+
+"""
+RedisCache - Cache shared by every worker, entries expire through Redis TTLs
+
+Values are pickled. Redis errors are logged and treated as a miss so a
+cache outage only costs the recomputation.
+
+Input:
+    config: RedisConfig - connection settings
+    prefix: str - namespace prepended to every key
+    ttl: float - default seconds an entry lives, None keeps entries until evicted by Redis
+"""
+class RedisCache(CacheProtocol):
+    def __init__(self, config: RedisConfig, prefix: str = "cache", ttl: Optional[float] = None) -> None:
+        self.db = get_redis(config)
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            value = self.db.get(self._key(key))
+        except redis.RedisError as e:
+            logger.error(f"Cache get failed for {key}: {str(e)}")
+            return None
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = ttl if ttl is not None else self.ttl
+        try:
+            if ttl is not None:
+                self.db.psetex(self._key(key), int(ttl * 1000), pickle.dumps(value))
+            else:
+                self.db.set(self._key(key), pickle.dumps(value))
+        except redis.RedisError as e:
+            logger.error(f"Cache set failed for {key}: {str(e)}")
+
+    def delete(self, key: str) -> None:
+        try:
+            self.db.delete(self._key(key))
+        except redis.RedisError as e:
+            logger.error(f"Cache delete failed for {key}: {str(e)}")
+
+    def clear(self) -> None:
+        try:
+            for key in self.db.scan_iter(match=f"{self.prefix}:*"):
+                self.db.delete(key)
+        except redis.RedisError as e:
+            logger.error(f"Cache clear failed for {self.prefix}: {str(e)}")
@@ -0,0 +1,113 @@
+import asyncio, threading, time, weakref
+from typing import Any, Dict, List, Tuple
+import redis
+from redis import asyncio as aioredis
+from agentforge.config import RedisConfig
+from agentforge.utils import logger, metrics
+
+_pools: Dict[Tuple, redis.Redis] = {}
+_pools_lock = threading.Lock()
+_async_pools = weakref.WeakKeyDictionary()
+
+def _key(config: RedisConfig) -> Tuple:
+    return (config.host, config.port, config.db, config.username)
+
+def _name(config: RedisConfig) -> str:
+    return f"{config.host}:{config.port}/{config.db}"
+
+def _connection_kwargs(config: RedisConfig) -> Dict[str, Any]:
+    return {
+        "host": config.host,
+        "port": config.port,
+        "db": config.db,
+        "username": config.username,
+        "password": config.password,
+        # Connections idle longer than this are PINGed before reuse, dead ones are replaced
+        "health_check_interval": config.health_check_interval,
+    }
+
+"""
+MeteredConnectionPool - BlockingConnectionPool that records checkouts
+
+Callers wait up to pool_timeout for a free connection instead of opening
+more than max_connections, the wait is recorded as redis.pool.wait.
+MeteredAsyncConnectionPool is the asyncio counterpart.
+"""
+class MeteredConnectionPool(redis.BlockingConnectionPool):
+    def get_connection(self, *args, **kwargs):
+        start = time.perf_counter()
+        connection = super().get_connection(*args, **kwargs)
+        metrics.observe("redis.pool.wait", (time.perf_counter() - start) * 1000)
+        metrics.increment("redis.pool.checkouts")
+        return connection
+
+class MeteredAsyncConnectionPool(aioredis.BlockingConnectionPool):
+    async def get_connection(self, *args, **kwargs):
+        start = time.perf_counter()
+        connection = await super().get_connection(*args, **kwargs)
+        metrics.observe("redis.async_pool.wait", (time.perf_counter() - start) * 1000)
+        metrics.increment("redis.async_pool.checkouts")
+        return connection
+
+"""
+get_redis - Process wide Redis client for config, backed by one bounded pool
+
+Every publisher, cache and subscriber in the process shares the pool, so
+a request borrows an open connection instead of connecting and tearing
+down its own. Closing the returned client does not close the pool.
+"""
+def get_redis(config: RedisConfig) -> redis.Redis:
+    key = _key(config)
+    client = _pools.get(key)
+    if client is None:
+        with _pools_lock:
+            client = _pools.get(key)
+            if client is None:
+                pool = MeteredConnectionPool(max_connections=config.max_connections, timeout=config.pool_timeout,
+                                             **_connection_kwargs(config))
+                client = _pools[key] = redis.Redis(connection_pool=pool)
+                logger.info(f"Opened Redis pool {_name(config)} (max {config.max_connections} connections)")
+    return client
+
+"""
+get_async_redis - Pooled asyncio Redis client for config on the running loop
+
+Connections belong to the loop that opened them, so each loop gets its
+own pool, the same way the httpx clients are kept per loop.
+"""
+def get_async_redis(config: RedisConfig) -> aioredis.Redis:
+    clients = _async_pools.setdefault(asyncio.get_running_loop(), {})
+    key = _key(config)
+    client = clients.get(key)
+    if client is None:
+        pool = MeteredAsyncConnectionPool(max_connections=config.async_max_connections, timeout=config.pool_timeout,
+                                          **_connection_kwargs(config))
+        client = clients[key] = aioredis.Redis(connection_pool=pool)
+    return client
+
+async def close_async_redis() -> None:
+    for client in _async_pools.pop(asyncio.get_running_loop(), {}).values():
+        await client.connection_pool.disconnect()
+
+def close_redis() -> None:
+    with _pools_lock:
+        for client in _pools.values():
+            client.connection_pool.disconnect()
+        _pools.clear()
+
+# Connections opened per pool and whether each Redis answers a PING
+def redis_status() -> List[Dict[str, Any]]:
+    status = []
+    for (host, port, db, _), client in list(_pools.items()):
+        pool = client.connection_pool
+        try:
+            healthy = bool(client.ping())
+        except redis.RedisError:
+            healthy = False
+        status.append({
+            "pool": f"{host}:{port}/{db}",
+            "healthy": healthy,
+            "connections": len(getattr(pool, "_connections", [])),
+            "max_connections": pool.max_connections,
+        })
+    return status
@@ -0,0 +1,85 @@
+import os
+from typing import Any, AsyncIterator, Iterator, List, Optional, Tuple
+from agentforge.utils import metrics
+
+# Entries kept per response stream, bounds a runaway generation
+STREAM_MAXLEN = int(os.getenv("STREAM_MAXLEN", 4096))
+# Seconds a response stream can still be resumed after its last entry
+STREAM_TTL = int(os.getenv("STREAM_TTL", 300))
+# Longest blocking read, readers send a keepalive or check for an expired stream when it passes
+STREAM_BLOCK_MS = int(os.getenv("STREAM_BLOCK_MS", 15000))
+
+# Generations end with one of these appended to the last entry
+END_TOKENS = ("</s>", "<|endoftext|>")
+
+"""
+Response streams - Generated text is appended to a Redis Stream per request
+
+Unlike pub/sub, entries stay in Redis until the stream expires, so a
+reader that subscribes late or reconnects reads from the entry it saw
+last (the SSE Last-Event-ID) instead of losing tokens. Readers block on
+XREAD, a token reaches the client as soon as it is written.
+"""
+
+# Requests carrying a stream_id get their own stream, anything else shares the user's stream
+def stream_key(user_id: Any, stream_id: Optional[str] = None) -> str:
+    return f"streaming-{user_id}:{stream_id}" if stream_id else f"streaming-{user_id}"
+
+# Pub/sub channel a response's audio or video clips are announced on, scoped like its stream
+def media_channel(user_id: Any, stream_id: Optional[str] = None, av_type: str = "audio") -> str:
+    return f"{stream_key(user_id, stream_id)}:{av_type}"
+
+def _text(value: Any) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+def publish(redis_store: Any, key: str, text: str) -> str:
+    return publish_many(redis_store, key, [text])[-1]
+
+# Appends entries in one round trip
+def publish_many(redis_store: Any, key: str, texts: List[str]) -> List[str]:
+    pipe = redis_store.pipeline(transaction=False)
+    for text in texts:
+        pipe.xadd(key, {"data": text}, maxlen=STREAM_MAXLEN, approximate=True)
+    pipe.expire(key, STREAM_TTL)
+    entry_ids = pipe.execute()[:-1]
+    metrics.increment("stream.published", len(texts))
+    return [_text(entry_id) for entry_id in entry_ids]
+
+# Returns the text without its end token and whether the generation ended
+def split_end(text: str) -> Tuple[str, bool]:
+    for end in END_TOKENS:
+        if text.endswith(end):
+            return text[:-len(end)], True
+    return text, False
+
+"""
+read - Blocking reader over a response stream, synchronous
+
+Yields (entry_id, text) for every entry after last_id ("0" reads from the
+start) and (None, None) each time STREAM_BLOCK_MS passes without one.
+"""
+def read(redis_store: Any, key: str, last_id: str = "0") -> Iterator[Tuple[Optional[str], Optional[str]]]:
+    while True:
+        response = redis_store.xread({key: last_id}, block=STREAM_BLOCK_MS)
+        if not response:
+            yield None, None
+            continue
+        for _, entries in response:
+            for entry_id, fields in entries:
+                last_id = _text(entry_id)
+                yield last_id, _text(fields.get(b"data", fields.get("data", b"")))
+
+async def aread(redis: Any, key: str, last_id: str = "0") -> AsyncIterator[Tuple[Optional[str], Optional[str]]]:
+    while True:
+        response = await redis.xread({key: last_id}, block=STREAM_BLOCK_MS)
+        if not response:
+            yield None, None
+            continue
+        for _, entries in response:
+            for entry_id, fields in entries:
+                last_id = _text(entry_id)
+                yield last_id, _text(fields.get(b"data", fields.get("data", b"")))
+
+# One SSE event, multi-line text is sent as consecutive data lines
+def sse_event(entry_id: str, text: str) -> str:
+    return f"id: {entry_id}\n" + "".join(f"data: {line}\n" for line in text.split("\n")) + "\n"
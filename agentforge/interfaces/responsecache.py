@@ -0,0 +1,62 @@
+import os
+from typing import Any, Dict, Optional
+from agentforge.adapters import CacheProtocol
+from agentforge.utils import logger, metrics, cache_key
+
+# Cache sampled (temperature > 0) outputs as well, off by default since callers expect variety
+RESPONSE_CACHE_SAMPLED = os.getenv("RESPONSE_CACHE_SAMPLED", "false").lower() in ["true", "y", "1"]
+
+"""
+ResponseCache - Caches model responses keyed on a canonical hash of the request
+
+The key covers the service, the prompt, the model and every generation
+parameter, serialized with sorted keys so equal requests hash the same
+regardless of dict order. Only requests whose output is deterministic
+(greedy, beam search or seeded) are cached unless sampled is set or the
+request carries "cache": True. Streaming requests are never cached.
+
+Hits and misses are counted as cache.response.hit / cache.response.miss
+and reported with their hit rate on /v1/admin/metrics.
+
+Input:
+    backend: CacheProtocol - LRU or Redis cache from InterfaceFactory.create_cache("response")
+    sampled: bool - also cache sampled outputs
+"""
+class ResponseCache:
+    def __init__(self, backend: CacheProtocol, sampled: bool = RESPONSE_CACHE_SAMPLED) -> None:
+        self.backend = backend
+        self.sampled = sampled
+
+    @staticmethod
+    def is_deterministic(generation_config: Optional[Dict[str, Any]], default_temperature: float = 0.0) -> bool:
+        generation_config = generation_config or {}
+        if generation_config.get("use_beam_search") or generation_config.get("seed") is not None:
+            return True
+        return float(generation_config.get("temperature", default_temperature)) <= 0
+
+    # override is the caller's explicit "cache" flag, None leaves the decision to the config
+    def cacheable(self, generation_config: Optional[Dict[str, Any]], default_temperature: float = 0.0,
+                  override: Optional[bool] = None) -> bool:
+        if override is not None:
+            return bool(override)
+        return self.sampled or self.is_deterministic(generation_config, default_temperature)
+
+    def key(self, service: str, request: Dict[str, Any]) -> str:
+        return cache_key(f"response:{service}", request)
+
+    def get(self, service: str, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        try:
+            response = self.backend.get(self.key(service, request))
+        except Exception as e:
+            logger.error(f"Response cache lookup failed: {str(e)}")
+            response = None
+        metrics.increment("cache.response.hit" if response is not None else "cache.response.miss")
+        return response
+
+    def set(self, service: str, request: Dict[str, Any], response: Dict[str, Any]) -> None:
+        if response is None:
+            return
+        try:
+            self.backend.set(self.key(service, request), response)
+        except Exception as e:
+            logger.error(f"Response cache store failed: {str(e)}")
@@ -0,0 +1,170 @@
+import asyncio, os, threading, time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, Iterator, Optional
+from agentforge.utils import logger, metrics, check_cancelled, get_current_token
+
+# Completion requests in flight across all classes
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 64))
+# Background generation never holds more than this many slots
+LLM_BACKGROUND_CONCURRENCY = int(os.getenv("LLM_BACKGROUND_CONCURRENCY", 8))
+
+# name: (weight, concurrency limit, vLLM priority -- lower is served first)
+REQUEST_CLASSES = {
+    "interactive": (8, LLM_MAX_CONCURRENCY, 0),
+    "default": (4, LLM_MAX_CONCURRENCY, 5),
+    "background": (1, LLM_BACKGROUND_CONCURRENCY, 10),
+}
+DEFAULT_REQUEST_CLASS = "interactive"
+
+current_request_class: ContextVar[Optional[str]] = ContextVar("current_request_class", default=None)
+
+"""
+request_class - Runs the block's LLM requests under the given class
+
+For callers that cannot put "request_class" into every form_data, e.g. a
+Celery task driving several generators.
+"""
+@contextmanager
+def request_class(name: str) -> Iterator[None]:
+    reset = current_request_class.set(name)
+    try:
+        yield
+    finally:
+        current_request_class.reset(reset)
+
+class RequestClass:
+    def __init__(self, name: str, weight: float, limit: int, priority: int) -> None:
+        self.name = name
+        self.weight = weight
+        self.limit = limit
+        self.priority = priority
+        self.queue: deque = deque()
+        self.in_flight = 0
+        self.finish = 0.0 # virtual finish time of the last request queued
+
+class Ticket:
+    def __init__(self, request_class: RequestClass, tag: float, lock: threading.Lock,
+                 loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        self.request_class = request_class
+        self.tag = tag
+        self.queued_at = time.perf_counter()
+        self.granted = False
+        # Blocking callers sleep on the scheduler's lock until they are granted or cancelled
+        self.condition = threading.Condition(lock)
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+
+    # Called with the scheduler's lock held
+    def grant(self) -> None:
+        self.granted = True
+        self.condition.notify()
+        if self.future is not None:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def wake(self) -> None:
+        with self.condition:
+            self.condition.notify()
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+"""
+RequestScheduler - Weighted fair queuing of LLM requests by request class
+
+Every request takes a slot before it is sent. Slots are handed out in
+order of virtual finish time, so under contention each class gets
+throughput in proportion to its weight, and no class exceeds its own
+concurrency limit. Interactive chat therefore keeps its latency while
+background generation uses whatever capacity is left. The class's vLLM
+priority is returned with the slot for servers running
+--scheduling-policy priority.
+
+Input:
+    classes: Dict[str, tuple] - name to (weight, concurrency limit, vLLM priority)
+    max_concurrency: int - requests in flight across all classes
+"""
+class RequestScheduler:
+    def __init__(self, classes: Dict[str, tuple] = REQUEST_CLASSES, max_concurrency: int = LLM_MAX_CONCURRENCY) -> None:
+        self.classes = {name: RequestClass(name, *config) for name, config in classes.items()}
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.vtime = 0.0
+        self.lock = threading.Lock()
+
+    def resolve(self, name: Optional[str] = None) -> RequestClass:
+        name = name or current_request_class.get() or DEFAULT_REQUEST_CLASS
+        if name not in self.classes:
+            logger.warning(f"Unknown request class {name}, using {DEFAULT_REQUEST_CLASS}")
+            name = DEFAULT_REQUEST_CLASS
+        return self.classes[name]
+
+    def _enqueue(self, name: Optional[str], loop: Optional[asyncio.AbstractEventLoop] = None) -> Ticket:
+        request_class = self.resolve(name)
+        with self.lock:
+            # An idle class restarts at the current virtual time instead of spending saved-up credit
+            tag = max(self.vtime, request_class.finish) + 1 / request_class.weight
+            request_class.finish = tag
+            ticket = Ticket(request_class, tag, self.lock, loop)
+            request_class.queue.append(ticket)
+            self._dispatch()
+        return ticket
+
+    def _dispatch(self) -> None:
+        while self.in_flight < self.max_concurrency:
+            heads = [c for c in self.classes.values() if c.queue and c.in_flight < c.limit]
+            if not heads:
+                return
+            request_class = min(heads, key=lambda c: c.queue[0].tag)
+            ticket = request_class.queue.popleft()
+            request_class.in_flight += 1
+            self.in_flight += 1
+            self.vtime = ticket.tag
+            metrics.observe(f"scheduler.{request_class.name}.wait", (time.perf_counter() - ticket.queued_at) * 1000)
+            ticket.grant()
+
+    def _release(self, ticket: Ticket) -> None:
+        with self.lock:
+            if ticket.granted:
+                ticket.request_class.in_flight -= 1
+                self.in_flight -= 1
+            else:
+                ticket.request_class.queue.remove(ticket)
+            self._dispatch()
+
+    """
+    slot - Holds a slot for the duration of the block, yields the vLLM priority
+
+    The caller is woken the moment a release hands it the slot, or its
+    subroutine is cancelled while it waits.
+    """
+    @contextmanager
+    def slot(self, name: Optional[str] = None) -> Iterator[int]:
+        ticket = self._enqueue(name)
+        token = get_current_token()
+        unregister = token.add_callback(ticket.wake) if token is not None else None
+        try:
+            with ticket.condition:
+                while not ticket.granted:
+                    check_cancelled()
+                    ticket.condition.wait()
+            yield ticket.request_class.priority
+        finally:
+            if unregister is not None:
+                unregister()
+            self._release(ticket)
+
+    @asynccontextmanager
+    async def aslot(self, name: Optional[str] = None) -> AsyncIterator[int]:
+        ticket = self._enqueue(name, asyncio.get_running_loop())
+        try:
+            await ticket.future
+            yield ticket.request_class.priority
+        finally:
+            self._release(ticket)
+
+    def status(self) -> Dict[str, Dict[str, int]]:
+        with self.lock:
+            return {c.name: {"queued": len(c.queue), "in_flight": c.in_flight} for c in self.classes.values()}
@@ -0,0 +1,312 @@
+import asyncio, os, re, threading, time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+from agentforge.adapters import StreamBusProtocol
+from agentforge.config import RedisConfig
+from agentforge.interfaces import redisstream
+from agentforge.interfaces.redispool import get_redis, get_async_redis
+from agentforge.interfaces.redisstream import STREAM_MAXLEN, STREAM_TTL, STREAM_BLOCK_MS
+from agentforge.utils import logger, metrics
+
+# auto keeps a stream in process when the API runs the agent that produces it, redis always goes through Redis
+STREAM_BUS = os.getenv("STREAM_BUS", "auto")
+# Streamed text is coalesced into one entry per window, byte threshold or sentence, whichever comes first
+STREAM_COALESCE_MS = float(os.getenv("STREAM_COALESCE_MS", 20))
+STREAM_COALESCE_BYTES = int(os.getenv("STREAM_COALESCE_BYTES", 512))
+STREAM_COALESCE_SENTENCES = os.getenv("STREAM_COALESCE_SENTENCES", "true").lower() in ['true', 'y', '1']
+# A chunk ending a sentence or line goes out at once, so readers splitting on sentences are not held back
+SENTENCE_END = re.compile(r'[.!?]["\')\]]*\s*$|\n')
+
+"""
+RedisStreamBus - Response streams kept in Redis Streams
+
+Works across processes, e.g. a client resuming on another API worker.
+Uses the process wide Redis pools.
+"""
+class RedisStreamBus(StreamBusProtocol):
+    def __init__(self, config: RedisConfig) -> None:
+        self.config = config
+
+    def publish_many(self, key: str, texts: List[str]) -> List[str]:
+        return redisstream.publish_many(get_redis(self.config), key, texts)
+
+    def read(self, key: str, last_id: str = "0") -> Iterator[Tuple[Optional[str], Optional[str]]]:
+        return redisstream.read(get_redis(self.config), key, last_id)
+
+    def aread(self, key: str, last_id: str = "0") -> AsyncIterator[Tuple[Optional[str], Optional[str]]]:
+        return redisstream.aread(get_async_redis(self.config), key, last_id)
+
+    def exists(self, key: str) -> bool:
+        return bool(get_redis(self.config).exists(key))
+
+    async def aexists(self, key: str) -> bool:
+        return bool(await get_async_redis(self.config).exists(key))
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+class LocalStream:
+    def __init__(self) -> None:
+        self.entries: List[Tuple[str, str]] = []
+        self.sequence = 0
+        self.condition = threading.Condition()
+        self.waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self.touched = time.monotonic()
+
+    def append(self, texts: List[str]) -> List[str]:
+        with self.condition:
+            entry_ids = []
+            for text in texts:
+                self.sequence += 1
+                entry_ids.append(f"{self.sequence}-0")
+                self.entries.append((entry_ids[-1], text))
+            del self.entries[:-STREAM_MAXLEN]
+            self.touched = time.monotonic()
+            self.condition.notify_all()
+            waiters, self.waiters = self.waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+        return entry_ids
+
+    # Entries after last_id, ids count up from 1 so the position is arithmetic
+    def after(self, last_id: str) -> List[Tuple[str, str]]:
+        try:
+            sequence = int(last_id.split("-")[0])
+        except ValueError:
+            sequence = 0
+        first = self.sequence - len(self.entries) + 1
+        return self.entries[max(0, sequence - first + 1):]
+
+"""
+LocalStreamBus - Response streams kept in this process
+
+When the API server runs the agent itself, the generating thread and the
+coroutine relaying the stream share a process, so entries are handed over
+in memory instead of taking two Redis round trips per flush. Readers wake
+as soon as an entry is appended, async readers through their event loop.
+Streams idle for STREAM_TTL are dropped, like their Redis counterparts,
+when a stream is opened or a reader has waited STREAM_BLOCK_MS.
+"""
+class LocalStreamBus(StreamBusProtocol):
+    def __init__(self, ttl: float = STREAM_TTL) -> None:
+        self.ttl = ttl
+        self.streams: Dict[str, LocalStream] = {}
+        self.lock = threading.Lock()
+        self.pruned = time.monotonic()
+
+    def open(self, key: str) -> None:
+        with self.lock:
+            self._prune()
+            self.streams.setdefault(key, LocalStream())
+
+    # Drops streams idle for longer than ttl, scans at most once a second
+    def prune(self) -> None:
+        with self.lock:
+            self._prune()
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        if now - self.pruned < 1:
+            return
+        self.pruned = now
+        for expired in [k for k, stream in self.streams.items() if now - stream.touched > self.ttl]:
+            del self.streams[expired]
+
+    def has(self, key: str) -> bool:
+        return key in self.streams
+
+    def _stream(self, key: str) -> LocalStream:
+        with self.lock:
+            return self.streams.setdefault(key, LocalStream())
+
+    def publish_many(self, key: str, texts: List[str]) -> List[str]:
+        entry_ids = self._stream(key).append(texts)
+        metrics.increment("stream.local.published", len(texts))
+        return entry_ids
+
+    def read(self, key: str, last_id: str = "0") -> Iterator[Tuple[Optional[str], Optional[str]]]:
+        stream = self._stream(key)
+        while True:
+            with stream.condition:
+                entries = stream.after(last_id)
+                if not entries:
+                    stream.condition.wait(STREAM_BLOCK_MS / 1000)
+                    entries = stream.after(last_id)
+            if not entries:
+                # Idle readers free expired streams, an idle process has no opens to do it
+                self.prune()
+                yield None, None
+            for last_id, text in entries:
+                yield last_id, text
+
+    async def aread(self, key: str, last_id: str = "0") -> AsyncIterator[Tuple[Optional[str], Optional[str]]]:
+        stream = self._stream(key)
+        loop = asyncio.get_running_loop()
+        while True:
+            with stream.condition:
+                entries = stream.after(last_id)
+                if not entries:
+                    waiter = (loop, loop.create_future())
+                    stream.waiters.append(waiter)
+            if not entries:
+                idle = False
+                try:
+                    await asyncio.wait_for(waiter[1], STREAM_BLOCK_MS / 1000)
+                except asyncio.TimeoutError:
+                    idle = True
+                finally:
+                    # Timed out or cancelled, the next append would otherwise find a dead future
+                    with stream.condition:
+                        if waiter in stream.waiters:
+                            stream.waiters.remove(waiter)
+                if idle:
+                    self.prune()
+                    yield None, None
+                continue
+            for last_id, text in entries:
+                yield last_id, text
+
+    def exists(self, key: str) -> bool:
+        stream = self.streams.get(key)
+        return stream is not None and time.monotonic() - stream.touched <= self.ttl
+
+    async def aexists(self, key: str) -> bool:
+        return self.exists(key)
+
+local_bus = LocalStreamBus()
+_redis_bus: Optional[RedisStreamBus] = None
+
+def redis_bus() -> RedisStreamBus:
+    global _redis_bus
+    if _redis_bus is None:
+        _redis_bus = RedisStreamBus(RedisConfig.from_env())
+    return _redis_bus
+
+"""
+open_stream - Bus for a stream whose producer runs in this process
+
+Called by the API before it starts the run. With STREAM_BUS=auto the
+stream is registered in process, so the producer's get_stream_bus finds
+it there, otherwise it goes through Redis.
+"""
+def open_stream(key: str) -> StreamBusProtocol:
+    if STREAM_BUS == "auto":
+        local_bus.open(key)
+        return local_bus
+    return redis_bus()
+
+# Bus carrying key -- in process if it was opened here, Redis for everything else
+def get_stream_bus(key: str) -> StreamBusProtocol:
+    return local_bus if local_bus.has(key) else redis_bus()
+
+"""
+StreamPublisher - Coalesces streamed deltas into fewer stream entries
+
+Text is buffered and appended as one entry once window_ms has passed
+since the first buffered delta, max_bytes are buffered, or a delta ends
+a sentence, whichever comes first. One response then costs tens of
+entries and SSE frames instead of one per token while reading the same.
+Window flushes are done by a shared background thread, so text never
+waits on the next token.
+
+Input:
+    bus: StreamBusProtocol - bus carrying the stream
+    key: str - response stream
+    window_ms: float - longest a delta is held, 0 publishes every delta
+    max_bytes: int - buffered bytes that trigger a flush
+    sentences: bool - flush at sentence and line ends
+"""
+class StreamPublisher:
+    def __init__(self, bus: StreamBusProtocol, key: str, window_ms: float = STREAM_COALESCE_MS,
+                 max_bytes: int = STREAM_COALESCE_BYTES, sentences: bool = STREAM_COALESCE_SENTENCES) -> None:
+        self.bus = bus
+        self.key = key
+        self.window = window_ms / 1000
+        self.max_bytes = max_bytes
+        self.sentences = sentences
+        self.parts: List[str] = []
+        self.size = 0
+        self.scheduled = False
+        self.lock = threading.Lock()
+
+    # Per client policy from the request's "coalesce" field: False or 0 turns coalescing off,
+    # a dict may set window_ms, max_bytes and sentences
+    @classmethod
+    def from_options(cls, bus: StreamBusProtocol, key: str, options: Union[None, bool, int, Dict[str, Any]] = None) -> "StreamPublisher":
+        if options is None or options is True:
+            return cls(bus, key)
+        if not isinstance(options, dict):
+            return cls(bus, key, window_ms=float(options)) if options else cls(bus, key, window_ms=0)
+        return cls(bus, key,
+                   window_ms=float(options.get("window_ms", STREAM_COALESCE_MS)),
+                   max_bytes=int(options.get("max_bytes", STREAM_COALESCE_BYTES)),
+                   sentences=bool(options.get("sentences", STREAM_COALESCE_SENTENCES)))
+
+    def write(self, text: str) -> None:
+        with self.lock:
+            self.parts.append(text)
+            self.size += len(text.encode("utf-8"))
+            if self.window <= 0 or self.size >= self.max_bytes or (self.sentences and SENTENCE_END.search(text)):
+                self._flush()
+            elif not self.scheduled:
+                self.scheduled = True
+                _flusher.schedule(self, time.monotonic() + self.window)
+
+    def flush(self) -> None:
+        with self.lock:
+            self._flush()
+
+    # Entries are sent under the lock so the writer and the flusher thread cannot reorder them
+    def _flush(self, *extra: str) -> None:
+        entries = ["".join(self.parts)] if self.parts else []
+        entries.extend(extra)
+        self.parts = []
+        self.size = 0
+        self.scheduled = False
+        if entries:
+            self.bus.publish_many(self.key, entries)
+
+    # Sends what is buffered, followed by end_token as its own entry
+    def close(self, end_token: Optional[str] = None) -> None:
+        with self.lock:
+            if end_token is None:
+                self._flush()
+            else:
+                self._flush(end_token)
+        _flusher.cancel(self)
+
+class _Flusher:
+    def __init__(self) -> None:
+        self.condition = threading.Condition()
+        self.deadlines: Dict[StreamPublisher, float] = {}
+        self.thread = None
+
+    def schedule(self, publisher: StreamPublisher, deadline: float) -> None:
+        with self.condition:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="stream-flusher", daemon=True)
+                self.thread.start()
+            self.deadlines[publisher] = deadline
+            self.condition.notify()
+
+    def cancel(self, publisher: StreamPublisher) -> None:
+        with self.condition:
+            self.deadlines.pop(publisher, None)
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                while not self.deadlines:
+                    self.condition.wait()
+                publisher, deadline = min(self.deadlines.items(), key=lambda item: item[1])
+                now = time.monotonic()
+                if deadline > now:
+                    self.condition.wait(deadline - now)
+                    continue
+                del self.deadlines[publisher]
+            try:
+                publisher.flush()
+            except Exception as e:
+                logger.error(f"Flushing stream {publisher.key} failed: {str(e)}")
+
+_flusher = _Flusher()
@@ -0,0 +1,103 @@
+import hashlib, os, threading
+from bisect import bisect_right
+from typing import Any, List, Optional
+from agentforge.interfaces.lrucache import LRUCache
+from agentforge.utils import logger, metrics
+
+# Same tokenizer the remote /v1/tokenizer service loads
+TOKENIZER_MODEL = os.getenv("TOKENIZER_MODEL", "uukuguy/speechless-llama2-luban-orca-platypus-13b")
+# Distinct texts whose token counts are remembered
+TOKEN_COUNT_CACHE_SIZE = int(os.getenv("TOKEN_COUNT_CACHE_SIZE", 8192))
+
+"""
+TokenCounter - Cached token counts for prompt budgeting
+
+Counts with a tokenizer loaded in-process when one is given, otherwise
+with the remote TokenizerService. A model_name is loaded on the first
+count rather than at startup. Counts are memoized by text hash, so a
+chat message is tokenized once no matter how many turns include it.
+
+Input:
+    tokenizer: Any - HuggingFace tokenizer, None counts through the service
+    service: APIService - remote tokenizer service, used when there is no local tokenizer
+    cache_size: int - number of counts kept
+    model_name: str - HuggingFace tokenizer loaded on first use when no tokenizer is given
+"""
+class TokenCounter:
+    def __init__(self, tokenizer: Any = None, service: Any = None, cache_size: int = TOKEN_COUNT_CACHE_SIZE,
+                 model_name: Optional[str] = None) -> None:
+        if tokenizer is None and service is None and model_name is None:
+            raise ValueError("TokenCounter needs a tokenizer or a tokenizer service")
+        self.tokenizer = tokenizer
+        self.service = service
+        self.model_name = model_name if tokenizer is None else None
+        self.lock = threading.Lock()
+        self.counts = LRUCache(cache_size)
+
+    # Counts with model_name locally once it is first needed, the remote service is the fallback
+    @classmethod
+    def from_pretrained(cls, model_name: str = TOKENIZER_MODEL, service: Any = None) -> "TokenCounter":
+        return cls(service=service, model_name=model_name)
+
+    # Loads the tokenizer once, falls back to the remote service when transformers or the model is unavailable
+    def _load_tokenizer(self) -> None:
+        with self.lock:
+            if self.model_name is None:
+                return
+            model_name, self.model_name = self.model_name, None
+            try:
+                from transformers import AutoTokenizer
+                self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+            except Exception as e:
+                if self.service is None:
+                    self.model_name = model_name
+                    raise
+                logger.warning(f"Local tokenizer {model_name} unavailable, counting tokens remotely: {str(e)}")
+
+    @staticmethod
+    def _key(text: str, special_tokens: bool) -> str:
+        return hashlib.sha1(f"{int(special_tokens)}{text}".encode("utf-8")).hexdigest()
+
+    def _encode(self, texts: List[str], special_tokens: bool) -> List[int]:
+        if self.model_name is not None:
+            self._load_tokenizer()
+        if self.tokenizer is not None:
+            return [len(ids) for ids in self.tokenizer(texts, add_special_tokens=special_tokens)["input_ids"]]
+        # The service always counts special tokens, there is no batch endpoint
+        return [int(self.service.call({"prompt": text})["text"]) for text in texts]
+
+    """
+    count_many - Token count of each text, only texts not seen before are tokenized
+
+    special_tokens adds BOS/EOS as for a full prompt, leave it off for
+    pieces that are joined into a larger prompt.
+    """
+    def count_many(self, texts: List[str], special_tokens: bool = False) -> List[int]:
+        keys = [self._key(text, special_tokens) for text in texts]
+        counts: List[Optional[int]] = [self.counts.get(key) for key in keys]
+        missing = [i for i, count in enumerate(counts) if count is None]
+        metrics.increment("cache.tokens.hit", len(texts) - len(missing))
+        metrics.increment("cache.tokens.miss", len(missing))
+        if missing:
+            for i, count in zip(missing, self._encode([texts[i] for i in missing], special_tokens)):
+                counts[i] = count
+                self.counts.set(keys[i], count)
+        return counts
+
+    def count(self, text: str, special_tokens: bool = True) -> int:
+        return self.count_many([text], special_tokens)[0]
+
+    """
+    fit - Number of trailing pieces that fit in budget tokens
+
+    Finds the longest suffix of pieces whose summed counts plus overhead
+    stay within budget, using suffix sums and a binary search rather than
+    dropping one piece per tokenizer call.
+    """
+    def fit(self, pieces: List[str], budget: int, overhead: int = 0) -> int:
+        counts = self.count_many(pieces)
+        # totals[k] is the token count of the last k pieces, non-decreasing in k
+        totals = [0]
+        for count in reversed(counts):
+            totals.append(totals[-1] + count)
+        return max(0, bisect_right(totals, budget - overhead) - 1)
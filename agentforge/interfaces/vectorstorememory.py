@@ -1,6 +1,6 @@
 from agentforge.adapters import VectorStoreProtocol
 import threading, datetime
-from agentforge.utils import logger
+from agentforge.utils import logger, check_cancelled
 
 ### LongTermMemory makes use of the VectorStoreProtocol to store and retrieve memories
 ### uses a similarity function to access memories and methodsSaves to forget
@@ -14,7 +14,9 @@ class VectorStoreMemory:
   # Does a similarity search to recall memories associated with this prompt
   def recall(self, prompt, filter={}, **kwargs):
     n = kwargs["n"] if "n" in kwargs else 2
+    check_cancelled()
     docs = self.vectorstore.search_with_score(prompt, filter=filter, **kwargs)
+    check_cancelled()
     logger.info(f"Recalled {len(docs)} memories")
     logger.info(docs)
     result = []
@@ -1,10 +1,20 @@
 """Comprehensive HTTP client for VLLM's OpenAI-compatible API server with completions and embeddings support"""
 import json
-from typing import Iterable, List, Dict, Optional, Union, Any
+from typing import Iterable, List, Dict, Optional, Union, Any, Tuple
 from dataclasses import dataclass
+from agentforge.adapters import get_session, REQUEST_TIMEOUT
 from agentforge.utils import logger
 import requests
 
+try:
+    import orjson
+    loads = orjson.loads  # parses bytes directly, several times faster than json
+except ImportError:
+    loads = json.loads
+
+SSE_DATA = b"data:"
+SSE_DONE = b"[DONE]"
+
 
 @dataclass
 class ResponseFormat:
@@ -12,9 +22,8 @@ class ResponseFormat:
     type: str  # 'json_object', 'json_schema', or 'text'
 
 
-def create_completion(
+def completion_payload(
     # Required parameters
-    api_url: str,
     prompt: str,
     model: str,
     
@@ -61,10 +70,10 @@ def create_completion(
     logit_bias: Optional[Dict[int, float]] = None,
     user: Optional[str] = None,
     **kwargs: Any,  # Catch any other parameters we don't explicitly handle
-) -> requests.Response:
+) -> Tuple[Dict[str, str], Dict[str, Any]]:
     """
-    Creates a completion request using VLLM's OpenAI-compatible API with all supported parameters.
-    [Previous docstring remains the same...]
+    Builds the headers and payload of a completion request for VLLM's OpenAI-compatible API
+    with all supported parameters.
     """
     headers = {
         "Content-Type": "application/json",
@@ -123,12 +132,20 @@ def create_completion(
     if guided_whitespace_pattern:
         payload["guided_whitespace_pattern"] = guided_whitespace_pattern
 
-    logger.info(f"Prompt Length: {len(prompt)}")
-    return requests.post(api_url, headers=headers, json=payload, stream=stream)
+    return headers, payload
+
+
+def create_completion(api_url: str, **params: Any) -> requests.Response:
+    """
+    Creates a completion request using VLLM's OpenAI-compatible API, see completion_payload
+    for the supported parameters. Connections are reused through the shared session.
+    """
+    headers, payload = completion_payload(**params)
+    logger.info(f"Prompt Length: {len(payload['prompt'])}")
+    return get_session().post(api_url, headers=headers, json=payload, stream=payload["stream"], timeout=REQUEST_TIMEOUT)
 
 
-def create_embeddings(
-    api_url: str,
+def embeddings_payload(
     model: str,
     input: Union[str, List[str]],
     messages: Optional[List[Dict[str, str]]] = None,
@@ -137,12 +154,11 @@ def create_embeddings(
     priority: int = 0,
     additional_data: Optional[Any] = None,
     extra_headers: Optional[Dict[str, str]] = None,
-) -> requests.Response:
+) -> Tuple[Dict[str, str], Dict[str, Any]]:
     """
-    Creates embeddings using VLLM's OpenAI-compatible embeddings API.
+    Builds the headers and payload of a request to VLLM's OpenAI-compatible embeddings API.
     
     Args:
-        api_url: The URL of the VLLM embeddings endpoint
         model: Model identifier
         input: String or array of strings to embed
         messages: Optional list of messages in chat format for embedding
@@ -153,7 +169,7 @@ def create_embeddings(
         extra_headers: Additional HTTP headers to include
     
     Returns:
-        requests.Response: The HTTP response containing embeddings
+        Tuple of the request headers and JSON payload
         
     Note:
         - Server must be started with --task embedding for embedding support
@@ -182,21 +198,56 @@ def create_embeddings(
     if additional_data is not None:
         payload["additional_data"] = additional_data
 
-    return requests.post(api_url, headers=headers, json=payload)
+    return headers, payload
+
+
+def create_embeddings(api_url: str, **params: Any) -> requests.Response:
+    """
+    Creates embeddings using VLLM's OpenAI-compatible embeddings API, see embeddings_payload
+    for the supported parameters.
+    """
+    headers, payload = embeddings_payload(**params)
+    return get_session().post(api_url, headers=headers, json=payload, timeout=REQUEST_TIMEOUT)
+
+
+def iter_sse_data(lines: Iterable[Union[bytes, str]]) -> Iterable[bytes]:
+    """
+    Yields the payload of each server-sent event data line, stopping at [DONE].
+    Each line is looked at once, nothing already seen is scanned again.
+    """
+    for line in lines:
+        if not line:
+            continue
+        if isinstance(line, str):
+            line = line.encode("utf-8")
+        if not line.startswith(SSE_DATA):
+            continue  # comments, event names and ids
+        data = line[len(SSE_DATA):].lstrip()
+        if data == SSE_DONE:
+            return
+        yield data
+
+
+def iter_completion_deltas(lines: Iterable[Union[bytes, str]]) -> Iterable[str]:
+    """
+    Yields the text delta of each chunk of a streamed completion. The OpenAI-compatible
+    server sends only the newly generated text in every chunk.
+    """
+    for data in iter_sse_data(lines):
+        try:
+            choices = loads(data).get("choices")
+        except ValueError:
+            logger.error(f"Failed to decode chunk: {data[:200]}")
+            continue
+        if choices:
+            yield choices[0].get("text") or ""
 
 
 def get_streaming_response(response: requests.Response) -> Iterable[str]:
     """
     Yields text from a streaming response.
-    [Previous implementation remains the same...]
     """
-    for line in response.iter_lines(decode_unicode=True):
-        if line:
-            if line.startswith('data: '):
-                line = line[6:]  # Remove 'data: ' prefix
-            if line != '[DONE]':
-                data = json.loads(line)
-                yield data['choices'][0]['text']
+    return iter_completion_deltas(response.iter_lines())
 
 
 def get_completion_text(response: requests.Response) -> str:
@@ -1,10 +1,13 @@
 from .parser import Parser
-from .helpers import measure_time, dynamic_import, async_execution_decorator, timer_decorator, AbortController
+from .helpers import measure_time, dynamic_import, async_execution_decorator, timer_decorator, AbortController, cache_key
 from .logger import logger
 from .filenames import secure_wav_filename
 from .normalize import normalize_transcription
 from .errors import comprehensive_error_handler
+from .cancellation import CancellationToken, check_cancelled, get_current_token, on_cancel
+from .tracing import span, traced, metrics
 
 __all__ = ["AbortController", "Parser", "measure_time", "logger", "dynamic_import", "secure_wav_filename",
            "normalize_transcription", "comprehensive_error_handler", "async_execution_decorator",
-           "timer_decorator"]
\ No newline at end of file
+           "timer_decorator", "cache_key", "CancellationToken", "check_cancelled", "get_current_token", "on_cancel",
+           "span", "traced", "metrics"]
@@ -0,0 +1,82 @@
+import threading
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+from agentforge.exceptions import SubroutineCancelled
+
+"""
+CancellationToken - Cooperative cancellation shared between a run and its calls
+
+A token is cancelled once and stays cancelled. Long running calls either
+poll `cancelled`/`raise_if_cancelled()` at safe points or register a
+callback with `add_callback()` (e.g. closing an HTTP response) that fires
+the moment the token is cancelled. Cancelling a parent cancels its
+children, so aborting a run reaches every node it started.
+
+Input:
+    parent: CancellationToken - optional token whose cancellation propagates here
+"""
+class CancellationToken:
+    def __init__(self, parent: Optional['CancellationToken'] = None) -> None:
+        self.lock = threading.Lock()
+        self.reason: Optional[str] = None
+        self._cancelled = False
+        self._callbacks: List[Callable[[], None]] = []
+        if parent is not None:
+            parent.add_callback(lambda: self.cancel(parent.reason))
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self, reason: Optional[str] = None) -> None:
+        with self.lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            self.reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        with self.lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return lambda: self.remove_callback(callback)
+        callback()
+        return lambda: None
+
+    def remove_callback(self, callback: Callable[[], None]) -> None:
+        with self.lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self) -> None:
+        if self._cancelled:
+            raise SubroutineCancelled(self.reason or "Subroutine was cancelled")
+
+# Token of the subroutine currently executing, set by the state machine
+current_token: ContextVar[Optional[CancellationToken]] = ContextVar("current_token", default=None)
+
+def get_current_token() -> Optional[CancellationToken]:
+    return current_token.get()
+
+"""
+check_cancelled - Raise SubroutineCancelled if the current subroutine was cancelled
+"""
+def check_cancelled() -> None:
+    token = current_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+"""
+on_cancel - Register a callback on the current token, returns a function to unregister it
+"""
+def on_cancel(callback: Callable[[], None]) -> Callable[[], None]:
+    token = current_token.get()
+    if token is None:
+        return lambda: None
+    return token.add_callback(callback)
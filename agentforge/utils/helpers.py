@@ -1,11 +1,12 @@
-import importlib, re
+import importlib, re, hashlib, json
+from typing import Any
 from pygments import lex
 from pygments.lexers import guess_lexer, ClassNotFound
 from pygments.lexers import PythonLexer, get_lexer_by_name
 from pygments.token import Token
 from collections import Counter
 from pygments import highlight
-import time, re, math
+import time, re, math, os
 from functools import wraps
 from flask import request
 from agentforge.utils import logger
@@ -16,19 +17,58 @@ from functools import wraps
 AbortController is used by the context to send signals to the agent
 usually to abort a task/streaming process
 
+Signals are kept per user for ABORT_SIGNAL_TTL seconds and cleared when
+the user starts a new run. Listeners registered with subscribe() are
+called with the user_id when a signal arrives. This implementation is
+in-process only, RedisAbortController fans signals out to every worker.
+
 """
 class AbortController:
-    def __init__(self):
+    def __init__(self, ttl: float = float(os.getenv("ABORT_SIGNAL_TTL", 60))):
         self.signals = {}
+        self.ttl = ttl
+        self.listeners = []
         self.lock = threading.Lock()
 
-    def send_signal(self, user_id, signal):
+    def send_signal(self, user_id, signal=True):
+        self._receive(user_id)
+
+    def _receive(self, user_id):
         with self.lock:
-            self.signals[user_id] = True
+            self.signals[user_id] = time.monotonic()
+            listeners = list(self.listeners)
+        for listener in listeners:
+            try:
+                listener(user_id)
+            except Exception as e:
+                logger.error(f"Abort listener failed for {user_id}: {str(e)}")
 
     def get_signal(self, user_id):
         with self.lock:
-            return self.signals.get(user_id, False)
+            sent = self.signals.get(user_id)
+            if sent is None:
+                return False
+            if time.monotonic() - sent > self.ttl:
+                del self.signals[user_id]
+                return False
+            return True
+
+    def clear_signal(self, user_id):
+        with self.lock:
+            self.signals.pop(user_id, None)
+
+    def subscribe(self, listener):
+        with self.lock:
+            self.listeners.append(listener)
+
+"""
+cache_key - Stable key for a namespace and any JSON-like values
+
+Dicts are serialized with sorted keys so equal inputs always hash the same.
+"""
+def cache_key(namespace: str, *parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return f"{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
 
 def timer_decorator(func):
     @wraps(func)
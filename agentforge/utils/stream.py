@@ -1,24 +1,22 @@
-import redis
 import time
-from agentforge.interfaces import interface_interactor
+from agentforge.interfaces.streambus import get_stream_bus
 
 def stream_string(channel_name, input_string, delay=0.2, end_token="<|endoftext|>"):
-    redis_store = interface_interactor.create_redis_connection()
+    bus = get_stream_bus(channel_name)
 
     # Tokenize the string into words
     words = input_string.split()
 
     # Iterate over the words
     for idx, word in enumerate(words):
-        # Publish the word to the specified Redis channel
-        redis_store.publish(channel_name, word)
+        # Append the word to the specified response stream
+        bus.publish_many(channel_name, [word])
 
         # If this is not the last word, publish a space
         if idx != len(words) - 1:
-            redis_store.publish(channel_name, " ")
+            bus.publish_many(channel_name, [" "])
 
         # Wait for the specified delay before sending the next word
         time.sleep(delay)
 
-    redis_store.publish(channel_name, end_token)
-    redis_store.close()
+    bus.publish_many(channel_name, [end_token])
@@ -0,0 +1,223 @@
+import asyncio, bisect, os, threading, time, uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from agentforge.utils.logger import logger
+
+# Number of finished spans kept in memory for the admin endpoint
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", 2000))
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 120000)
+
+"""
+Span - One timed operation within a request
+
+Spans started while another span is active become its children and share
+its trace_id, so every node, API call and vectorstore lookup made for a
+request can be grouped back together.
+"""
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "start", "end", "status")
+
+    def __init__(self, name: str, parent: Optional['Span'] = None, **attributes: Any) -> None:
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.status = "ok"
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": {k: str(v) for k, v in self.attributes.items()},
+        }
+
+"""
+Histogram - Fixed bucket latency histogram with count and sum
+
+Quantiles are estimated from the buckets, which is enough to tell which
+operation drives p99 without storing every sample.
+"""
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum, 3),
+            "avg_ms": round(self.sum / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max, 3),
+            "p50_ms": self.quantile(0.5),
+            "p90_ms": self.quantile(0.9),
+            "p99_ms": self.quantile(0.99),
+        }
+
+"""
+MetricsRegistry - Process wide latency histograms and counters
+"""
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+
+    def observe(self, name: str, value_ms: float) -> None:
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value_ms)
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "latency": {name: h.to_dict() for name, h in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "caches": self._hit_rates(),
+            }
+
+    # Derived from the cache.<name>.hit / cache.<name>.miss counters
+    def _hit_rates(self) -> Dict[str, Dict[str, float]]:
+        caches = {}
+        for name, value in self.counters.items():
+            if name.startswith("cache.") and name.endswith((".hit", ".miss")):
+                cache, outcome = name[len("cache."):].rsplit(".", 1)
+                caches.setdefault(cache, {"hit": 0, "miss": 0})[outcome] = value
+        for stats in caches.values():
+            total = stats["hit"] + stats["miss"]
+            stats["hit_rate"] = round(stats["hit"] / total, 4) if total else 0.0
+        return dict(sorted(caches.items()))
+
+    def prometheus(self) -> str:
+        lines = ["# TYPE agentforge_latency_ms histogram"]
+        with self.lock:
+            for name, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f'agentforge_latency_ms_bucket{{op="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'agentforge_latency_ms_bucket{{op="{name}",le="+Inf"}} {h.count}')
+                lines.append(f'agentforge_latency_ms_sum{{op="{name}"}} {h.sum}')
+                lines.append(f'agentforge_latency_ms_count{{op="{name}"}} {h.count}')
+            lines.append("# TYPE agentforge_total counter")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'agentforge_total{{name="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+metrics = MetricsRegistry()
+recent_spans: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+"""
+span - Time a block as a child of the active span and record its latency
+
+    with span("api:llm", user_id=user_id):
+        ...
+"""
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    current = Span(name, current_span.get(), **attributes)
+    reset = current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "cancelled" if isinstance(e, asyncio.CancelledError) else "error"
+        raise
+    finally:
+        current.end = time.perf_counter()
+        current_span.reset(reset)
+        metrics.observe(name, current.duration_ms)
+        recent_spans.append(current)
+
+"""
+traced - Decorator wrapping a function or coroutine function in a span
+"""
+def traced(name: Optional[str] = None) -> Callable:
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+"""
+instrument - Trace the given methods of an existing object in place
+
+Used for third party backed interfaces (vectorstores) that we construct
+but do not want to subclass.
+"""
+def instrument(obj: Any, prefix: str, methods: List[str]) -> Any:
+    for method in methods:
+        func = getattr(obj, method, None)
+        if func is not None:
+            setattr(obj, method, traced(f"{prefix}.{method}")(func))
+    return obj
+
+"""
+get_traces - Recently finished spans grouped by trace, newest first
+"""
+def get_traces(limit: int = 20) -> List[Dict[str, Any]]:
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    for finished in reversed(list(recent_spans)):
+        if finished.trace_id not in traces:
+            if len(traces) >= limit:
+                continue
+            traces[finished.trace_id] = []
+        traces[finished.trace_id].append(finished.to_dict())
+    return [{"trace_id": trace_id, "spans": spans} for trace_id, spans in traces.items()]
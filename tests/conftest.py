@@ -0,0 +1,119 @@
+import importlib, importlib.util, os, sys
+import pytest
+import agentforge
+import agentforge.interfaces
+
+"""
+ai_module - Imports a module under agentforge.ai without building the agent
+
+agentforge.ai creates the agent and every service it talks to on import,
+the package is registered without running its __init__ so a test can
+import one routine or executor on its own. interface_interactor only
+exists when RESOURCE=AGENT, modules that bind it get None unless the
+test sets its own.
+"""
+@pytest.fixture
+def ai_module(monkeypatch):
+    if not hasattr(agentforge.interfaces, "interface_interactor"):
+        monkeypatch.setattr(agentforge.interfaces, "interface_interactor", None, raising=False)
+    if "agentforge.ai" not in sys.modules:
+        path = os.path.join(os.path.dirname(agentforge.__file__), "ai")
+        spec = importlib.util.spec_from_file_location("agentforge.ai", os.path.join(path, "__init__.py"),
+                                                      submodule_search_locations=[path])
+        package = sys.modules["agentforge.ai"] = importlib.util.module_from_spec(spec)
+        # Routines import the protocol from the package
+        package.Subroutine = importlib.import_module("agentforge.ai.routines.subroutine").Subroutine
+    return importlib.import_module
+
+# Dotted-path get/set over a dict, like agents.context.Context
+class FakeContext:
+    def __init__(self, data=None, _id="context"):
+        self.data = data if data is not None else {}
+        self._id = _id
+
+    def get(self, path, default=None):
+        value = self.data
+        for part in path.split("."):
+            if not isinstance(value, dict) or part not in value:
+                return default
+            value = value[part]
+        return value
+
+    def set(self, path, value):
+        parts = path.split(".")
+        target = self.data
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+
+# Stands in for interface_interactor, serving the interfaces it was given by name
+class FakeInterfaces:
+    def __init__(self, **interfaces):
+        self.interfaces = interfaces
+
+    def get_interface(self, name):
+        return self.interfaces[name]
+
+    def has_interface(self, name):
+        return name in self.interfaces
+
+# In-memory collections keyed by id, records inserts and $set/$unset updates, fails the next write when asked
+class FakeDB:
+    def __init__(self):
+        self.collections = {}
+        self.created = []
+        self.updates = []
+        self.uploads = []
+        self.fail = False
+
+    def _check(self):
+        if self.fail:
+            self.fail = False
+            raise ConnectionError("db down")
+
+    def create(self, collection, key, data):
+        self._check()
+        self.created.append(data)
+        self.collections.setdefault(collection, {})[key] = data
+
+    def update(self, collection, key, set_fields, unset_fields):
+        self._check()
+        self.updates.append((set_fields, sorted(unset_fields)))
+
+    def batch_upload(self, collection, documents):
+        self._check()
+        self.uploads.append(documents)
+        for document in documents:
+            self.collections.setdefault(collection, {})[document["id"]] = dict(document)
+
+    # Supports the {"id": {"$in": [...]}} filter the callers use
+    def get_many(self, collection, filter):
+        ids = filter["id"]["$in"]
+        records = self.collections.get(collection, {})
+        return [dict(records[id]) for id in ids if id in records]
+
+# Records every form_data it is called with and answers through respond
+class FakeService:
+    def __init__(self, respond=None):
+        self.respond = respond or (lambda form_data: {})
+        self.calls = []
+
+    def call(self, form_data):
+        self.calls.append(form_data)
+        return self.respond(form_data)
+
+"""
+interfaces - Serves the given fake interfaces to the modules under test
+
+Modules bind interface_interactor when they are imported, so it is
+replaced in each module passed as well as on agentforge.interfaces.
+"""
+@pytest.fixture
+def interfaces(monkeypatch):
+    def install(*modules, **served):
+        fake = FakeInterfaces(**served)
+        monkeypatch.setattr(agentforge.interfaces, "interface_interactor", fake, raising=False)
+        for module in modules:
+            monkeypatch.setattr(module, "interface_interactor", fake)
+        return fake
+    return install
@@ -0,0 +1,92 @@
+import json, queue, threading, time
+import pytest
+from agentforge.interfaces import redisabortcontroller
+from agentforge.interfaces.redisabortcontroller import RedisAbortController
+
+# One Redis server shared by the fake workers, pub/sub only
+class FakeRedis:
+    def __init__(self):
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def publish(self, channel, data):
+        with self.lock:
+            subscribers = [pubsub for pubsub in self.subscribers if channel in pubsub.channels]
+        for pubsub in subscribers:
+            pubsub.messages.put({"type": "message", "channel": channel, "data": data})
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+class FakePubSub:
+    def __init__(self, server):
+        self.server = server
+        self.channels = set()
+        self.messages = queue.Queue()
+
+    def subscribe(self, channel):
+        self.channels.add(channel)
+        with self.server.lock:
+            self.server.subscribers.append(self)
+
+    def listen(self):
+        while True:
+            yield self.messages.get()
+
+@pytest.fixture
+def workers(monkeypatch):
+    server = FakeRedis()
+    monkeypatch.setattr(redisabortcontroller, "get_redis", lambda config: server)
+    def start(n):
+        controllers = [RedisAbortController(None) for _ in range(n)]
+        deadline = time.monotonic() + 2
+        while len(server.subscribers) < n and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return controllers
+    start.server = server
+    return start
+
+def test_abort_reaches_every_worker(workers):
+    sender, other = workers(2)
+    received = {"sender": [], "other": []}
+    delivered = threading.Event()
+    sender.subscribe(received["sender"].append)
+    other.subscribe(lambda user_id: (received["other"].append(user_id), delivered.set()))
+    sender.send_signal("u1")
+    # The sender delivers its own signal without waiting for the round trip
+    assert received["sender"] == ["u1"] and sender.get_signal("u1")
+    assert delivered.wait(2)
+    assert received["other"] == ["u1"] and other.get_signal("u1")
+    assert not other.get_signal("u2")
+
+def test_own_signal_is_not_delivered_twice(workers):
+    sender, other = workers(2)
+    received = []
+    delivered = threading.Event()
+    sender.subscribe(received.append)
+    other.subscribe(lambda user_id: delivered.set())
+    sender.send_signal("u1")
+    assert delivered.wait(2)
+    time.sleep(0.02)
+    assert received == ["u1"]
+
+def test_garbled_message_does_not_stop_the_listener(workers):
+    sender, other = workers(2)
+    delivered = threading.Event()
+    other.subscribe(lambda user_id: delivered.set())
+    workers.server.publish(redisabortcontroller.ABORT_CHANNEL, json.dumps({"worker_id": "x"}))
+    sender.send_signal("u1")
+    assert delivered.wait(2)
+
+def test_abort_flags_expire(workers):
+    (controller,) = workers(1)
+    controller.ttl = 0.05
+    controller.send_signal("u1")
+    assert controller.get_signal("u1")
+    time.sleep(0.06)
+    assert not controller.get_signal("u1")
+    assert "u1" not in controller.signals
+    controller.send_signal("u1")
+    controller.clear_signal("u1")
+    assert not controller.get_signal("u1")
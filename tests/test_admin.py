@@ -0,0 +1,21 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from agentforge.api import metrics as admin
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/v1/admin")
+    return TestClient(app)
+
+def test_admin_endpoints_are_closed_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(admin, "ADMIN_METRICS_TOKEN", None)
+    for path in ("/v1/admin/metrics", "/v1/admin/traces", "/v1/admin/redis"):
+        assert client.get(path).status_code == 403
+
+def test_admin_endpoints_require_the_token(client, monkeypatch):
+    monkeypatch.setattr(admin, "ADMIN_METRICS_TOKEN", "secret")
+    assert client.get("/v1/admin/metrics").status_code == 401
+    assert client.get("/v1/admin/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/v1/admin/metrics", headers={"Authorization": "Bearer secret"}).status_code == 200
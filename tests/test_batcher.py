@@ -0,0 +1,65 @@
+import threading
+import pytest
+from agentforge.interfaces.batcher import CompletionBatcher
+
+# Echoes every prompt back n times, choice index is prompt_index * n + sample_index
+class FakeCompletions:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, params):
+        with self.lock:
+            self.calls.append(params)
+        if self.fail:
+            raise RuntimeError("replica down")
+        prompts = params["prompt"] if isinstance(params["prompt"], list) else [params["prompt"]]
+        n = params.get("n") or 1
+        choices = [{"index": i * n + j, "text": f"{prompt}#{j}"} for i, prompt in enumerate(prompts) for j in range(n)]
+        # Replicas may return choices out of order
+        return {"id": "cmpl", "choices": list(reversed(choices))}
+
+def submit_all(batcher, requests):
+    futures = [batcher.submit(params) for params in requests]
+    return [future.result(timeout=5) for future in futures]
+
+def test_split_with_multiple_samples():
+    response = {"id": "cmpl", "choices": [{"index": i, "text": str(i)} for i in reversed(range(6))]}
+    results = CompletionBatcher.split(response, 3, 2)
+    assert [[c["text"] for c in r["choices"]] for r in results] == [["0", "1"], ["2", "3"], ["4", "5"]]
+    assert all([c["index"] for c in r["choices"]] == [0, 1] for r in results)
+    assert all(r["id"] == "cmpl" for r in results)
+
+def test_batches_prompts_with_n_samples():
+    send = FakeCompletions()
+    batcher = CompletionBatcher(send, window_ms=50)
+    results = submit_all(batcher, [{"prompt": p, "n": 2, "max_tokens": 8} for p in "abc"])
+    assert len(send.calls) == 1 and send.calls[0]["prompt"] == ["a", "b", "c"]
+    for prompt, result in zip("abc", results):
+        assert [c["text"] for c in result["choices"]] == [f"{prompt}#0", f"{prompt}#1"]
+        assert [c["index"] for c in result["choices"]] == [0, 1]
+
+def test_groups_requests_by_parameters():
+    send = FakeCompletions()
+    batcher = CompletionBatcher(send, window_ms=50)
+    results = submit_all(batcher, [
+        {"prompt": "a", "temperature": 0},
+        {"prompt": "b", "temperature": 1},
+        {"prompt": "c", "temperature": 0},
+    ])
+    assert sorted(call["temperature"] for call in send.calls) == [0, 1]
+    assert sorted(str(call["prompt"]) for call in send.calls) == ["['a', 'c']", "b"]
+    assert [r["choices"][0]["text"] for r in results] == ["a#0", "b#0", "c#0"]
+
+def test_sends_when_batch_is_full():
+    send = FakeCompletions()
+    batcher = CompletionBatcher(send, window_ms=60000, max_size=2)
+    assert [r["choices"][0]["text"] for r in submit_all(batcher, [{"prompt": "a"}, {"prompt": "b"}])] == ["a#0", "b#0"]
+
+def test_failed_batch_fails_every_caller():
+    batcher = CompletionBatcher(FakeCompletions(fail=True), window_ms=50)
+    futures = [batcher.submit({"prompt": p}) for p in "ab"]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="replica down"):
+            future.result(timeout=5)
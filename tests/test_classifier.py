@@ -0,0 +1,61 @@
+import pytest
+from conftest import FakeContext
+
+# Returns queued completions and records every request
+class FakeLLM:
+    def __init__(self, *texts):
+        self.texts = list(texts)
+        self.calls = []
+
+    def batch_call(self, input_):
+        self.calls.append(input_)
+        return {"choices": [{"text": self.texts.pop(0)}]}
+
+def model_context():
+    return FakeContext({"model": {"generation_config": {"max_tokens": 256, "temperature": 0.7}, "model_config": {}}})
+
+@pytest.fixture
+def classifier(ai_module, monkeypatch):
+    module = ai_module("agentforge.ai.reasoning.classifier")
+    monkeypatch.setattr(module, "CLASSIFIER_GUIDED_DECODING", True)
+    monkeypatch.setattr(module, "CLASSIFIER_GUIDED_LABELS", False)
+    def make(*texts):
+        classifier = module.Classifier.__new__(module.Classifier)
+        classifier.llm = FakeLLM(*texts)
+        return classifier
+    make.module = module
+    return make
+
+PROMPT = "Is {object} a fruit? Think step by step, then answer with Final Answer: <label>\n"
+
+def test_without_choices_keeps_reasoning_prompt(classifier):
+    c = classifier("Apples grow on trees and are sweet.\nFinal Answer: yes</s>")
+    assert c.classify({"object": "apple"}, PROMPT, model_context()) == ["yes"]
+    assert len(c.llm.calls) == 1
+    config = c.llm.calls[0]["generation_config"]
+    assert "guided_json" not in config and "guided_choice" not in config
+    assert config["max_tokens"] == 256
+
+def test_without_choices_retries_extraction(classifier):
+    c = classifier("I am not sure.", "Final Answer: no</s>")
+    assert c.classify({"object": "rock"}, PROMPT, model_context()) == ["no"]
+    assert len(c.llm.calls) == 2
+
+def test_guided_labels_are_opt_in(classifier, monkeypatch):
+    monkeypatch.setattr(classifier.module, "CLASSIFIER_GUIDED_LABELS", True)
+    c = classifier('{"label": "yes"}')
+    assert c.classify({"object": "apple"}, PROMPT, model_context()) == ["yes"]
+    assert c.llm.calls[0]["generation_config"]["guided_json"] == classifier.module.LABEL_SCHEMA
+
+def test_choices_use_guided_decoding(classifier):
+    c = classifier(" yes")
+    assert c.classify({"object": "apple"}, PROMPT, model_context(), choices=["yes", "no"]) == ["yes"]
+    assert len(c.llm.calls) == 1
+    config = c.llm.calls[0]["generation_config"]
+    assert config["guided_choice"] == ["yes", "no"]
+    assert config["max_tokens"] == classifier.module.GUIDED_CHOICE_MAX_TOKENS
+
+def test_invalid_guided_choice_falls_back_to_extraction(classifier):
+    c = classifier("maybe", "Final Answer: no</s>")
+    assert c.classify({"object": "rock"}, PROMPT, model_context(), choices=["yes", "no"]) == ["no"]
+    assert "guided_choice" not in c.llm.calls[1]["generation_config"]
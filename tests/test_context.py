@@ -0,0 +1,87 @@
+import pytest
+from conftest import FakeDB
+
+@pytest.fixture
+def db():
+    return FakeDB()
+
+@pytest.fixture
+def make_context(ai_module, interfaces, db):
+    module = ai_module("agentforge.ai.agents.context")
+    interfaces(module, db=db)
+    return module.Context
+
+def test_first_save_inserts_then_updates_deltas(make_context, db):
+    context = make_context({"input": {"user_id": "u1", "messages": []}, "task": "not persisted"})
+    context.set("response", "hi")
+    context.save()
+    assert len(db.created) == 1 and db.updates == []
+    assert db.created[0]["context_data"] == {"input": {"user_id": "u1", "messages": []}, "response": "hi"}
+
+    context.set("input.user_name", "ada")
+    context.set("task", "still not persisted")
+    context.save()
+    assert db.updates == [({"context_data.input.user_name": "ada"}, [])]
+
+    context.save() # nothing changed
+    assert len(db.updates) == 1
+
+def test_overlapping_paths_collapse_to_ancestor(make_context, db):
+    context = make_context({"model": {"persona": {"name": "a"}}})
+    context.save()
+    context.set("model.persona.name", "b")
+    context.set("model.persona.voice", "v")
+    context.set("model", {"persona": {"name": "c"}})
+    context.save()
+    assert db.updates == [({"context_data.model": {"persona": {"name": "c"}}}, [])]
+
+def test_delete_deltas(make_context, db):
+    context = make_context({"recall": {"memory": "m", "score": 1}, "plan": {"step": 1}})
+    context.save()
+    context.delete("recall.memory")
+    context.delete("missing.key") # no-op
+    context.save()
+    assert db.updates[-1] == ({}, ["context_data.recall.memory"])
+
+    # Deleted under a dirty ancestor, the ancestor is written without it
+    context.set("plan.step", 2)
+    context.set("plan", {"step": 3, "done": False})
+    context.delete("plan.done")
+    context.save()
+    assert db.updates[-1] == ({"context_data.plan": {"step": 3}}, [])
+
+    # Rewritten after a delete, the value is set instead of unset
+    context.delete("recall")
+    context.set("recall.memory", "n")
+    context.save()
+    assert db.updates[-1] == ({"context_data.recall": {"memory": "n"}}, [])
+
+def test_failed_save_is_retried(make_context, db):
+    context = make_context({"a": 1})
+    context.save()
+    context.set("a", 2)
+    db.fail = True
+    with pytest.raises(ConnectionError):
+        context.save()
+    context.save()
+    assert db.updates == [({"context_data.a": 2}, [])]
+
+def test_readers_keep_their_snapshot(make_context):
+    context = make_context({"input": {"messages": [{"role": "user", "content": "hi"}]}})
+    before = context.get("input")
+    context.set("input.user_id", "u1")
+    assert "user_id" not in before
+    assert context.get("input.user_id") == "u1"
+
+# get() hands out shared values: in-place changes are not tracked, a changed copy set back is
+def test_mutations_must_be_set_back(make_context, db):
+    context = make_context({"input": {"messages": [{"role": "user", "content": "hi"}]}})
+    context.save()
+    messages = context.get("input.messages")
+    messages.append({"role": "assistant", "content": "ignored"})
+    context.save()
+    assert db.updates == []
+
+    context.set("input.messages", messages + [{"role": "user", "content": "again"}])
+    context.save()
+    assert [m["content"] for m in db.updates[0][0]["context_data.input.messages"]] == ["hi", "ignored", "again"]
@@ -0,0 +1,66 @@
+import threading
+import numpy as np
+import pytest
+from agentforge.interfaces import embeddings
+from agentforge.interfaces.embeddings import RemoteEmbeddings
+
+# /v1/embeddings answering out of order, text "t3" embeds to [3, 1]
+class FakeEmbeddingsServer:
+    def __init__(self):
+        self.requests = []
+        self.status_code = 200
+
+    def __call__(self, url, model, input):
+        self.requests.append(list(input))
+        server = self
+        class Response:
+            status_code = server.status_code
+            text = "overloaded"
+            def json(self):
+                data = [{"index": i, "embedding": [float(text[1:]), 1.0]} for i, text in enumerate(input)]
+                return {"data": data[::-1]}
+        return Response()
+
+def expected(*numbers):
+    vectors = np.array([[n, 1.0] for n in numbers], dtype=np.float32)
+    return (vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)).tolist()
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeEmbeddingsServer()
+    monkeypatch.setattr(embeddings, "create_embeddings", server)
+    return server
+
+def test_bulk_calls_are_split_into_ordered_batches(server):
+    provider = RemoteEmbeddings("http://embeddings-test:1/v1/embeddings", "m", window_ms=0, batch_size=2)
+    vectors = provider.embed_documents([f"t{i}" for i in range(5)])
+    assert server.requests == [["t0", "t1"], ["t2", "t3"], ["t4"]]
+    assert np.allclose(vectors, expected(0, 1, 2, 3, 4))
+
+def test_concurrent_calls_share_a_request(server):
+    provider = RemoteEmbeddings("http://embeddings-test:1/v1/embeddings", "m", window_ms=100, batch_size=8)
+    results = {}
+    barrier = threading.Barrier(3)
+    def embed(i):
+        barrier.wait()
+        results[i] = provider.embed_query(f"t{i}")
+    threads = [threading.Thread(target=embed, args=(i,)) for i in (1, 2, 3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+    assert len(server.requests) == 1 and sorted(server.requests[0]) == ["t1", "t2", "t3"]
+    for i in (1, 2, 3):
+        assert np.allclose(results[i], expected(i)[0])
+
+def test_small_calls_keep_their_order(server):
+    provider = RemoteEmbeddings("http://embeddings-test:1/v1/embeddings", "m", window_ms=20, batch_size=8)
+    assert np.allclose(provider.embed_documents(["t5", "t7", "t6"]), expected(5, 7, 6))
+
+def test_failed_request_fails_every_caller(server):
+    server.status_code = 400
+    provider = RemoteEmbeddings("http://embeddings-test:1/v1/embeddings", "m", window_ms=20, batch_size=8)
+    futures = [provider.submit("t1"), provider.submit("t2")]
+    for future in futures:
+        with pytest.raises(Exception, match="400"):
+            future.result(2)
@@ -0,0 +1,97 @@
+import asyncio, json, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from agentforge.adapters import EndpointPool
+
+# Minimal stand-in for a vLLM replica: /health and /v1/completions
+class FakeVLLM(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200 if self.server.healthy else 503)
+        self.end_headers()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.hits += 1
+        body = json.dumps({"choices": [{"index": 0, "text": self.server.name}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_replica(name):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeVLLM)
+    server.name, server.hits, server.healthy = name, 0, True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/v1/completions"
+
+def complete(pool):
+    return pool.call(lambda endpoint: requests.post(endpoint, json={"prompt": "hi"}, timeout=5)).json()
+
+@pytest.fixture
+def replicas():
+    servers = [start_replica("a"), start_replica("b")]
+    yield servers
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def test_routes_to_least_outstanding(replicas):
+    pool = EndpointPool("llm", [url(s) for s in replicas], heartbeat_interval=0)
+    busy = pool.acquire()
+    idle = replicas[1 - pool.endpoints.index(busy)]
+    for _ in range(3):
+        assert complete(pool)["choices"][0]["text"] == idle.name
+    pool.release(busy)
+    assert [e.outstanding for e in pool.endpoints] == [0, 0]
+
+def test_fails_over_when_replica_is_down(replicas):
+    down = replicas[0]
+    dead_url = url(down)
+    down.shutdown()
+    down.server_close()
+    pool = EndpointPool("llm", [dead_url, url(replicas[1])], heartbeat_interval=0, failure_threshold=1)
+    for _ in range(3):
+        assert complete(pool)["choices"][0]["text"] == "b"
+    assert not pool.endpoints[0].healthy
+
+def test_heartbeat_evicts_and_restores(replicas):
+    pool = EndpointPool("llm", [url(s) for s in replicas], heartbeat_interval=0)
+    replicas[0].healthy = False
+    assert pool.heartbeat()
+    assert [e.healthy for e in pool.endpoints] == [False, True]
+    for _ in range(3):
+        assert complete(pool)["choices"][0]["text"] == "b"
+    replicas[0].healthy = True
+    pool.heartbeat()
+    assert all(e.healthy for e in pool.endpoints)
+
+def test_other_errors_release_the_replica():
+    pool = EndpointPool("llm", ["http://a/v1", "http://b/v1"], heartbeat_interval=0)
+    def bad_request(endpoint):
+        raise ValueError("bad request")
+    with pytest.raises(ValueError):
+        pool.call(bad_request)
+    assert [e.outstanding for e in pool.endpoints] == [0, 0]
+
+def test_cancelled_async_call_releases_the_replica():
+    pool = EndpointPool("llm", ["http://a/v1", "http://b/v1"], heartbeat_interval=0)
+    async def main():
+        started = asyncio.Event()
+        async def slow(endpoint):
+            started.set()
+            await asyncio.sleep(10)
+        task = asyncio.ensure_future(pool.acall(slow))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    asyncio.run(main())
+    assert [e.outstanding for e in pool.endpoints] == [0, 0]
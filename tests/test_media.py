@@ -0,0 +1,76 @@
+import importlib, os
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from agentforge.interfaces.mediastore import ContentAddressedStore
+
+@pytest.fixture
+def store(tmp_path):
+    return ContentAddressedStore(str(tmp_path / "media"))
+
+@pytest.fixture
+def media(interfaces, store):
+    interfaces(mediastore=store)
+    module = importlib.import_module("agentforge.api.media")
+    interfaces(module, mediastore=store)
+    return module
+
+def clip(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+def test_parse_range(media):
+    assert media.parse_range(None, 100) is None
+    assert media.parse_range("bytes=0-9", 100) == (0, 9)
+    assert media.parse_range("bytes=90-", 100) == (90, 99) # open ended
+    assert media.parse_range("bytes=-10", 100) == (90, 99) # suffix, the last 10 bytes
+    assert media.parse_range("bytes=-500", 100) == (0, 99)
+    assert media.parse_range("bytes=50-500", 100) == (50, 99) # end clamped to the file
+    # Multiple or malformed ranges serve the whole file
+    assert media.parse_range("bytes=0-1,5-6", 100) is None
+    assert media.parse_range("bytes=-", 100) is None
+    assert media.parse_range("items=0-1", 100) is None
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=100-200", "bytes=9-3", "bytes=-0"])
+def test_unsatisfiable_range(media, header):
+    with pytest.raises(HTTPException) as e:
+        media.parse_range(header, 100)
+    assert e.value.status_code == 416
+    assert e.value.headers == {"Content-Range": "bytes */100"}
+
+def test_store_deduplicates_by_content(store, tmp_path):
+    first = store.put_file(clip(tmp_path, "a.wav", b"RIFF same bytes"))
+    second = store.put_file(clip(tmp_path, "b.wav", b"RIFF same bytes"))
+    other = store.put_file(clip(tmp_path, "c.wav", b"RIFF other bytes"))
+    assert first == second
+    assert other["media_id"] != first["media_id"]
+    assert first["media_id"].endswith(".wav") and first["size"] == len(b"RIFF same bytes")
+    assert first["url"] == f"/v1/media/{first['media_id']}"
+    assert sum(len(files) for _, _, files in os.walk(store.base_directory)) == 2
+
+def test_store_lookup(store, tmp_path):
+    reference = store.put_file(clip(tmp_path, "a.mp4", b"video"))
+    path = store.get_path(reference["media_id"])
+    with open(path, "rb") as fh:
+        assert fh.read() == b"video"
+    assert store.content_type(reference["media_id"]) == "video/mp4"
+    assert store.get_path("0" * 64 + ".wav") is None # unknown
+    assert store.get_path("../" + reference["media_id"]) is None # not an id
+
+def test_range_requests(media, store, tmp_path, monkeypatch):
+    async def session(request):
+        return object()
+    monkeypatch.setattr(media, "get_session", session)
+    app = FastAPI()
+    app.include_router(media.router, prefix="/v1")
+    client = TestClient(app)
+    url = store.put_file(clip(tmp_path, "a.wav", bytes(range(100))))["url"]
+
+    response = client.get(url)
+    assert response.status_code == 200 and response.content == bytes(range(100))
+    response = client.get(url, headers={"Range": "bytes=-10"})
+    assert response.status_code == 206 and response.content == bytes(range(90, 100))
+    assert response.headers["content-range"] == "bytes 90-99/100"
+    response = client.get(url, headers={"Range": "bytes=100-"})
+    assert response.status_code == 416 and response.headers["content-range"] == "bytes */100"
@@ -0,0 +1,123 @@
+import time
+import pytest
+import redis
+from agentforge.interfaces.lrucache import LRUCache
+from agentforge.interfaces.rediscache import RedisCache
+from conftest import FakeContext
+
+@pytest.fixture
+def memoize(ai_module):
+    return ai_module("agentforge.ai.routines.memoize")
+
+@pytest.fixture
+def cache(interfaces):
+    cache = LRUCache()
+    interfaces(subroutine_cache=cache)
+    return cache
+
+def make_routine(memoize, calls):
+    class Summarize:
+        @memoize.memoize_subroutine(["input.text", "input.mode"], ["output.summary", "output.tokens"])
+        def execute(self, context):
+            calls.append(context.get("input.text"))
+            context.set("output.summary", context.get("input.text").upper())
+            context.set("output.tokens", len(calls))
+            return context
+    return Summarize()
+
+def test_hit_restores_outputs_without_running(memoize, cache):
+    calls = []
+    routine = make_routine(memoize, calls)
+    first = routine.execute(FakeContext({"input": {"text": "hi", "mode": "short", "user_id": "u1"}}))
+    # Paths outside keys do not change the key
+    second = routine.execute(FakeContext({"input": {"text": "hi", "mode": "short", "user_id": "u2"}}))
+    assert calls == ["hi"]
+    assert second.get("output") == first.get("output") == {"summary": "HI", "tokens": 1}
+    assert second.get("input.user_id") == "u2"
+
+def test_key_covers_every_declared_path(memoize, cache):
+    calls = []
+    routine = make_routine(memoize, calls)
+    routine.execute(FakeContext({"input": {"text": "hi", "mode": "short"}}))
+    routine.execute(FakeContext({"input": {"text": "hi", "mode": "long"}}))
+    routine.execute(FakeContext({"input": {"text": "ho", "mode": "short"}}))
+    # A missing path keys as None rather than matching another value
+    routine.execute(FakeContext({"input": {"text": "hi"}}))
+    assert calls == ["hi", "hi", "ho", "hi"]
+    assert len(cache.entries) == 4
+
+def test_namespace_separates_subroutines(memoize, cache):
+    calls = []
+    class Other:
+        @memoize.memoize_subroutine(["input.text", "input.mode"], ["output.summary"])
+        def execute(self, context):
+            calls.append("other")
+            context.set("output.summary", "other")
+            return context
+    make_routine(memoize, calls).execute(FakeContext({"input": {"text": "hi", "mode": "short"}}))
+    assert Other().execute(FakeContext({"input": {"text": "hi", "mode": "short"}})).get("output.summary") == "other"
+    assert calls == ["hi", "other"]
+
+def test_nothing_cached_without_outputs_or_on_error(memoize, cache):
+    class Flaky:
+        @memoize.memoize_subroutine(["input.text"], ["output.summary"])
+        def execute(self, context):
+            if context.get("input.text") == "boom":
+                raise ValueError("boom")
+            return context
+    routine = Flaky()
+    routine.execute(FakeContext({"input": {"text": "hi"}}))
+    with pytest.raises(ValueError):
+        routine.execute(FakeContext({"input": {"text": "boom"}}))
+    assert len(cache.entries) == 0
+
+def test_runs_uncached_without_a_cache(memoize, interfaces):
+    interfaces()
+    calls = []
+    routine = make_routine(memoize, calls)
+    routine.execute(FakeContext({"input": {"text": "hi", "mode": "short"}}))
+    routine.execute(FakeContext({"input": {"text": "hi", "mode": "short"}}))
+    assert calls == ["hi", "hi"]
+
+class DownRedis:
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise redis.ConnectionError("redis down")
+        return fail
+
+def test_redis_cache_errors_are_logged_not_raised():
+    cache = RedisCache.__new__(RedisCache)
+    cache.db, cache.prefix, cache.ttl = DownRedis(), "cache", None
+    cache.set("k", 1)
+    assert cache.get("k") is None
+    cache.delete("k")
+    cache.clear()
+
+def test_subroutine_cache_expires_by_default(monkeypatch):
+    from agentforge.interfaces.interface_factory import InterfaceFactory
+    monkeypatch.setenv("SUBROUTINE_CACHE_TYPE", "lru")
+    monkeypatch.setenv("RESPONSE_CACHE_TYPE", "lru")
+    monkeypatch.delenv("SUBROUTINE_CACHE_TTL", raising=False)
+    monkeypatch.delenv("RESPONSE_CACHE_TTL", raising=False)
+    factory = InterfaceFactory()
+    factory.create_cache("subroutine")
+    factory.create_cache("response")
+    assert factory.get_interface("subroutine_cache").ttl == 300
+    assert factory.get_interface("response_cache").ttl is None
+    monkeypatch.setenv("SUBROUTINE_CACHE_TTL", "30")
+    factory.create_cache("subroutine")
+    assert factory.get_interface("subroutine_cache").ttl == 30
+
+def test_expired_results_are_recomputed(memoize, cache):
+    calls = []
+    class Recall:
+        @memoize.memoize_subroutine(["input.text"], ["knowledge"], ttl=0.05)
+        def execute(self, context):
+            calls.append(True)
+            context.set("knowledge", len(calls))
+            return context
+    routine = Recall()
+    assert routine.execute(FakeContext({"input": {"text": "hi"}})).get("knowledge") == 1
+    assert routine.execute(FakeContext({"input": {"text": "hi"}})).get("knowledge") == 1
+    time.sleep(0.06)
+    assert routine.execute(FakeContext({"input": {"text": "hi"}})).get("knowledge") == 2
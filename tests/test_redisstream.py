@@ -0,0 +1,127 @@
+import asyncio, threading, time
+import pytest
+from agentforge.interfaces import redisstream, streambus
+from agentforge.interfaces.redisstream import publish_many, read, aread, sse_event
+from agentforge.interfaces.streambus import RedisStreamBus
+
+def parse_id(entry_id):
+    return tuple(int(part) for part in entry_id.split("-"))
+
+# XADD/XREAD over in-memory streams, ids and fields come back as bytes like redis-py returns them
+class FakeRedis:
+    def __init__(self):
+        self.streams = {}
+        self.expiry = {}
+        self.reads = []
+        self.condition = threading.Condition()
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+    def xadd(self, key, fields, maxlen=None, approximate=True):
+        with self.condition:
+            stream = self.streams.setdefault(key, [])
+            entry_id = f"{int(time.time() * 1000)}-{len(stream)}"
+            stream.append((entry_id.encode(), {k.encode(): v.encode() for k, v in fields.items()}))
+            self.condition.notify_all()
+        return entry_id.encode()
+
+    def expire(self, key, seconds):
+        self.expiry[key] = seconds
+        return True
+
+    def exists(self, key):
+        return int(key in self.streams)
+
+    def _after(self, key, last_id):
+        return [(i, f) for i, f in self.streams.get(key, []) if parse_id(i.decode()) > parse_id(last_id)]
+
+    def xread(self, streams, block=None):
+        (key, last_id), = streams.items()
+        self.reads.append(last_id)
+        with self.condition:
+            entries = self._after(key, last_id)
+            if not entries:
+                self.condition.wait(block / 1000)
+                entries = self._after(key, last_id)
+        return [(key.encode(), entries)] if entries else []
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def xadd(self, *args, **kwargs):
+        self.commands.append(lambda: self.redis.xadd(*args, **kwargs))
+
+    def expire(self, *args):
+        self.commands.append(lambda: self.redis.expire(*args))
+
+    def execute(self):
+        return [command() for command in self.commands]
+
+class FakeAsyncRedis:
+    def __init__(self, redis):
+        self.redis = redis
+
+    async def xread(self, streams, block=None):
+        (key, last_id), = streams.items()
+        self.redis.reads.append(last_id)
+        entries = self.redis._after(key, last_id)
+        if not entries:
+            await asyncio.sleep(block / 1000)
+            entries = self.redis._after(key, last_id)
+        return [(key.encode(), entries)] if entries else []
+
+    async def exists(self, key):
+        return self.redis.exists(key)
+
+@pytest.fixture
+def redis(monkeypatch):
+    monkeypatch.setattr(redisstream, "STREAM_BLOCK_MS", 20)
+    return FakeRedis()
+
+def test_publish_appends_in_one_round_trip(redis):
+    entry_ids = publish_many(redis, "s", ["Hel", "lo"])
+    assert len(entry_ids) == 2 and all(isinstance(entry_id, str) for entry_id in entry_ids)
+    assert [fields[b"data"] for _, fields in redis.streams["s"]] == [b"Hel", b"lo"]
+    assert redis.expiry["s"] == redisstream.STREAM_TTL
+
+def test_read_resumes_after_last_id(redis):
+    first, second, third = publish_many(redis, "s", ["a", "b", "c"])
+    reader = read(redis, "s", first)
+    assert [next(reader), next(reader)] == [(second, "b"), (third, "c")]
+    # Idle reads report a tick and keep their position
+    assert next(reader) == (None, None)
+    fourth, = publish_many(redis, "s", ["d"])
+    assert next(reader) == (fourth, "d")
+    assert redis.reads == [first, third, third]
+
+def test_blocked_reader_wakes_on_publish(redis, monkeypatch):
+    monkeypatch.setattr(redisstream, "STREAM_BLOCK_MS", 2000)
+    publish = threading.Timer(0.02, publish_many, (redis, "s", ["late"]))
+    publish.start()
+    started = time.monotonic()
+    entry_id, text = next(read(redis, "s"))
+    assert text == "late" and time.monotonic() - started < 1
+
+def test_async_read_resumes_after_last_id(redis):
+    first, second = publish_many(redis, "s", ["a", "b"])
+    async def main():
+        reader = aread(FakeAsyncRedis(redis), "s", first)
+        entries = [await reader.__anext__(), await reader.__anext__()]
+        await reader.aclose()
+        return entries
+    assert asyncio.run(main()) == [(second, "b"), (None, None)]
+
+def test_stream_bus_goes_through_redis(redis, monkeypatch):
+    monkeypatch.setattr(streambus, "get_redis", lambda config: redis)
+    monkeypatch.setattr(streambus, "get_async_redis", lambda config: FakeAsyncRedis(redis))
+    bus = RedisStreamBus(None)
+    assert not bus.exists("s")
+    first, second = bus.publish_many("s", ["a", "b"])
+    assert bus.exists("s") and asyncio.run(bus.aexists("s"))
+    assert next(bus.read("s", first)) == (second, "b")
+
+def test_sse_event_frames_lines():
+    assert sse_event("1-0", "a\nb") == "id: 1-0\ndata: a\ndata: b\n\n"
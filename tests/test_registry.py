@@ -0,0 +1,63 @@
+import types
+import pytest
+from conftest import FakeDB
+
+class FakeVectorstore:
+    def __init__(self):
+        self.added = []
+        self.fail = False
+
+    def add_texts(self, texts, metadata, collection=None):
+        if self.fail:
+            raise ConnectionError("vectorstore down")
+        self.added.append((collection, list(texts), list(metadata)))
+
+def routine(name, *phrases):
+    return types.SimpleNamespace(name=name, phrases=list(phrases))
+
+@pytest.fixture
+def db():
+    return FakeDB()
+
+@pytest.fixture
+def vectorstore():
+    return FakeVectorstore()
+
+@pytest.fixture
+def registry(ai_module, interfaces, db, vectorstore):
+    module = ai_module("agentforge.ai.routines.registry")
+    interfaces(module, db=db, vectorstore=vectorstore)
+    return module.TaskRegistry
+
+def test_first_boot_embeds_every_phrase_in_one_call(registry, vectorstore, db):
+    names = registry().register([routine("shop", "buy milk", "buy eggs"), routine("cook", "make dinner", "buy eggs")])
+    assert sorted(names) == ["cook", "shop"]
+    assert vectorstore.added == [("tasks", ["buy milk", "buy eggs", "make dinner", "buy eggs"],
+                                  [{"task": True, "name": "shop"}] * 2 + [{"task": True, "name": "cook"}] * 2)]
+    assert len(db.uploads) == 1
+
+def test_unchanged_routines_are_skipped(registry, vectorstore, db):
+    routines = [routine("shop", "buy milk", "buy eggs"), routine("cook", "make dinner")]
+    registry().register(routines)
+    # Same phrases in another order hash the same
+    assert registry().register([routine("shop", "buy eggs", "buy milk"), routine("cook", "make dinner")]) == []
+    assert len(vectorstore.added) == 1 and len(db.uploads) == 1
+
+def test_only_new_phrases_are_embedded(registry, vectorstore, db):
+    registry().register([routine("shop", "buy milk"), routine("cook", "make dinner")])
+    assert registry().register([routine("shop", "buy milk", "buy bread"), routine("cook", "make dinner")]) == ["shop"]
+    assert vectorstore.added[-1] == ("tasks", ["buy bread"], [{"task": True, "name": "shop"}])
+    assert db.collections["task_registry"]["shop"]["phrases"] == ["buy bread", "buy milk"]
+    assert registry.content_hash(["buy milk", "buy bread"]) == db.collections["task_registry"]["shop"]["hash"]
+
+def test_failed_embedding_is_retried_next_boot(registry, vectorstore, db):
+    vectorstore.fail = True
+    assert registry().register([routine("shop", "buy milk")]) == []
+    assert db.uploads == []
+    vectorstore.fail = False
+    assert registry().register([routine("shop", "buy milk")]) == ["shop"]
+    assert vectorstore.added == [("tasks", ["buy milk"], [{"task": True, "name": "shop"}])]
+
+def test_routines_without_phrases_are_ignored(registry, vectorstore, db):
+    assert registry().register([routine("", "buy milk"), routine("idle")]) == []
+    assert vectorstore.added == [] and db.uploads == []
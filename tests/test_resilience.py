@@ -0,0 +1,144 @@
+import asyncio, threading, time
+import pytest
+import requests
+from agentforge.adapters import resilience
+from agentforge.adapters.resilience import CircuitBreaker, CircuitOpenError, guard, hedge, call_with_retries, acall_with_retries
+
+class FakeResponse:
+    def __init__(self, status_code, name=""):
+        self.status_code = status_code
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+class FakeAsyncResponse(FakeResponse):
+    async def aclose(self):
+        self.closed = True
+
+    def close(self):
+        raise RuntimeError("async responses are closed with aclose")
+
+# Returns the queued results in order, raising the exceptions among them
+def sequence(*results):
+    results = list(results)
+    calls = []
+    def send():
+        calls.append(len(calls))
+        result = results.pop(0)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+    send.calls = calls
+    return send
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(resilience, "API_RETRY_BASE_DELAY", 0)
+
+def test_breaker_opens_probes_and_closes(monkeypatch):
+    breaker = CircuitBreaker("svc", failure_threshold=2, reset_timeout=30)
+    now = [100.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    breaker.failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] += 30
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow() # a single probe at a time
+    breaker.failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] += 30
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+def test_guard_rejects_while_open():
+    url = "http://guard-test:1/v1"
+    breaker = resilience.get_breaker(url)
+    breaker.failure_threshold = 1
+    with pytest.raises(requests.ConnectionError):
+        guard(url, lambda u: (_ for _ in ()).throw(requests.ConnectionError("refused")))
+    with pytest.raises(CircuitOpenError):
+        guard(url, lambda u: FakeResponse(200))
+    breaker.success()
+    assert guard(url, lambda u: FakeResponse(200)).status_code == 200
+
+def test_backoff_is_bounded(monkeypatch):
+    monkeypatch.setattr(resilience, "API_RETRY_BASE_DELAY", 0.1)
+    monkeypatch.setattr(resilience, "API_RETRY_MAX_DELAY", 0.5)
+    for attempt, cap in [(0, 0.1), (1, 0.2), (2, 0.4), (3, 0.5), (10, 0.5)]:
+        assert all(0 <= resilience.backoff(attempt) <= cap for _ in range(200))
+
+def test_retries_retryable_responses_and_closes_them():
+    busy = FakeResponse(503)
+    send = sequence(requests.ConnectionError("reset"), busy, FakeResponse(200))
+    assert call_with_retries(send, "svc", attempts=3).status_code == 200
+    assert busy.closed and len(send.calls) == 3
+
+def test_last_attempt_is_returned_and_errors_are_not_retried():
+    assert call_with_retries(sequence(FakeResponse(503), FakeResponse(502)), "svc", attempts=2).status_code == 502
+    send = sequence(ValueError("bad request"), FakeResponse(200))
+    with pytest.raises(ValueError):
+        call_with_retries(send, "svc")
+    assert len(send.calls) == 1
+
+def test_non_idempotent_requests_are_sent_once():
+    send = sequence(requests.ConnectionError("reset"), FakeResponse(200))
+    with pytest.raises(requests.ConnectionError):
+        call_with_retries(send, "svc", idempotent=False)
+    assert len(send.calls) == 1
+
+def test_async_retries_close_streamed_responses():
+    busy = FakeAsyncResponse(429)
+    results = [busy, FakeAsyncResponse(200)]
+    async def send():
+        return results.pop(0)
+    assert asyncio.run(acall_with_retries(send, "svc")).status_code == 200
+    assert busy.closed
+
+def test_hedge_returns_the_faster_copy_and_closes_the_slower():
+    slow = FakeResponse(200, "slow")
+    release = threading.Event()
+    copies = []
+    def send():
+        copies.append(None)
+        if len(copies) == 1:
+            release.wait(5)
+            return slow
+        return FakeResponse(200, "fast")
+    assert hedge(send, 0.01, "svc").name == "fast"
+    release.set()
+    deadline = time.monotonic() + 5
+    while not slow.closed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert slow.closed
+
+def test_hedge_skipped_when_first_copy_is_fast():
+    send = sequence(FakeResponse(200, "first"))
+    assert hedge(send, 1, "svc").name == "first"
+    assert len(send.calls) == 1
+
+def test_failed_probe_reopens_the_circuit(monkeypatch):
+    url = "http://probe-test:1/v1"
+    breaker = resilience.get_breaker(url)
+    breaker.failure_threshold = 1
+    breaker.failure()
+    now = [time.monotonic() + breaker.reset_timeout]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    with pytest.raises(ValueError):
+        guard(url, lambda u: (_ for _ in ()).throw(ValueError("bad chunk")))
+    assert breaker.state == "open"
+    now[0] += breaker.reset_timeout
+    async def cancelled(u):
+        raise asyncio.CancelledError()
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(resilience.aguard(url, cancelled))
+    assert breaker.state == "open"
+    now[0] += breaker.reset_timeout
+    assert guard(url, lambda u: FakeResponse(200)).status_code == 200
+    assert breaker.state == "closed"
@@ -0,0 +1,66 @@
+import pytest
+from agentforge.interfaces.lrucache import LRUCache
+from agentforge.interfaces.responsecache import ResponseCache
+
+@pytest.fixture
+def cache():
+    return ResponseCache(LRUCache(), sampled=False)
+
+@pytest.mark.parametrize("config, default, expected", [
+    ({"temperature": 0}, 0.7, True),
+    ({"temperature": 0.7}, 0.0, False),
+    ({}, 0.7, False), # the server samples when no temperature is set
+    ({}, 0.0, True),
+    (None, 0.0, True),
+    ({"temperature": 0.9, "seed": 0}, 0.7, True),
+    ({"temperature": 0.9, "use_beam_search": True}, 0.7, True),
+])
+def test_cacheable(cache, config, default, expected):
+    assert cache.cacheable(config, default) is expected
+
+def test_cacheable_overrides(cache):
+    assert cache.cacheable({"temperature": 0.9}, override=True)
+    assert not cache.cacheable({"temperature": 0}, override=False)
+    assert ResponseCache(LRUCache(), sampled=True).cacheable({"temperature": 0.9})
+
+def test_key_ignores_dict_order(cache):
+    request = {"prompt": "hi", "model": "m", "generation_config": {"temperature": 0, "max_tokens": 16, "stop": ["\n"]}}
+    reordered = {"generation_config": {"stop": ["\n"], "max_tokens": 16, "temperature": 0}, "model": "m", "prompt": "hi"}
+    cache.set("llm", request, {"text": "hello"})
+    assert cache.get("llm", reordered) == {"text": "hello"}
+    assert cache.key("llm", request) == cache.key("llm", reordered)
+    # Every field is part of the key, and so is the service
+    assert cache.get("llm", {**request, "generation_config": {"temperature": 0, "max_tokens": 17, "stop": ["\n"]}}) is None
+    assert cache.get("tokenizer", request) is None
+
+def test_none_is_not_cached(cache):
+    cache.set("llm", {"prompt": "hi"}, None)
+    assert len(cache.backend.entries) == 0
+
+@pytest.fixture
+def service(monkeypatch, cache):
+    monkeypatch.setenv("AGENTFORGE_ENV", "development")
+    monkeypatch.delenv("LLM_URLS", raising=False)
+    from agentforge.interfaces.api import vLLMService
+    service = vLLMService()
+    service.response_cache = cache
+    return service
+
+def test_completion_requests_hash_the_same_in_any_order(service):
+    form_data = {"prompt": "hi", "model_config": {"model_name": "m"}, "user_id": "u1",
+                 "generation_config": {"temperature": 0, "max_tokens": 32, "user": "u1"}}
+    reordered = {"generation_config": {"user": "u2", "max_tokens": 32, "temperature": 0},
+                 "user_id": "u2", "model_config": {"model_name": "m"}, "prompt": "hi"}
+    first = service.completion_cache_request(form_data, service.prepare_completion_params(form_data, False))
+    second = service.completion_cache_request(reordered, service.prepare_completion_params(reordered, False))
+    # The replica and the end user do not change the completion
+    assert "api_url" not in first and "user" not in first
+    assert service.response_cache.key("llm", first) == service.response_cache.key("llm", second)
+
+def test_streaming_and_sampled_completions_are_not_cached(service):
+    form_data = {"prompt": "hi", "generation_config": {"temperature": 0}}
+    assert service.completion_cache_request(form_data, service.prepare_completion_params(form_data, True)) is None
+    sampled = {"prompt": "hi", "generation_config": {}}
+    assert service.completion_cache_request(sampled, service.prepare_completion_params(sampled, False)) is None
+    forced = {**sampled, "cache": True}
+    assert service.completion_cache_request(forced, service.prepare_completion_params(forced, False)) is not None
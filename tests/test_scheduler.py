@@ -0,0 +1,79 @@
+import asyncio, contextvars, threading, time
+from agentforge.exceptions import SubroutineCancelled
+from agentforge.interfaces.scheduler import RequestScheduler
+from agentforge.utils import CancellationToken
+from agentforge.utils.cancellation import current_token
+
+CLASSES = {"chat": (2, 10, 0), "batch": (1, 1, 10)}
+
+def test_weighted_fair_order():
+    scheduler = RequestScheduler(CLASSES, max_concurrency=1)
+    holder = scheduler._enqueue("chat")
+    tickets = [scheduler._enqueue("batch") for _ in range(3)] + [scheduler._enqueue("chat") for _ in range(4)]
+    order, held = [], holder
+    while True:
+        scheduler._release(held)
+        granted = [t for t in tickets if t.granted and t not in order]
+        if not granted:
+            break
+        held = granted[0]
+        order.append(held)
+    # Twice the weight, twice the slots while both classes are waiting
+    assert [t.request_class.name for t in order] == ["chat", "chat", "batch", "chat", "chat", "batch", "batch"]
+
+def test_class_limit_holds_back_its_own_requests():
+    scheduler = RequestScheduler(CLASSES, max_concurrency=4)
+    first, second = scheduler._enqueue("batch"), scheduler._enqueue("batch")
+    chat = scheduler._enqueue("chat")
+    assert first.granted and not second.granted and chat.granted
+    scheduler._release(first)
+    assert second.granted
+    assert scheduler.status() == {"chat": {"queued": 0, "in_flight": 1}, "batch": {"queued": 0, "in_flight": 1}}
+
+def test_release_wakes_a_blocked_caller_at_once():
+    scheduler = RequestScheduler(CLASSES, max_concurrency=1)
+    woken = []
+    with scheduler.slot("chat"):
+        def wait():
+            with scheduler.slot("chat"):
+                woken.append(time.perf_counter())
+        thread = threading.Thread(target=wait)
+        thread.start()
+        time.sleep(0.05)
+        released = time.perf_counter()
+    thread.join(1)
+    assert woken and woken[0] - released < 0.05
+
+def test_cancelled_caller_stops_waiting():
+    scheduler = RequestScheduler(CLASSES, max_concurrency=1)
+    token = CancellationToken()
+    errors = []
+    def wait():
+        current_token.set(token)
+        try:
+            with scheduler.slot("chat"):
+                pass
+        except SubroutineCancelled:
+            errors.append(time.perf_counter())
+    with scheduler.slot("chat"):
+        thread = threading.Thread(target=contextvars.copy_context().run, args=(wait,))
+        thread.start()
+        time.sleep(0.05)
+        cancelled = time.perf_counter()
+        token.cancel("aborted")
+        thread.join(1)
+        assert errors and errors[0] - cancelled < 0.05
+        assert scheduler.status()["chat"]["queued"] == 0
+
+def test_async_slots():
+    scheduler = RequestScheduler(CLASSES, max_concurrency=1)
+    order = []
+    async def use(name, i):
+        async with scheduler.aslot(name) as priority:
+            order.append((i, priority))
+            await asyncio.sleep(0.01)
+    async def main():
+        await asyncio.gather(*(use("chat" if i % 2 else "batch", i) for i in range(4)))
+    asyncio.run(main())
+    assert sorted(order) == [(0, 10), (1, 0), (2, 10), (3, 0)]
+    assert scheduler.in_flight == 0
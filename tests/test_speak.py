@@ -0,0 +1,86 @@
+import json, threading
+import pytest
+from agentforge.interfaces import streambus
+from agentforge.interfaces.redisstream import media_channel, stream_key
+from agentforge.interfaces.streambus import LocalStreamBus
+from conftest import FakeContext, FakeService
+
+CHANNEL = media_channel("u1", "s1", "audio")
+
+# Records what is published, signals once the end of the clips is announced
+class FakeRedis:
+    def __init__(self):
+        self.published = []
+        self.ended = threading.Event()
+
+    def publish(self, channel, data):
+        self.published.append((channel, data))
+        if data == "<|endofvideo|>":
+            self.ended.set()
+
+class FakeMediaStore:
+    def __init__(self, fail_on=()):
+        self.fail_on = fail_on
+
+    def put_file(self, filename):
+        if filename in self.fail_on:
+            raise OSError("disk full")
+        return {"url": f"/v1/media/{filename}"}
+
+@pytest.fixture
+def speak(ai_module, monkeypatch, tmp_path):
+    module = ai_module("agentforge.ai.communication.speak")
+    monkeypatch.setattr(streambus, "STREAM_BLOCK_MS", 20)
+    bus = LocalStreamBus()
+    monkeypatch.setattr(module, "get_stream_bus", lambda key: bus)
+    # One clip per sentence, named after its first word; TTS fails on "Broken"
+    def tts(form_data):
+        word = form_data["response"].split()[0].strip(".!?")
+        if word == "Broken":
+            raise ConnectionError("tts down")
+        path = tmp_path / f"{word}.wav"
+        path.write_bytes(b"")
+        return {"filename": str(path)}
+    def make(fail_on=()):
+        speaker = module.Speak.__new__(module.Speak)
+        speaker.tts = FakeService(tts)
+        speaker.mediastore = FakeMediaStore({str(tmp_path / name) for name in fail_on})
+        speaker.redis_store = FakeRedis()
+        return speaker
+    make.module, make.bus = module, bus
+    return make
+
+def clips(speaker):
+    return [json.loads(data)["url"].rsplit("/", 1)[-1] for channel, data in speaker.redis_store.published
+            if channel == CHANNEL and data != "<|endofvideo|>"]
+
+def test_sentence_splitter(speak):
+    splitter = speak.module.SentenceSplitter()
+    assert splitter.feed("Hello there") == []
+    assert splitter.feed(". How are") == ["Hello there."]
+    assert splitter.feed(' you?! "Fine." I') == ["How are you?!", '"Fine."']
+    assert splitter.feed(" think 3.5 is") == []
+    assert splitter.flush() == "I think 3.5 is"
+    assert splitter.flush() is None
+
+def test_failed_sentences_are_skipped_and_the_end_is_announced(speak):
+    speaker = speak(fail_on=["Second.wav"])
+    speak.bus.publish_many(stream_key("u1", "s1"), ["First one. Broken", " one. Second one. Third", " one.<|endoftext|>"])
+    context = FakeContext({"input": {"user_id": "u1", "stream_id": "s1"}})
+    speaker.event_generator(context, "audio")
+    assert speaker.redis_store.ended.wait(2)
+    assert clips(speaker) == ["First.wav", "Third.wav"]
+    assert [json.loads(data)["sequence"] for _, data in speaker.redis_store.published[:-1]] == [0, 1]
+
+def test_gives_up_on_a_stream_that_is_never_written(speak, monkeypatch):
+    monkeypatch.setattr(speak.module, "STREAM_TTL", 0.05)
+    # A local stream exists from the moment it is read, let it expire as an unwritten Redis stream never exists
+    bus = LocalStreamBus(ttl=0.05)
+    monkeypatch.setattr(speak.module, "get_stream_bus", lambda key: bus)
+    speaker = speak()
+    done = threading.Event()
+    context = FakeContext({"input": {"user_id": "u1", "stream_id": "s1"}})
+    threading.Thread(target=lambda: (speaker.event_generator(context, "audio"), done.set()), daemon=True).start()
+    assert done.wait(2)
+    assert speaker.redis_store.ended.wait(2)
+    assert clips(speaker) == []
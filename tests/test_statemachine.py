@@ -0,0 +1,201 @@
+import asyncio, threading, time
+import pytest
+from agentforge.utils import check_cancelled, get_current_token
+from conftest import FakeContext
+
+@pytest.fixture
+def sm(ai_module):
+    return ai_module("agentforge.ai.agents.statemachine")
+
+def run(sm, nodes, timeout=5):
+    machine = sm.StateMachine(nodes, {}, timeout=timeout)
+    state = machine.create_run({})
+    asyncio.run(machine.arun(state.context, state))
+    return {name.split(".")[-1]: result for name, result in state.results.items()}
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+def test_dependencies_run_first(sm):
+    order = []
+    def parse(context):
+        time.sleep(0.05)
+        order.append("parse")
+    async def recall(context):
+        order.append("recall")
+    def respond(context):
+        order.append("respond")
+    a, b = sm.Node(parse, []), sm.Node(recall, [])
+    results = run(sm, [sm.Node(respond, [a, b]), a, b])
+    assert order == ["recall", "parse", "respond"]
+    assert results == {"parse": "done", "recall": "done", "respond": "done"}
+
+def test_failed_node_does_not_block_dependents(sm):
+    ran = []
+    def broken(context):
+        raise ValueError("boom")
+    def after(context):
+        ran.append("after")
+    first = sm.Node(broken, [])
+    assert run(sm, [first, sm.Node(after, [first])]) == {"broken": "failed", "after": "done"}
+    assert ran == ["after"]
+
+def test_coroutine_timeout(sm):
+    async def slow(context):
+        await asyncio.sleep(5)
+    assert run(sm, [sm.Node(slow, [], timeout=0.05)]) == {"slow": "timeout"}
+
+def test_blocking_timeout_cancels_token(sm):
+    stopped = threading.Event()
+    def poll(context):
+        try:
+            while True:
+                check_cancelled()
+                time.sleep(0.01)
+        finally:
+            stopped.set()
+    assert run(sm, [sm.Node(poll, [], timeout=0.05)]) == {"poll": "timeout"}
+    assert stopped.wait(1)
+    assert wait_until(lambda: sm.abandoned_nodes() == 0)
+
+def test_abandoned_threads_are_bounded(sm, monkeypatch):
+    monkeypatch.setattr(sm, "MAX_ABANDONED_NODES", 1)
+    release = threading.Event()
+    def stuck(context):
+        release.wait(5) # ignores its token
+    def quick(context):
+        pass
+    try:
+        assert run(sm, [sm.Node(stuck, [], timeout=0.05)]) == {"stuck": "timeout"}
+        assert sm.abandoned_nodes() == 1
+        assert run(sm, [sm.Node(quick, [])]) == {"quick": "failed"}
+    finally:
+        release.set()
+    assert wait_until(lambda: sm.abandoned_nodes() == 0)
+    assert run(sm, [sm.Node(quick, [])]) == {"quick": "done"}
+
+def test_cancelled_run_stops_its_nodes(sm):
+    started, stopped = threading.Event(), threading.Event()
+    awaiting, interrupted = [], []
+    async def listen(context):
+        awaiting.append(True)
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            interrupted.append(True)
+            raise
+    def poll(context):
+        started.set()
+        try:
+            while True:
+                check_cancelled()
+                time.sleep(0.01)
+        finally:
+            stopped.set()
+    def after(context):
+        pass
+    first = sm.Node(listen, [])
+    machine = sm.StateMachine([first, sm.Node(poll, []), sm.Node(after, [first])], {})
+    state = machine.create_run({})
+    async def main():
+        task = asyncio.ensure_future(machine.arun(state.context, state))
+        while not (awaiting and started.is_set()):
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert all(task.done() for task in state.tasks)
+    asyncio.run(main())
+    assert interrupted and stopped.wait(1)
+    assert state.results["test_cancelled_run_stops_its_nodes.<locals>.listen"] == "cancelled"
+    assert state.token.cancelled
+    assert wait_until(lambda: sm.abandoned_nodes() == 0)
+
+def test_concurrent_runs_keep_their_own_state(sm):
+    tokens = {"a": [], "b": []}
+    started = {"a": asyncio.Event(), "b": asyncio.Event()}
+    proceed = asyncio.Event()
+    async def work(context):
+        run = context.get("input.user_id")
+        tokens[run].append(get_current_token())
+        started[run].set()
+        await proceed.wait()
+        check_cancelled()
+        context.set("response", f"for {run}")
+    def finish(context):
+        run = context.get("input.user_id")
+        tokens[run].append(get_current_token())
+        context.set("done", context.get("response"))
+    first = sm.Node(work, [])
+    machine = sm.StateMachine([first, sm.Node(finish, [first])], {})
+    a = machine.create_run(FakeContext({"input": {"user_id": "a"}}))
+    b = machine.create_run(FakeContext({"input": {"user_id": "b"}}))
+    async def main():
+        runs = asyncio.gather(machine.arun(a.context, a), machine.arun(b.context, b))
+        await started["a"].wait()
+        await started["b"].wait()
+        # Both runs are inside the same compiled node, only one of them is aborted
+        a.abort()
+        proceed.set()
+        await runs
+    asyncio.run(main())
+    assert set(a.results.values()) == {"cancelled"} and set(b.results.values()) == {"done"}
+    assert a.context.get("response") is None and b.context.get("done") == "for b"
+    # Each node saw its own run's token, the aborted run never reached finish
+    assert tokens["a"] == [a.tokens[0]] and tokens["b"] == list(b.tokens)
+    assert all(token.cancelled for token in a.tokens) and not any(token.cancelled for token in b.tokens)
+    assert a.tasks[0] is not b.tasks[0]
+
+def test_siblings_exclude_ancestors_and_descendants(sm):
+    def root(context): pass
+    def intent(context): pass
+    def recall(context): pass
+    def followup(context): pass
+    def normal(context): pass
+    first = sm.Node(root, [], speculative=True)
+    decide = sm.Node(intent, [first])
+    branch = sm.Node(recall, [first], speculative=True)
+    after = sm.Node(followup, [decide], speculative=True)
+    routine = sm.CompiledRoutine([first, decide, branch, after, sm.Node(normal, [])])
+    names = lambda i: [routine.nodes[j].execute.__name__ for j in routine.siblings(i)]
+    assert names(routine.index[decide]) == ["recall"]
+    assert names(routine.index[branch]) == ["followup"]
+
+def test_cancel_siblings_stops_speculative_branches(sm):
+    searching, stopped = threading.Event(), threading.Event()
+    interrupted, ran = [], []
+    async def intent(context):
+        while not searching.is_set():
+            await asyncio.sleep(0.01)
+        context.set("cancelled", context.run_state.cancel_siblings())
+    async def recall(context):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            interrupted.append(True)
+            raise
+    def search(context):
+        searching.set()
+        try:
+            while True:
+                check_cancelled()
+                time.sleep(0.01)
+        finally:
+            stopped.set()
+    def respond(context):
+        ran.append(True)
+    decide, branch = sm.Node(intent, []), sm.Node(recall, [], speculative=True)
+    machine = sm.StateMachine([decide, branch, sm.Node(search, [], speculative=True), sm.Node(respond, [decide, branch])], {})
+    state = machine.create_run(FakeContext())
+    started = time.monotonic()
+    asyncio.run(machine.arun(state.context, state))
+    assert time.monotonic() - started < 2
+    assert sorted(name.split(".")[-1] for name in state.context.get("cancelled")) == ["recall", "search"]
+    results = {name.split(".")[-1]: result for name, result in state.results.items()}
+    # Dependents of a cancelled branch still run
+    assert results == {"intent": "done", "recall": "cancelled", "search": "cancelled", "respond": "done"}
+    assert interrupted and stopped.wait(1) and ran
+    assert not state.tokens[0].cancelled and state.tokens[1].cancelled and state.tokens[2].cancelled
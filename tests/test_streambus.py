@@ -0,0 +1,136 @@
+import asyncio, threading, time
+import pytest
+from agentforge.interfaces import streambus
+from agentforge.interfaces.streambus import LocalStreamBus, StreamPublisher
+
+@pytest.fixture(autouse=True)
+def short_blocks(monkeypatch):
+    monkeypatch.setattr(streambus, "STREAM_BLOCK_MS", 20)
+
+async def take(iterator, n):
+    return [await iterator.__anext__() for _ in range(n)]
+
+def test_async_reader_wakes_in_order():
+    bus = LocalStreamBus()
+    bus.open("s")
+    async def main():
+        reader = bus.aread("s")
+        threading.Timer(0.005, bus.publish_many, ("s", ["a", "b"])).start()
+        entries = []
+        while len(entries) < 2:
+            entry_id, text = await reader.__anext__()
+            if entry_id is not None:
+                entries.append((entry_id, text))
+        return entries
+    assert asyncio.run(main()) == [("1-0", "a"), ("2-0", "b")]
+
+def test_timed_out_readers_leave_no_waiters():
+    bus = LocalStreamBus()
+    bus.open("s")
+    async def main():
+        reader = bus.aread("s")
+        assert await take(reader, 3) == [(None, None)] * 3
+        await reader.aclose()
+    asyncio.run(main())
+    assert bus.streams["s"].waiters == []
+
+def test_cancelled_reader_leaves_no_waiter():
+    bus = LocalStreamBus()
+    bus.open("s")
+    async def main():
+        task = asyncio.ensure_future(take(bus.aread("s"), 1))
+        await asyncio.sleep(0.005)
+        assert len(bus.streams["s"].waiters) == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    asyncio.run(main())
+    assert bus.streams["s"].waiters == []
+
+def test_resume_after_last_id():
+    bus = LocalStreamBus()
+    bus.publish_many("s", ["a", "b", "c"])
+    reader = bus.read("s", "1-0")
+    assert [next(reader), next(reader)] == [("2-0", "b"), ("3-0", "c")]
+
+def test_idle_readers_prune_expired_streams():
+    bus = LocalStreamBus(ttl=0.1)
+    bus.publish_many("old", ["done"])
+    time.sleep(0.15)
+    bus.open("live") # scans at most once a second, this one is skipped
+    assert "old" in bus.streams
+    bus.pruned = 0
+    reader = bus.read("live")
+    assert next(reader) == (None, None)
+    assert "old" not in bus.streams and "live" in bus.streams
+    assert not bus.exists("old")
+
+def test_async_idle_readers_prune_expired_streams():
+    bus = LocalStreamBus(ttl=0.1)
+    bus.publish_many("old", ["done"])
+    time.sleep(0.15)
+    bus.pruned = 0
+    async def main():
+        reader = bus.aread("live")
+        await take(reader, 1)
+        await reader.aclose()
+    asyncio.run(main())
+    assert "old" not in bus.streams
+
+def entries(bus, key):
+    stream = bus.streams.get(key)
+    return [text for _, text in stream.entries] if stream else []
+
+def test_publisher_flushes_after_window():
+    bus = LocalStreamBus()
+    publisher = StreamPublisher(bus, "s", window_ms=30, sentences=True)
+    publisher.write("Hel")
+    publisher.write("lo")
+    assert entries(bus, "s") == []
+    deadline = time.monotonic() + 2
+    while not entries(bus, "s") and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert entries(bus, "s") == ["Hello"]
+
+def test_publisher_flushes_on_size_and_sentence_end():
+    bus = LocalStreamBus()
+    publisher = StreamPublisher(bus, "s", window_ms=60000, max_bytes=4, sentences=True)
+    publisher.write("ab")
+    publisher.write("cd")
+    assert entries(bus, "s") == ["abcd"]
+    publisher.write("Hi.")
+    assert entries(bus, "s") == ["abcd", "Hi."]
+    publisher.write("x")
+    publisher.close()
+    assert entries(bus, "s") == ["abcd", "Hi.", "x"]
+
+def test_close_drains_buffer_before_end_token():
+    bus = LocalStreamBus()
+    publisher = StreamPublisher(bus, "s", window_ms=50, sentences=False)
+    publisher.write("par")
+    publisher.write("tial")
+    publisher.close("<|endoftext|>")
+    assert entries(bus, "s") == ["partial", "<|endoftext|>"]
+    time.sleep(0.1) # the cancelled window flush publishes nothing afterwards
+    assert entries(bus, "s") == ["partial", "<|endoftext|>"]
+
+def test_coalesced_entries_keep_order():
+    bus = LocalStreamBus()
+    publisher = StreamPublisher(bus, "s", window_ms=1, max_bytes=64)
+    words = [f"w{i} " for i in range(300)]
+    for i, word in enumerate(words):
+        publisher.write(word)
+        if i % 50 == 0:
+            time.sleep(0.005)
+    publisher.close("<|endoftext|>")
+    published = entries(bus, "s")
+    assert "".join(published[:-1]) == "".join(words)
+    assert published[-1] == "<|endoftext|>"
+    assert len(published) < len(words)
+
+def test_coalesce_options():
+    bus = LocalStreamBus()
+    assert StreamPublisher.from_options(bus, "s", False).window == 0
+    assert StreamPublisher.from_options(bus, "s", 50).window == 0.05
+    publisher = StreamPublisher.from_options(bus, "s", {"max_bytes": 8, "sentences": False})
+    assert (publisher.max_bytes, publisher.sentences) == (8, False)
@@ -0,0 +1,65 @@
+import sys, types
+import pytest
+from agentforge.interfaces.tokencounter import TokenCounter
+from conftest import FakeService
+
+# One token per whitespace-separated word, records every batch it is asked for
+class WordTokenizer:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts, add_special_tokens=False):
+        self.batches.append(list(texts))
+        extra = 2 if add_special_tokens else 0
+        return {"input_ids": [[0] * (len(text.split()) + extra) for text in texts]}
+
+# The tokenizer service always counts BOS/EOS
+def tokenizer_service():
+    return FakeService(lambda form_data: {"text": str(len(form_data["prompt"].split()) + 2)})
+
+@pytest.fixture
+def counter():
+    return TokenCounter(tokenizer=WordTokenizer())
+
+def words(*counts):
+    return [" ".join(["w"] * count) for count in counts]
+
+def test_fit_counts_trailing_pieces(counter):
+    pieces = words(3, 1, 2, 4) # suffix sums 0, 4, 6, 7, 10
+    for budget, expected in [(-1, 0), (0, 0), (3, 0), (4, 1), (5, 1), (6, 2), (7, 3), (9, 3), (10, 4), (100, 4)]:
+        assert counter.fit(pieces, budget) == expected, budget
+    assert counter.fit(pieces, 10, overhead=4) == 2
+    assert counter.fit(pieces, 3, overhead=5) == 0
+
+def test_fit_includes_free_pieces_at_the_boundary(counter):
+    # Empty pieces cost nothing, the longest suffix within budget wins
+    assert counter.fit(["", "a b", "", ""], 0) == 2
+    assert counter.fit(["", "a b", "", ""], 2) == 4
+    assert counter.fit([], 5) == 0
+
+def test_counts_are_cached_per_special_tokens(counter):
+    assert counter.count_many(["a b", "c", "a b"]) == [2, 1, 2]
+    assert counter.count("a b") == 4
+    counter.count_many(["a b", "c"])
+    assert counter.tokenizer.batches == [["a b", "c", "a b"], ["a b"]]
+
+def test_tokenizer_loads_on_first_count(monkeypatch):
+    loaded = []
+    def from_pretrained(name):
+        loaded.append(name)
+        return WordTokenizer()
+    transformers = types.SimpleNamespace(AutoTokenizer=types.SimpleNamespace(from_pretrained=from_pretrained))
+    monkeypatch.setitem(sys.modules, "transformers", transformers)
+    counter = TokenCounter.from_pretrained("tok", service=tokenizer_service())
+    assert loaded == [] and counter.tokenizer is None
+    assert counter.count_many(["a b"]) == [2]
+    counter.count_many(["c"])
+    assert loaded == ["tok"] and counter.service.calls == []
+
+def test_falls_back_to_the_service_when_loading_fails(monkeypatch):
+    monkeypatch.setitem(sys.modules, "transformers", None)
+    counter = TokenCounter.from_pretrained("tok", service=tokenizer_service())
+    assert counter.count("a b") == 4
+    assert counter.service.calls == [{"prompt": "a b"}]
+    with pytest.raises(ImportError):
+        TokenCounter.from_pretrained("tok").count("a b")
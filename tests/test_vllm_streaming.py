@@ -0,0 +1,83 @@
+import contextvars, json
+import pytest
+from agentforge.exceptions import SubroutineCancelled
+from agentforge.interfaces import api
+from agentforge.interfaces.api import stop_prefix_length
+from agentforge.interfaces.redisstream import stream_key
+from agentforge.interfaces.streambus import LocalStreamBus, StreamPublisher, local_bus, open_stream
+from agentforge.utils import CancellationToken
+from agentforge.utils.cancellation import current_token
+
+# Streamed completion as vLLM sends it, one SSE data line per delta
+class FakeStream:
+    status_code = 200
+
+    def __init__(self, deltas, on_line=None):
+        self.deltas = deltas
+        self.on_line = on_line
+        self.closed = False
+
+    def iter_lines(self):
+        for i, delta in enumerate(self.deltas):
+            if self.on_line:
+                self.on_line(i)
+            yield b"data: " + json.dumps({"choices": [{"index": 0, "text": delta}]}).encode()
+        yield b"data: [DONE]"
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("AGENTFORGE_ENV", "development")
+    monkeypatch.delenv("LLM_URLS", raising=False)
+    from agentforge.interfaces.api import vLLMService
+    return vLLMService()
+
+def published(bus, key):
+    stream = bus.streams[key]
+    return [text for _, text in stream.entries]
+
+def test_stop_prefix_length():
+    assert stop_prefix_length("Sure.\nHu", "\nHuman") == 3
+    assert stop_prefix_length("Sure.\n", "\nHuman") == 1
+    assert stop_prefix_length("Sure.", "\nHuman") == 0
+
+def test_stop_split_across_deltas_is_never_published(service):
+    bus = LocalStreamBus()
+    publisher = StreamPublisher(bus, "s", window_ms=0)
+    response = FakeStream(["Hello", " there.\nHu", "man: what", " next"])
+    output = service.handle_streaming(response, "u1", "Human", "Agent", "prompt", publisher)
+    publisher.close()
+    assert output == "Hello there."
+    assert "".join(published(bus, "s")) == "Hello there."
+
+def test_held_back_prefix_is_released(service):
+    bus = LocalStreamBus()
+    publisher = StreamPublisher(bus, "s", window_ms=0)
+    response = FakeStream(["Line one\nHu", "go said hi", "\nH"])
+    output = service.handle_streaming(response, "u1", "Human", "Agent", "prompt", publisher)
+    publisher.close()
+    assert output == "Line one\nHugo said hi\nH"
+    assert published(bus, "s") == ["Line one", "\nHugo said hi", "\nH"]
+
+def test_aborted_generation_flushes_and_ends_the_stream(service, monkeypatch):
+    token = CancellationToken()
+    # The user aborts while the third delta is on its way
+    response = FakeStream(["Hello", " wor", "ld"], on_line=lambda i: i == 2 and token.cancel("aborted"))
+    monkeypatch.setattr(api, "create_completion", lambda **params: response)
+    key = stream_key("u1", "abort")
+    open_stream(key)
+
+    def call():
+        current_token.set(token)
+        return service.call({
+            "prompt": "prompt", "user_id": "u1", "stream_id": "abort", "user_name": "Human",
+            "model_config": {"streaming": True}, "generation_config": {},
+            # Buffered text must still go out before the end token
+            "coalesce": {"window_ms": 60000, "sentences": False},
+        })
+    with pytest.raises(SubroutineCancelled):
+        contextvars.copy_context().run(call)
+    assert published(local_bus, key) == ["Hello wor", "<|endoftext|>"]
+    assert response.closed